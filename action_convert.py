@@ -0,0 +1,410 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any laTter version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+##########################################################################################################
+##########################################################################################################
+
+import bpy
+import time
+import numpy as np
+from mathutils import Matrix
+
+from .fk_eval import FKEvaluator
+from .fk_eval import constrained_bones
+from .snap_registry import snap_registry
+from .snap_registry import LimbSnap
+from .snap_registry import SingleBoneSnap
+from .snap_registry import SimpleToBaseSnap
+from .snapping import KeyBuffer
+from .snapping import snap_n_key_modules
+from .snapping import followed_bones
+from .key_reduction import reduce_action_keys
+from .key_reduction import transform_errors
+from .utils import lerp
+from .utils import suspend_chain_muting
+from .utils import resume_chain_muting
+
+
+# ACTION CONVERTER:
+# Converts whole frame ranges of an action between fk and ik at once, with the same results as
+# snapping every frame ('FK_to_IK': fk bones follow the ik chain, 'IK_to_FK': ik target, pole and roll follow the fk chain).
+# IK_to_FK reads the fk side with the numpy fk evaluator, constrained bones on the way (the chain's first parent
+# bound to the fk/ik rig, the fk limits) can't be computed from the action, they're sampled from the depsgraph
+# once per frame and the evaluator continues from them,
+# FK_to_IK samples the ik side once per frame (the ik solver needs the depsgraph),
+# a module whose sampled bones follow fk bones written by an earlier module (arms under a torso switched to fk)
+# is sampled again with those written, like snapping frame by frame sees them (fk_to_ik_passes),
+# everything else is done on (frames, 4, 4) arrays and written as f-curves in one pass.
+# check_convert_action compares the result with snap().
+
+
+# pose matrices of bones on all frames, (frames, 4, 4) per bone,
+# overrides: {bone name: (frames, 4, 4)} basis matrices set on every frame before the bones are read
+class DepsgraphSampler():
+
+    def __init__(self, rig, frames, bone_names, overrides=None):
+        scene = bpy.context.scene
+        frame_current = scene.frame_current
+        pbones = rig.pose.bones
+        overrides = overrides if overrides is not None else {}
+        basis_before = {name: pbones[name].matrix_basis.copy() for name in overrides}
+        
+        bone_names = list(bone_names)
+        matrices = np.empty((len(bone_names), len(frames), 4, 4))
+        for frame_index, frame in enumerate(frames):
+            scene.frame_set(int(frame), subframe=frame - int(frame))
+            if len(overrides) > 0:
+                for name, basis in overrides.items():
+                    pbones[name].matrix_basis = Matrix(basis[frame_index].tolist())
+                bpy.context.view_layer.update()
+            for bone_index, name in enumerate(bone_names):
+                matrices[bone_index, frame_index] = np.array(pbones[name].matrix)
+        for name, basis in basis_before.items():
+            pbones[name].matrix_basis = basis
+        scene.frame_set(frame_current)
+        
+        self.matrices = {name: matrices[index] for index, name in enumerate(bone_names)}
+
+    def matrix(self, name):
+        return self.matrices[name]
+
+
+# seeds: {bone name: (frames, 4, 4)} pose matrices of constrained bones
+class EvaluatorSampler():
+
+    def __init__(self, evaluator, frames, seeds=None):
+        self.evaluator = evaluator
+        self.pose = evaluator.evaluate(frames, seeds=seeds)
+
+    def matrix(self, name):
+        return self.evaluator.bone_matrices(self.pose, name)
+
+
+# vectorized PoseWriter (snapping.py): solves basis matrices of all frames from the parent chain
+class BatchPoseWriter():
+
+    def __init__(self, rig, sampler, relative_rest):
+        self.pbones = rig.pose.bones
+        self.sampler = sampler
+        # bone name: rest matrix relative to the parent's
+        self.relative_rest = relative_rest
+        self.written = {}
+        self.basis = {}
+
+    def matrix(self, name):
+        if name in self.written:
+            return self.written[name]
+        return self.sampler.matrix(name)
+
+    def set_matrix(self, name, matrices):
+        pbone = self.pbones[name]
+        rest = self.relative_rest(name)
+        if pbone.parent is not None:
+            rest = self.matrix(pbone.parent.name) @ rest
+        self.basis[name] = np.linalg.inv(rest) @ matrices
+        self.written[name] = matrices
+
+
+# (bones read, fk bones written) when snapping to ik
+def fk_to_ik_pairs(record):
+    if isinstance(record, LimbSnap):
+        return record.ik, record.fk
+    elif isinstance(record, SingleBoneSnap):
+        return (record.ik,), (record.fk,)
+    elif isinstance(record, SimpleToBaseSnap):
+        return record.base, record.fk
+
+
+# pose matrices the fk side reads when snapping to ik: parents of the snapped fk bones and the ik side
+def fk_to_ik_bones(rig, records):
+    pbones = rig.pose.bones
+    names = set()
+    for record in records:
+        sources, targets = fk_to_ik_pairs(record)
+        names.update(sources)
+        names.update(pbones[name].parent.name for name in targets if pbones[name].parent is not None)
+    return names
+
+
+# True if one of the bones follows a bone of written through its parents or constraint targets
+def follows_any(rig, bone_names, written):
+    return not followed_bones(rig, bone_names).isdisjoint(written)
+
+
+# FK_to_IK modules in passes, a module starts a new pass if the bones it reads follow fk bones written
+# in the current one, each pass is sampled with the bones written by the earlier ones applied
+def fk_to_ik_passes(rig, registry, modules):
+    passes = []
+    written = set()
+    for module in modules:
+        records = registry.snaps(module)
+        # written bones it reads itself are taken from the writer
+        names = [name for name in fk_to_ik_bones(rig, records) if name not in written]
+        if len(passes) == 0 or follows_any(rig, names, written):
+            passes.append([])
+            written = set()
+        passes[-1].append(module)
+        for record in records:
+            written.update(fk_to_ik_pairs(record)[1])
+    return passes
+
+
+# pose matrices the ik side reads when snapping to fk: the fk side, snap targets and parents of the snapped ik bones
+def ik_to_fk_bones(rig, records):
+    pbones = rig.pose.bones
+    names = set()
+    for record in records:
+        if isinstance(record, LimbSnap):
+            names.update(record.fk)
+            names.update((record.ik_snap_target, record.snap_pole_target, record.pole_target))
+            targets = (record.ik_main, record.pole_target)
+        elif isinstance(record, SingleBoneSnap):
+            names.add(record.fk)
+            targets = (record.ik,)
+        else:
+            continue
+        names.update(pbones[name].parent.name for name in targets if pbones[name].parent is not None)
+    return names
+
+
+# same as calculate_pole_target_location_pbone, on (frames, 3) arrays
+def pole_target_locations(a, b, c, pole_target_distance):
+    midpoint = (a + c) * .5
+    difference = b - midpoint
+    multiplier = pole_target_distance / np.linalg.norm(difference, axis=1)
+    return difference * multiplier[:, None] + b
+
+
+def normalized(v):
+    return v / np.linalg.norm(v, axis=1)[:, None]
+
+
+# modules: [(module, 'FK_to_IK' or 'IK_to_FK'), ...], returns the number of keyed bones,
+# evaluator: FKEvaluator of the rig to reuse (rest data)
+def convert_action(rig, modules, frames, key_buffer, evaluator=None):
+    
+    registry = snap_registry(rig)
+    if evaluator is None:
+        evaluator = FKEvaluator(rig)
+    
+    def relative_rest(name):
+        return evaluator.relative_rest[evaluator.indices[name]]
+    
+    fk_to_ik = [module for module, mode in modules if mode == 'FK_to_IK']
+    ik_to_fk = [module for module, mode in modules if mode == 'IK_to_FK']
+    keyed = 0
+    # fk bones written by FK_to_IK: pose matrices, basis matrices
+    fk_written = {}
+    fk_basis = {}
+    
+    if len(fk_to_ik) > 0:
+        # the ik/ctrl chains are sampled, even if they're muted (not switched to)
+        suspended = suspend_chain_muting(rig, fk_to_ik)
+        writer = BatchPoseWriter(rig, None, relative_rest)
+        
+        for pass_modules in fk_to_ik_passes(rig, registry, fk_to_ik):
+            records = [record for module in pass_modules for record in registry.snaps(module)]
+            writer.sampler = DepsgraphSampler(rig, frames, fk_to_ik_bones(rig, records), overrides=writer.basis)
+            for record in records:
+                sources, targets = fk_to_ik_pairs(record)
+                for fk_name, source_name in zip(targets, sources):
+                    writer.set_matrix(fk_name, writer.matrix(source_name))
+        resume_chain_muting(rig, suspended)
+        
+        for name, basis in writer.basis.items():
+            key_buffer.add_matrices(name, 'Rotation', frames, basis)
+            keyed += 1
+        fk_written = writer.written
+        fk_basis = writer.basis
+    
+    if len(ik_to_fk) > 0:
+        records = [record for module in ik_to_fk for record in registry.snaps(module)]
+        seeds = constrained_bones(rig, ik_to_fk_bones(rig, records))
+        if len(seeds) > 0:
+            suspended = suspend_chain_muting(rig, ik_to_fk)
+            seeds = DepsgraphSampler(rig, frames, seeds, overrides=fk_basis).matrices
+            resume_chain_muting(rig, suspended)
+        else:
+            seeds = {}
+        # fk bones converted above aren't in the action yet
+        seeds.update(fk_written)
+        sampler = EvaluatorSampler(evaluator, frames, seeds)
+        writer = BatchPoseWriter(rig, sampler, relative_rest)
+        keyed_bones = []
+        
+        for module in ik_to_fk:
+            for record in registry.snaps(module):
+                if isinstance(record, LimbSnap):
+                    fk_b1, fk_b2, fk_b3 = record.fk
+                    
+                    # ik target
+                    writer.set_matrix(record.ik_main, writer.matrix(record.ik_snap_target))
+                    
+                    # pole target, blended like in snap()
+                    a = writer.matrix(fk_b1)[:, :3, 3]
+                    b = writer.matrix(fk_b2)[:, :3, 3]
+                    c = writer.matrix(fk_b3)[:, :3, 3]
+                    calc_pole_pos = pole_target_locations(a, b, c, record.pole_target_distance)
+                    pole_target_pos = writer.matrix(record.snap_pole_target)[:, :3, 3]
+                    alpha = np.clip(np.sum(normalized(b - a) * normalized(c - b), axis=1), 0, 1)[:, None]
+                    pole_matrices = writer.matrix(record.pole_target).copy()
+                    pole_matrices[:, :3, 3] = lerp(calc_pole_pos, pole_target_pos, alpha)
+                    writer.set_matrix(record.pole_target, pole_matrices)
+                    
+                    keyed_bones += [record.ik_main, record.pole_target]
+                    # the end of the ik chain is keyed as it is, like in snap()
+                    key_buffer.add_matrices(record.ik[2], 'BUILTIN_KSI_LocRot', frames, evaluator.basis[evaluator.indices[record.ik[2]]])
+                    keyed += 1
+                    
+                    # roll rotation is reset
+                    if record.ik_roll is not None:
+                        roll_basis = evaluator.basis[evaluator.indices[record.ik_roll]].copy()
+                        roll_basis[:, :3, :3] = np.eye(3)
+                        key_buffer.add_matrices(record.ik_roll, 'BUILTIN_KSI_LocRot', frames, roll_basis)
+                        keyed += 1
+                
+                elif isinstance(record, SingleBoneSnap):
+                    writer.set_matrix(record.ik, writer.matrix(record.fk))
+                    keyed_bones.append(record.ik)
+        
+        for name in keyed_bones:
+            key_buffer.add_matrices(name, 'BUILTIN_KSI_LocRot', frames, writer.basis[name])
+            keyed += 1
+    
+    return keyed
+
+
+# CHECK:
+# converts the frames and snaps them one by one with snap() (like Snap and Key), then restores the pose,
+# nothing is keyed, returns the largest rotation (radians) and location error between the two
+# and the bones they're on and the number of FK_to_IK sampling passes,
+# a rig with an animated torso/shoulders covers the constrained parents,
+# the torso and the arms converted FK_to_IK together with the torso switched to fk cover modules sharing a parent
+# (more than one pass)
+def check_convert_action(rig, modules, frames):
+    from .ui import snap
+    
+    converted = KeyBuffer(rig)
+    convert_action(rig, modules, frames, converted)
+    
+    scene = bpy.context.scene
+    frame_current = scene.frame_current
+    pbones = rig.pose.bones
+    pose_basis = {pbone.name: pbone.matrix_basis.copy() for pbone in pbones}
+    snapped = KeyBuffer(rig)
+    suspended = suspend_chain_muting(rig, [module for module, mode in modules])
+    for frame in frames:
+        scene.frame_set(frame)
+        for module, mode in modules:
+            snap(mode=mode, key=True, switch=False, module_detection='MANUAL', module_name=module, force_visibility=False, key_buffer=snapped)
+    resume_chain_muting(rig, suspended)
+    for name, matrix in pose_basis.items():
+        pbones[name].matrix_basis = matrix
+    scene.frame_set(frame_current)
+    
+    # data path: (bone name, {array index: {frame: value}})
+    def channels(key_buffer):
+        paths = {}
+        for (data_path, index, bone_name), keys in key_buffer.channels.items():
+            paths.setdefault(data_path, (bone_name, {}))[1][index] = keys
+        return paths
+    
+    fk_to_ik = [module for module, mode in modules if mode == 'FK_to_IK']
+    result = {'rotation_error': 0.0, 'rotation_bone': '', 'location_error': 0.0, 'location_bone': '', 'missing': [], 
+              'passes': len(fk_to_ik_passes(rig, snap_registry(rig), fk_to_ik))
+              }
+    converted_paths = channels(converted)
+    for data_path, (bone_name, snapped_channels) in channels(snapped).items():
+        if data_path not in converted_paths:
+            result['missing'].append(data_path)
+            continue
+        converted_channels = converted_paths[data_path][1]
+        attribute = data_path.rsplit('.', 1)[-1]
+        indices = sorted(snapped_channels)
+        original = np.array([[snapped_channels[index][frame] for index in indices] for frame in frames])
+        rebuilt = np.array([[converted_channels[index][frame] for index in indices] for frame in frames])
+        error = float(transform_errors(attribute, original, rebuilt, pbones[bone_name].rotation_mode).max())
+        kind = 'location' if attribute == 'location' else 'rotation'
+        if error > result[kind + '_error']:
+            result[kind + '_error'] = error
+            result[kind + '_bone'] = bone_name
+    return result
+
+
+# BATCH:
+# jobs: [(rig, action), ...], every action is converted over its frame range with the rig's snap_n_key settings,
+# fk evaluators (rest data) and snap registries are built once per rig and reused for all its actions,
+# constrained parents are sampled per action like in convert_action,
+# tolerances: (angle, location) to reduce the keyed bones' keys with or None,
+# check: only compare with snapping (check_convert_action), nothing is keyed, returns a summary row per job
+def batch_convert(jobs, tolerances=None, check=False):
+    
+    evaluators = {}
+    summary = []
+    
+    for rig, action in jobs:
+        row = {'rig': rig.name, 'action': action.name, 'frames': 0, 'bones': 0, 'seconds': 0.0, 'skipped': '', 'keys': None, 'check': None, 'error': ''}
+        summary.append(row)
+        
+        modules = snap_n_key_modules(rig)
+        if len(modules) == 0:
+            row['skipped'] = 'no modules to snap'
+            continue
+        if rig.animation_data is None:
+            rig.animation_data_create()
+        animation_data = rig.animation_data
+        if animation_data.use_tweak_mode:
+            row['skipped'] = 'nla tweak mode'
+            continue
+        
+        start = time.perf_counter()
+        
+        # only the converted action is evaluated
+        action_before = animation_data.action
+        muted_tracks = [track for track in animation_data.nla_tracks if not track.mute]
+        for track in muted_tracks:
+            track.mute = True
+        
+        # a failed job is recorded, the rig gets its action and tracks back and the batch goes on
+        try:
+            animation_data.action = action
+            if rig.name not in evaluators:
+                evaluators[rig.name] = FKEvaluator(rig)
+            frame_start, frame_end = action.frame_range
+            frames = list(range(int(frame_start), int(frame_end) + 1))
+            if check:
+                row['check'] = check_convert_action(rig, modules, frames)
+            else:
+                key_buffer = KeyBuffer(rig)
+                row['bones'] = convert_action(rig, modules, frames, key_buffer, evaluator=evaluators[rig.name])
+                keyed_bones = key_buffer.write()
+                if tolerances is not None:
+                    # keys before and after
+                    row['keys'] = reduce_action_keys(rig, action, tolerances[0], tolerances[1], bone_names=keyed_bones)
+            row['frames'] = len(frames)
+        except Exception as error:
+            row['error'] = type(error).__name__ + ': ' + str(error)
+        finally:
+            animation_data.action = action_before
+            for track in muted_tracks:
+                track.mute = False
+        
+        row['seconds'] = time.perf_counter() - start
+    
+    return summary
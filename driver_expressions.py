@@ -0,0 +1,188 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any laTter version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+##########################################################################################################
+##########################################################################################################
+
+import ast
+
+
+# SIMPLE EXPRESSIONS:
+# Blender evaluates numbers, variables, + - * /, comparisons (chained ones too), 'and', 'or', 'not',
+# 'a if c else b' and the functions below without python. Anything else ('**', math.* calls, other functions,
+# attributes, subscripts, strings) falls back to python, which is slow and needs auto run scripts.
+# '**' and math.* calls are rewritten to the simple functions, everything else is kept as it is.
+
+simple_functions = {'min', 'max', 'abs', 'fabs', 'floor', 'ceil', 'trunc', 'int',
+                    'sin', 'cos', 'tan', 'asin', 'acos', 'atan', 'atan2',
+                    'exp', 'log', 'sqrt', 'pow', 'fmod', 'radians', 'degrees',
+                    'signum', 'smoothstep', 'lerp', 'clamp'
+                    }
+
+binary_operators = {ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/'}
+
+comparison_operators = {ast.Lt: '<', ast.LtE: '<=', ast.Gt: '>', ast.GtE: '>=', ast.Eq: '==', ast.NotEq: '!='}
+
+boolean_operators = {ast.And: 'and', ast.Or: 'or'}
+
+
+class NotSimple(Exception):
+    pass
+
+
+# returns an equivalent tree made of simple nodes only, raises NotSimple
+def simplify_node(node):
+    
+    if isinstance(node, ast.Expression):
+        return ast.Expression(body=simplify_node(node.body))
+    
+    if isinstance(node, ast.Num):
+        return node
+    
+    if isinstance(node, ast.NameConstant):
+        if node.value is True or node.value is False:
+            return ast.Num(n=int(node.value))
+        raise NotSimple
+    
+    if isinstance(node, ast.Name):
+        return node
+    
+    if isinstance(node, ast.UnaryOp):
+        operand = simplify_node(node.operand)
+        if isinstance(node.op, ast.USub):
+            return ast.UnaryOp(op=ast.USub(), operand=operand)
+        if isinstance(node.op, ast.UAdd):
+            return operand
+        if isinstance(node.op, ast.Not):
+            return ast.UnaryOp(op=ast.Not(), operand=operand)
+        raise NotSimple
+    
+    if isinstance(node, ast.BinOp):
+        left = simplify_node(node.left)
+        right = simplify_node(node.right)
+        if isinstance(node.op, ast.Pow):
+            return ast.Call(func=ast.Name(id='pow'), args=[left, right], keywords=[])
+        if type(node.op) not in binary_operators:
+            raise NotSimple
+        return ast.BinOp(left=left, op=node.op, right=right)
+    
+    if isinstance(node, ast.Compare):
+        if any(type(op) not in comparison_operators for op in node.ops):
+            raise NotSimple
+        return ast.Compare(left=simplify_node(node.left), ops=node.ops, comparators=[simplify_node(n) for n in node.comparators])
+    
+    if isinstance(node, ast.BoolOp):
+        return ast.BoolOp(op=node.op, values=[simplify_node(value) for value in node.values])
+    
+    if isinstance(node, ast.IfExp):
+        return ast.IfExp(test=simplify_node(node.test), body=simplify_node(node.body), orelse=simplify_node(node.orelse))
+    
+    if isinstance(node, ast.Call):
+        func = node.func
+        # math.sqrt(x) -> sqrt(x)
+        if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name) and func.value.id == 'math':
+            func = ast.Name(id=func.attr)
+        if not isinstance(func, ast.Name) or func.id not in simple_functions or node.keywords:
+            raise NotSimple
+        return ast.Call(func=func, args=[simplify_node(arg) for arg in node.args], keywords=[])
+    
+    raise NotSimple
+
+
+def node_text(node):
+    
+    if isinstance(node, ast.Expression):
+        return node_text(node.body)
+    if isinstance(node, ast.Num):
+        return repr(node.n)
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.UnaryOp):
+        if isinstance(node.op, ast.Not):
+            return 'not ' + operand_text(node.operand)
+        return '-' + operand_text(node.operand)
+    if isinstance(node, ast.BinOp):
+        return operand_text(node.left) + ' ' + binary_operators[type(node.op)] + ' ' + operand_text(node.right)
+    if isinstance(node, ast.Compare):
+        text = operand_text(node.left)
+        for op, comparator in zip(node.ops, node.comparators):
+            text += ' ' + comparison_operators[type(op)] + ' ' + operand_text(comparator)
+        return text
+    if isinstance(node, ast.BoolOp):
+        return (' ' + boolean_operators[type(node.op)] + ' ').join(operand_text(value) for value in node.values)
+    if isinstance(node, ast.IfExp):
+        return operand_text(node.body) + ' if ' + operand_text(node.test) + ' else ' + operand_text(node.orelse)
+    if isinstance(node, ast.Call):
+        return node.func.id + '(' + ', '.join(node_text(arg) for arg in node.args) + ')'
+
+
+# everything but atoms and calls is parenthesized when nested
+def operand_text(node):
+    text = node_text(node)
+    if isinstance(node, (ast.Num, ast.Name, ast.Call)):
+        return text
+    return '(' + text + ')'
+
+
+# returns the simple form of an expression or None if it has none
+def simple_expression(expression):
+    try:
+        tree = ast.parse(expression.strip(), mode='eval')
+        return node_text(simplify_node(tree))
+    except (SyntaxError, NotSimple):
+        return None
+
+
+def is_simple_driver(driver):
+    # reported by Blender 2.80+
+    if hasattr(driver, 'is_simple_expression'):
+        return driver.is_simple_expression
+    return simple_expression(driver.expression) is not None
+
+
+# rewrites every rig and armature driver Blender can't evaluate without python,
+# returns counts and the data paths of drivers that still need python
+def validate_drivers(rig):
+    
+    result = {'drivers': 0, 'rewritten': 0, 'python': 0, 'python_paths': []}
+    
+    for owner in (rig, rig.data):
+        if owner.animation_data is None:
+            continue
+        for fcurve in owner.animation_data.drivers:
+            driver = fcurve.driver
+            if driver.type != 'SCRIPTED':
+                continue
+            result['drivers'] += 1
+            if is_simple_driver(driver):
+                continue
+            
+            expression = simple_expression(driver.expression)
+            if expression is not None:
+                original = driver.expression
+                driver.expression = expression
+                if is_simple_driver(driver):
+                    result['rewritten'] += 1
+                    continue
+                driver.expression = original
+            
+            result['python'] += 1
+            result['python_paths'].append(fcurve.data_path + '[' + str(fcurve.array_index) + ']')
+    
+    return result
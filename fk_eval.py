@@ -0,0 +1,173 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any laTter version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+##########################################################################################################
+##########################################################################################################
+
+import bpy
+import time
+import numpy as np
+
+from .snapping import rotation_path
+from .rotations import quaternion_matrices
+from .rotations import euler_matrices
+from .rotations import axis_angle_matrices
+
+
+# OFFLINE FK EVALUATOR:
+# Evaluates the pose matrices (armature space) of all bones for a range of frames with numpy,
+# from the rest matrices and the action's f-curves, without the depsgraph.
+# Bones are plain parent/child transforms: constraints and drivers are not evaluated,
+# so the result is exact for fk chains (and any bone without constraints) only.
+# Bones are expected to inherit rotation and scale (generation resets them).
+
+
+class FKEvaluator():
+
+    def __init__(self, rig):
+        self.rig = rig
+        bones = rig.data.bones
+        
+        # parents before children
+        order = []
+        def add(bone):
+            order.append(bone)
+            for child in bone.children:
+                add(child)
+        for bone in bones:
+            if bone.parent is None:
+                add(bone)
+        
+        self.names = [bone.name for bone in order]
+        self.indices = {name: index for index, name in enumerate(self.names)}
+        self.parents = np.array([self.indices[bone.parent.name] if bone.parent is not None else -1 for bone in order])
+        
+        rest = np.array([np.array(bone.matrix_local) for bone in order])
+        # rest matrix relative to the parent's rest matrix
+        self.relative_rest = rest.copy()
+        for index, parent in enumerate(self.parents):
+            if parent >= 0:
+                self.relative_rest[index] = np.linalg.inv(rest[parent]) @ rest[index]
+
+    # (frames, channels) of a pose bone attribute, sampled from the action or the current value
+    def sample(self, fcurves, frames, pbone, attribute):
+        current = getattr(pbone, attribute)
+        values = np.empty((len(frames), len(current)))
+        for index in range(len(current)):
+            fcurve = fcurves.get(('pose.bones["' + pbone.name + '"].' + attribute, index))
+            if fcurve is not None:
+                values[:, index] = [fcurve.evaluate(frame) for frame in frames]
+            else:
+                values[:, index] = current[index]
+        return values
+
+    # local (basis) matrices, (bones, frames, 4, 4)
+    def basis_matrices(self, action, frames):
+        fcurves = {}
+        if action is not None:
+            fcurves = {(fcurve.data_path, fcurve.array_index): fcurve for fcurve in action.fcurves}
+        
+        pbones = self.rig.pose.bones
+        basis = np.zeros((len(self.names), len(frames), 4, 4))
+        basis[:, :, 3, 3] = 1
+        
+        for bone_index, name in enumerate(self.names):
+            pbone = pbones[name]
+            attribute = rotation_path(pbone)
+            values = self.sample(fcurves, frames, pbone, attribute)
+            if attribute == 'rotation_quaternion':
+                rotation = quaternion_matrices(values)
+            elif attribute == 'rotation_axis_angle':
+                rotation = axis_angle_matrices(values)
+            else:
+                rotation = euler_matrices(values, pbone.rotation_mode)
+            # location @ rotation @ scale
+            basis[bone_index, :, :3, :3] = rotation * self.sample(fcurves, frames, pbone, 'scale')[:, None, :]
+            basis[bone_index, :, :3, 3] = self.sample(fcurves, frames, pbone, 'location')
+        
+        return basis
+
+    # pose matrices (armature space) of all bones on all frames, (bones, frames, 4, 4),
+    # use matrix_world of the rig for world space,
+    # seeds: {bone name: (frames, 4, 4) pose matrices} used as they are (constrained bones sampled from the depsgraph),
+    # their children are evaluated from them
+    def evaluate(self, frames, action=None, seeds=None):
+        if action is None and self.rig.animation_data is not None:
+            action = self.rig.animation_data.action
+        
+        basis = self.basis_matrices(action, frames)
+        # kept for callers that need the local transforms too
+        self.basis = basis
+        pose = np.empty_like(basis)
+        for index, parent in enumerate(self.parents):
+            if seeds is not None and self.names[index] in seeds:
+                pose[index] = seeds[self.names[index]]
+            elif parent >= 0:
+                pose[index] = pose[parent] @ self.relative_rest[index] @ basis[index]
+            else:
+                pose[index] = self.relative_rest[index] @ basis[index]
+        return pose
+
+    def bone_matrices(self, pose, name):
+        return pose[self.indices[name]]
+
+
+# bones whose pose the evaluator can't compute from the action: for every bone, the closest of itself and its parents
+# that has constraints (binding constraints of base bones, limits of fk bones), they have to be sampled as seeds
+def constrained_bones(rig, bone_names):
+    pbones = rig.pose.bones
+    seeds = set()
+    for name in bone_names:
+        pbone = pbones[name]
+        while pbone is not None:
+            if len(pbone.constraints) > 0:
+                seeds.add(pbone.name)
+                break
+            pbone = pbone.parent
+    return seeds
+
+
+# compares the evaluator with depsgraph evaluation (frame_set) on the given bones,
+# returns seconds of both and the largest difference of a matrix element
+def benchmark(rig, frames, bone_names):
+    scene = bpy.context.scene
+    frame_current = scene.frame_current
+    
+    start = time.perf_counter()
+    evaluator = FKEvaluator(rig)
+    pose = evaluator.evaluate(frames)
+    fk_eval_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    depsgraph_pose = np.empty((len(bone_names), len(frames), 4, 4))
+    for frame_index, frame in enumerate(frames):
+        scene.frame_set(frame)
+        for bone_index, name in enumerate(bone_names):
+            depsgraph_pose[bone_index, frame_index] = np.array(rig.pose.bones[name].matrix)
+    depsgraph_seconds = time.perf_counter() - start
+    
+    scene.frame_set(frame_current)
+    
+    indices = [evaluator.indices[name] for name in bone_names]
+    return {'frames': len(frames),
+            'bones': len(evaluator.names),
+            'fk_eval_seconds': fk_eval_seconds,
+            'depsgraph_seconds': depsgraph_seconds,
+            'max_error': float(np.abs(pose[indices] - depsgraph_pose).max()) if len(bone_names) > 0 else 0.0
+            }
@@ -43,6 +43,13 @@ from .m_spring import spring_bottom
 from .m_fingers import fingers
 from .m_face import face_base
 from .m_face import face_detail
+from .utils import report
+from .utils import begin_generation
+from .utils import end_generation
+from .utils import run_module
+from .ray_cache import clear_ray_cache
+from .profiler import begin_profiling
+from .profiler import end_profiling
 
 
 class Op_GYAZ_GameRig_GenerateRig(bpy.types.Operator):
@@ -89,6 +96,18 @@ class Op_GYAZ_GameRig_GenerateRig(bpy.types.Operator):
     generate__twist_neck: BoolProperty(default=True, 
                                        name='Twist Neck'
                                        )
+    generate__changed_modules_only: BoolProperty(default=False, 
+                                                 name='Regenerate Changed Modules Only',
+                                                 description='Keep the modules of the last generation whose options and source bones have not changed'
+                                                 )
+    generate__profile: BoolProperty(default=False, 
+                                    name='Profile Generation',
+                                    description='Time modules and primitives, the report is written to the GYAZ_generation_profile text datablocks'
+                                    )
+    generate__use_ray_cache: BoolProperty(default=True, 
+                                          name='Reuse Ray Casts',
+                                          description='Reuse custom shape ray casts of the last generation if the character mesh has not changed'
+                                          )
 
     def draw(self, context):
         lay = self.layout
@@ -114,6 +133,9 @@ class Op_GYAZ_GameRig_GenerateRig(bpy.types.Operator):
         lay.label(text='Facial Rig:')
         lay.prop(self, 'generate__facial_rig', expand=True)
         lay.separator()
+        lay.prop(self, 'generate__changed_modules_only')
+        lay.prop(self, 'generate__use_ray_cache')
+        lay.prop(self, 'generate__profile')
 
     def invoke(self, context, event):
         wm = context.window_manager
@@ -163,17 +185,22 @@ class Op_GYAZ_GameRig_GenerateRig(bpy.types.Operator):
             ik_prefix = Constants.ik_prefix
             ctrl_prefix = Constants.ctrl_prefix
             
-            bvh_tree, shape_collection, merged_character_mesh = prepare()
+            if self.generate__profile:
+                begin_profiling()
+            
+            begin_generation(changed_modules_only=self.generate__changed_modules_only)
+            
+            bvh_tree, shape_collection = prepare(use_ray_cache=self.generate__use_ray_cache)
             
-            root_bone(shape_collection
-                      )
-            biped_torso(bvh_tree,
-                        shape_collection,
-                        module='spine', 
-                        chain=('hips', 'spine_1', 'spine_2', 'spine_3'), 
-                        first_parent_name='root_extract'
-                        )
-            short_neck(bvh_tree, 
+            run_module('root', root_bone, shape_collection
+                       )
+            run_module('torso', biped_torso, bvh_tree,
+                       shape_collection,
+                       module='spine', 
+                       chain=('hips', 'spine_1', 'spine_2', 'spine_3'), 
+                       first_parent_name='root_extract'
+                       )
+            run_module('neck', short_neck, bvh_tree, 
                        shape_collection, 
                        module='spine', 
                        bone_name='neck', 
@@ -182,29 +209,29 @@ class Op_GYAZ_GameRig_GenerateRig(bpy.types.Operator):
                        ik_loc_bone_name=ik_prefix + 'spine_3', 
                        use_twist=generate__twist_neck
                        )
-            head(bvh_tree, 
-                 shape_collection, 
-                 module='spine', 
-                 bone_name='head', 
-                 ik_rot_bone_name=ctrl_prefix + 'neck', 
-                 ik_loc_bone_name=ik_prefix + 'neck', 
-                 distributor_parent_name=ctrl_prefix + 'torso'
-                 )
-            ik_prop_bone(bvh_tree,
-                         shape_collection,
-                         name='ik_hand_prop', 
-                         source_bone_name='hand_r', 
-                         parent_name='root_extract'
-                         )
+            run_module('head', head, bvh_tree, 
+                       shape_collection, 
+                       module='spine', 
+                       bone_name='head', 
+                       ik_rot_bone_name=ctrl_prefix + 'neck', 
+                       ik_loc_bone_name=ik_prefix + 'neck', 
+                       distributor_parent_name=ctrl_prefix + 'torso'
+                       )
+            run_module('ik_hand_prop', ik_prop_bone, bvh_tree,
+                       shape_collection,
+                       name='ik_hand_prop', 
+                       source_bone_name='hand_r', 
+                       parent_name='root_extract'
+                       )
             if generate__spring_belly:
-                spring_belly(bvh_tree, 
-                             shape_collection, 
-                             module='spring', 
-                             waist_bone_names=['spine_1', 'spine_2'], 
-                             loc_pelvis_front='loc_pelvis_front', 
-                             loc_sternum_lower='loc_sternum_lower'
-                             )
-            touch_bone(bvh_tree, 
+                run_module('spring_belly', spring_belly, bvh_tree, 
+                           shape_collection, 
+                           module='spring', 
+                           waist_bone_names=['spine_1', 'spine_2'], 
+                           loc_pelvis_front='loc_pelvis_front', 
+                           loc_sternum_lower='loc_sternum_lower'
+                           )
+            run_module('touch_torso', touch_bone, bvh_tree, 
                        shape_collection, 
                        module='spine', 
                        source_bone_name='ctrl_torso', 
@@ -212,76 +239,76 @@ class Op_GYAZ_GameRig_GenerateRig(bpy.types.Operator):
                        side='_c', 
                        bone_shape_up=False
                        )
-            chain_target(bvh_tree, 
-                         shape_collection, 
-                         fk_chain=[fk_prefix + 'neck', fk_prefix + 'head'], 
-                         ik_chain=['ctrl_neck', 'ctrl_head'], 
-                         chain_target_distance=Constants.head_target_distance, 
-                         chain_target_size=Constants.head_target_size, 
-                         target_name='target_head', 
-                         bone_shape_name='sphere', 
-                         use_copy_loc=False, 
-                         copy_loc_target_bone_name='', 
-                         add_constraint_to_layer=True, 
-                         module='spine', 
-                         prop_name='visible_spine_targets'
-                         )
-            chain_target(bvh_tree, 
-                         shape_collection, 
-                         fk_chain=[fk_prefix + 'hips', fk_prefix + 'spine_1', fk_prefix + 'spine_2', fk_prefix + 'spine_3'], 
-                         ik_chain=['ctrl_chest'], 
-                         chain_target_distance=Constants.chest_target_distance, 
-                         chain_target_size=Constants.chest_target_size, 
-                         target_name='target_chest', 
-                         bone_shape_name='cube', 
-                         use_copy_loc=True, 
-                         copy_loc_target_bone_name='target_head', 
-                         add_constraint_to_layer=False, 
-                         module='spine', 
-                         prop_name='visible_spine_targets'
-                         )
+            run_module('target_head', chain_target, bvh_tree, 
+                       shape_collection, 
+                       fk_chain=[fk_prefix + 'neck', fk_prefix + 'head'], 
+                       ik_chain=['ctrl_neck', 'ctrl_head'], 
+                       chain_target_distance=Constants.head_target_distance, 
+                       chain_target_size=Constants.head_target_size, 
+                       target_name='target_head', 
+                       bone_shape_name='sphere', 
+                       use_copy_loc=False, 
+                       copy_loc_target_bone_name='', 
+                       add_constraint_to_layer=True, 
+                       module='spine', 
+                       prop_name='visible_spine_targets'
+                       )
+            run_module('target_chest', chain_target, bvh_tree, 
+                       shape_collection, 
+                       fk_chain=[fk_prefix + 'hips', fk_prefix + 'spine_1', fk_prefix + 'spine_2', fk_prefix + 'spine_3'], 
+                       ik_chain=['ctrl_chest'], 
+                       chain_target_distance=Constants.chest_target_distance, 
+                       chain_target_size=Constants.chest_target_size, 
+                       target_name='target_chest', 
+                       bone_shape_name='cube', 
+                       use_copy_loc=True, 
+                       copy_loc_target_bone_name='target_head', 
+                       add_constraint_to_layer=False, 
+                       module='spine', 
+                       prop_name='visible_spine_targets'
+                       )
                          
             for side in Constants.sides:
-                biped_arm(bvh_tree, 
-                          shape_collection, 
-                          module='arm' + side, 
-                          chain=('shoulder' + side, 'upperarm' + side, 'forearm' + side, 'hand' + side),
-                          pole_target_name='elbow' + side, 
-                          forearm_bend_back_limit=30, 
-                          ik_hand_parent_name='ik_hand_prop', 
-                          pole_target_parent_name='root_extract',
-                          side=side,
-                          upperarm_twist_count=generate__twist_upperarm_count, 
-                          forearm_twist_count=generate__twist_forearm_count
-                          )
-                biped_leg(bvh_tree, 
-                          shape_collection, 
-                          module='leg' + side, 
-                          chain=['thigh' + side, 'shin' + side, 'foot' + side, 'toes' + side],
-                          pole_target_name='knee' + side, 
-                          shin_bend_back_limit=0, 
-                          ik_foot_parent_name='root_extract', 
-                          pole_target_parent_name='root_extract', 
-                          side=side, 
-                          thigh_twist_count=generate__twist_thigh_count, 
-                          shin_twist_count=generate__twist_shin_count
-                          )
+                run_module('arm' + side, biped_arm, bvh_tree, 
+                           shape_collection, 
+                           module='arm' + side, 
+                           chain=('shoulder' + side, 'upperarm' + side, 'forearm' + side, 'hand' + side),
+                           pole_target_name='elbow' + side, 
+                           forearm_bend_back_limit=30, 
+                           ik_hand_parent_name='ik_hand_prop', 
+                           pole_target_parent_name='root_extract',
+                           side=side,
+                           upperarm_twist_count=generate__twist_upperarm_count, 
+                           forearm_twist_count=generate__twist_forearm_count
+                           )
+                run_module('leg' + side, biped_leg, bvh_tree, 
+                           shape_collection, 
+                           module='leg' + side, 
+                           chain=['thigh' + side, 'shin' + side, 'foot' + side, 'toes' + side],
+                           pole_target_name='knee' + side, 
+                           shin_bend_back_limit=0, 
+                           ik_foot_parent_name='root_extract', 
+                           pole_target_parent_name='root_extract', 
+                           side=side, 
+                           thigh_twist_count=generate__twist_thigh_count, 
+                           shin_twist_count=generate__twist_shin_count
+                           )
                 if generate__spring_chest:
-                    spring_chest(bvh_tree, 
-                                 shape_collection, 
-                                 module='spring', 
-                                 chest_name='spring_chest' + side, 
-                                 shoulder_name='shoulder' + side
-                                 )
+                    run_module('spring_chest' + side, spring_chest, bvh_tree, 
+                               shape_collection, 
+                               module='spring', 
+                               chest_name='spring_chest' + side, 
+                               shoulder_name='shoulder' + side
+                               )
                 if generate__spring_bottom:
-                    spring_bottom(bvh_tree, 
-                                  shape_collection, 
-                                  module='spring', 
-                                  source_bone_name='thigh' + side, 
-                                  parent_name='hips', 
-                                  side=side,
-                                  )
-                touch_bone(bvh_tree, 
+                    run_module('spring_bottom' + side, spring_bottom, bvh_tree, 
+                               shape_collection, 
+                               module='spring', 
+                               source_bone_name='thigh' + side, 
+                               parent_name='hips', 
+                               side=side,
+                               )
+                run_module('touch_hand' + side, touch_bone, bvh_tree, 
                            shape_collection, 
                            module='arm' + side, 
                            source_bone_name='hand' + side, 
@@ -289,7 +316,7 @@ class Op_GYAZ_GameRig_GenerateRig(bpy.types.Operator):
                            side=side, 
                            bone_shape_up=False
                            )
-                touch_bone(bvh_tree, 
+                run_module('touch_foot' + side, touch_bone, bvh_tree, 
                            shape_collection, 
                            module='leg' + side, 
                            source_bone_name='foot' + side, 
@@ -297,28 +324,47 @@ class Op_GYAZ_GameRig_GenerateRig(bpy.types.Operator):
                            side=side, 
                            bone_shape_up=True
                            )
-                if generate__fingers:
-                    fingers(bvh_tree,
-                            shape_collection, 
-                            module='fingers' + side, 
-                            finger_names=['thumb', 'pointer', 'middle', 'ring', 'pinky'], 
-                            side=side
-                            )
             
             if generate__face_eyes:
-                face_base(bvh_tree,
-                          shape_collection, 
-                          module='face', 
-                          use_jaw=generate__face_jaw, 
-                          parent_name='head'
-                          )
+                run_module('face_base', face_base, bvh_tree,
+                           shape_collection, 
+                           module='face', 
+                           use_jaw=generate__face_jaw, 
+                           parent_name='head'
+                           )
                 if generate__face_detail:
-                    face_detail(bvh_tree,
-                                shape_collection, 
-                                module='face'
-                                )
+                    run_module('face_detail', face_detail, bvh_tree,
+                               shape_collection, 
+                               module='face'
+                               )
+            
+            # no module builds on the face or the fingers, they come last so regenerating
+            # changed modules only (which rebuilds every module after the first changed one) doesn't rebuild the limbs
+            if generate__fingers:
+                for side in Constants.sides:
+                    run_module('fingers' + side, fingers, bvh_tree,
+                               shape_collection, 
+                               module='fingers' + side, 
+                               finger_names=['thumb', 'pointer', 'middle', 'ring', 'pinky'], 
+                               side=side
+                               )
+            
+            finalize(bvh_tree=bvh_tree, 
+                     shape_collection=shape_collection
+                     )
             
-            finalize(merged_character_mesh=merged_character_mesh)
+            stats = end_generation()
+            if self.generate__profile:
+                profile = end_profiling(stats)
+                report(self, 'Generation profile (%.2f s) written to the GYAZ_generation_profile text.' % profile['seconds'], 'INFO')
+            driver_check = stats['driver_check']
+            if driver_check['python'] > 0:
+                report(self, str(driver_check['python']) + ' drivers need python to evaluate (see console).', 'WARNING')
+                print('GYAZ Game Rigger, drivers that need python:')
+                for path in driver_check['python_paths']:
+                    print('    ' + path)
+            ray_stats = bvh_tree.stats()
+            report(self, 'Rig generated: ' + str(stats['modules_built']) + ' modules built, ' + str(stats['modules_kept']) + ' kept, ' + str(stats['mode_switches']) + ' mode switches, ' + str(stats['drivers']) + ' drivers (' + str(driver_check['rewritten']) + ' rewritten, ' + str(driver_check['python']) + ' need python), ray cache: ' + str(ray_stats['hits']) + ' hits, ' + str(ray_stats['misses']) + ' misses.', 'INFO')
 
         # safety checks
         obj = bpy.context.object
@@ -350,6 +396,18 @@ class Op_GYAZ_GameRig_GenerateRig(bpy.types.Operator):
         return {'FINISHED'}
 
 
+class Op_GYAZ_GameRig_ClearRayCache(bpy.types.Operator):
+    bl_idname = "object.gyaz_game_rigger_clear_ray_cache"
+    bl_label = "GYAZ Game Rigger: Clear Ray Cache"
+    bl_description = "Forget the stored custom shape ray casts of the active rig"
+
+    def execute(self, context):
+        obj = bpy.context.object
+        if obj is not None and obj.type == 'ARMATURE':
+            clear_ray_cache(obj)
+        return {'FINISHED'}
+
+
 #######################################################
 #######################################################
 
@@ -357,10 +415,12 @@ class Op_GYAZ_GameRig_GenerateRig(bpy.types.Operator):
 
 def register():
     bpy.utils.register_class(Op_GYAZ_GameRig_GenerateRig)
+    bpy.utils.register_class(Op_GYAZ_GameRig_ClearRayCache)
 
 
 def unregister():
     bpy.utils.unregister_class(Op_GYAZ_GameRig_GenerateRig)
+    bpy.utils.unregister_class(Op_GYAZ_GameRig_ClearRayCache)
 
 
 if __name__ == "__main__":
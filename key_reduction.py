@@ -0,0 +1,170 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any laTter version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+##########################################################################################################
+##########################################################################################################
+
+import numpy as np
+
+from .rotations import quaternion_matrices
+from .rotations import euler_matrices
+from .rotations import axis_angle_matrices
+
+
+# KEY REDUCTION:
+# Removes keys of dense bone animation (Snap & Key, action converters) that can be rebuilt from their neighbours.
+# Errors are measured on the bone's pose, not on raw channel values: the angle between the rotations
+# (rotation channels of a bone are taken together, quaternions normalized like Blender does)
+# and the distance between the locations in world space (the tolerance is a scene distance).
+# A bone's own rotation error is the same angle in pose space, whatever its parents do.
+# Kept keys are chosen like Ramer-Douglas-Peucker does, with channels interpolated between kept keys
+# one by one, kept keys followed by removed ones are made linear so the curves are evaluated the way the errors were measured.
+
+def rotation_attribute(rotation_mode):
+    if rotation_mode == 'QUATERNION':
+        return 'rotation_quaternion'
+    elif rotation_mode == 'AXIS_ANGLE':
+        return 'rotation_axis_angle'
+    return 'rotation_euler'
+
+
+def rotation_matrices(attribute, values, rotation_mode):
+    if attribute == 'rotation_quaternion':
+        return quaternion_matrices(values)
+    elif attribute == 'rotation_axis_angle':
+        return axis_angle_matrices(values)
+    return euler_matrices(values, rotation_mode)
+
+
+# error of every frame, (frames,)
+def transform_errors(attribute, original, rebuilt, rotation_mode):
+    if attribute == 'location':
+        return np.linalg.norm(original - rebuilt, axis=1)
+    difference = np.transpose(rotation_matrices(attribute, original, rotation_mode), (0, 2, 1)) @ rotation_matrices(attribute, rebuilt, rotation_mode)
+    cos = (np.trace(difference, axis1=1, axis2=2) - 1) * .5
+    return np.arccos(np.clip(cos, -1, 1))
+
+
+# indices of the keys to keep
+def kept_keys(attribute, frames, values, tolerance, rotation_mode):
+    count = len(frames)
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+    
+    segments = [(0, count - 1)]
+    while len(segments) > 0:
+        first, last = segments.pop()
+        if last - first < 2:
+            continue
+        inner = slice(first + 1, last)
+        alpha = ((frames[inner] - frames[first]) / (frames[last] - frames[first]))[:, None]
+        rebuilt = values[first] * (1 - alpha) + values[last] * alpha
+        errors = transform_errors(attribute, values[inner], rebuilt, rotation_mode)
+        worst = int(np.argmax(errors))
+        if errors[worst] > tolerance:
+            split = first + 1 + worst
+            keep[split] = True
+            segments += [(first, split), (split, last)]
+    
+    return np.nonzero(keep)[0]
+
+
+def bone_name_of(data_path):
+    return data_path[12:].split('"]', 1)[0]
+
+
+# location and rotation keys of the rig's bones in action (any GYAZ rig action),
+# channels of rotation modes the bones don't use are left alone,
+# bone_names: only reduce these bones (None: all), returns key counts before and after
+def reduce_action_keys(rig, action, angle_tolerance, location_tolerance, bone_names=None):
+    rotation_modes = {pbone.name: pbone.rotation_mode for pbone in rig.pose.bones}
+    world_matrix = np.array(rig.matrix_world.to_3x3())
+    
+    # (bone name, attribute): [fcurves]
+    groups = {}
+    for fcurve in action.fcurves:
+        if fcurve.data_path.startswith('pose.bones["'):
+            bone_name = bone_name_of(fcurve.data_path)
+            attribute = fcurve.data_path.rsplit('.', 1)[-1]
+            if (bone_names is None or bone_name in bone_names) and bone_name in rotation_modes:
+                if attribute in ('location', rotation_attribute(rotation_modes[bone_name])):
+                    groups.setdefault((bone_name, attribute), []).append(fcurve)
+    
+    before = 0
+    after = 0
+    for (bone_name, attribute), fcurves in groups.items():
+        # frames of all channels, channels without a key on a frame are evaluated there
+        keys = {}
+        for fcurve in fcurves:
+            co = [0.0] * (len(fcurve.keyframe_points) * 2)
+            fcurve.keyframe_points.foreach_get('co', co)
+            keys[fcurve] = co
+        frames = np.array(sorted(set(frame for co in keys.values() for frame in co[0::2])))
+        if len(frames) < 3:
+            for fcurve in fcurves:
+                before += len(fcurve.keyframe_points)
+                after += len(fcurve.keyframe_points)
+            continue
+        
+        size = 4 if attribute in ('rotation_quaternion', 'rotation_axis_angle') else 3
+        # missing channels have their default value
+        values = np.zeros((len(frames), size))
+        if attribute == 'rotation_quaternion':
+            values[:, 0] = 1
+        elif attribute == 'rotation_axis_angle':
+            values[:, 2] = 1
+        for fcurve, co in keys.items():
+            if fcurve.array_index < size:
+                if len(co) == len(frames) * 2:
+                    values[:, fcurve.array_index] = co[1::2]
+                else:
+                    values[:, fcurve.array_index] = [fcurve.evaluate(frame) for frame in frames]
+        
+        # bone space locations to world space (rest orientation, object transform), linear so keys are chosen the same way
+        if attribute == 'location':
+            values = values @ (world_matrix @ np.array(rig.data.bones[bone_name].matrix_local.to_3x3())).T
+        
+        tolerance = location_tolerance if attribute == 'location' else angle_tolerance
+        kept = set(frames[kept_keys(attribute, frames, values, tolerance, rotation_modes[bone_name])].tolist())
+        
+        for fcurve in fcurves:
+            points = fcurve.keyframe_points
+            before += len(points)
+            # the segments that lost keys are made linear, the way their errors were measured,
+            # the interpolation of the others (hand made curves) is left alone
+            removed = []
+            linear = []
+            previous = None
+            for point in points:
+                if point.co[0] in kept:
+                    previous = point
+                else:
+                    removed.append(point)
+                    if previous is not None:
+                        linear.append(previous)
+                        previous = None
+            for point in linear:
+                point.interpolation = 'LINEAR'
+            # last one first so the others stay valid
+            for point in reversed(removed):
+                points.remove(point, fast=True)
+            fcurve.update()
+            after += len(points)
+    
+    return before, after
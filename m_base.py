@@ -21,6 +21,8 @@
 ##########################################################################################################
 
 import bpy
+import hashlib
+import numpy as np
 from mathutils.bvhtree import BVHTree
 from mathutils import Vector
 
@@ -31,26 +33,72 @@ from .utils import link_collection
 from .utils import prop_to_drive_layer
 from .utils import duplicate_bone
 from .utils import set_bone_only_layer
+from .utils import set_mode
+from .utils import apply_rig_spec
+from .utils import is_incremental_generation
+from .utils import get_spec
+from .ray_cache import load_ray_cache
+from .module_index import module_index
+from .prop_store import store_prop_defaults
+from .ray_cache import clear_ray_cache
+
+
+# BVHTree of all character meshes in world space, built from the mesh arrays (no temporary objects)
+# returns the tree and a fingerprint of the geometry
+def character_bvh_tree(meshes):
+    
+    vertex_arrays = []
+    triangle_arrays = []
+    vertex_offset = 0
+    
+    for obj in meshes:
+        mesh = obj.data
+        mesh.calc_loop_triangles()
+        
+        vertex_count = len(mesh.vertices)
+        co = np.empty(vertex_count * 3, dtype=np.float32)
+        mesh.vertices.foreach_get('co', co)
+        co = co.reshape(-1, 3)
+        
+        triangles = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get('vertices', triangles)
+        
+        # to world space
+        mat = np.array(obj.matrix_world)
+        vertex_arrays.append(co @ mat[:3, :3].T + mat[:3, 3])
+        triangle_arrays.append(triangles.reshape(-1, 3) + vertex_offset)
+        vertex_offset += vertex_count
+        
+    vertices = np.concatenate(vertex_arrays) if len(vertex_arrays) > 0 else np.zeros((0, 3))
+    triangles = np.concatenate(triangle_arrays) if len(triangle_arrays) > 0 else np.zeros((0, 3), dtype=np.int32)
+    
+    fingerprint = hashlib.md5(vertices.astype(np.float32).tobytes() + triangles.astype(np.int32).tobytes()).hexdigest()
+    
+    return BVHTree.FromPolygons(vertices.tolist(), triangles.tolist()), fingerprint
 
 
-def prepare():
+def prepare(use_ray_cache=True):
     
     rig = bpy.context.object
+    
+    # incremental generation keeps the drivers, constraints and layers of unchanged modules
+    incremental = is_incremental_generation()
 
     # remove all drivers
-    rig.animation_data_clear()
-    rig.data.animation_data_clear()
+    if not incremental:
+        rig.animation_data_clear()
+        rig.data.animation_data_clear()
 
     # GYAZ stamp
     rig.data['GYAZ_rig'] = True
     
-    if bpy.context.mode != 'OBJECT':
-        bpy.ops.object.mode_set(mode='OBJECT')
+    set_mode('OBJECT')
         
-    for bone in rig.data.bones:
-        set_bone_only_layer(bone_name=bone.name, 
-                            layer_index=Constants.source_layer
-                            )
+    if not incremental:
+        for bone in rig.data.bones:
+            set_bone_only_layer(bone_name=bone.name, 
+                                layer_index=Constants.source_layer
+                                )
 
     # make all bone layers visible
     for n in range(0, 32):
@@ -67,16 +115,14 @@ def prepare():
     rig.show_in_front = False
     rig.data.use_deform_delay = False
 
-    create_module_prop_bone(module='general')
-
     # delete constraints from all bones, should any exist
-    bpy.ops.object.mode_set(mode='POSE')
-    pbones = rig.pose.bones
-    for pbone in pbones:
-        cs = pbone.constraints
-        if len(cs) > 0:
-            for c in cs:
-                cs.remove(c)
+    if not incremental:
+        pbones = rig.pose.bones
+        for pbone in pbones:
+            cs = pbone.constraints
+            if len(cs) > 0:
+                for c in cs:
+                    cs.remove(c)
 
     # lock mesh transforms
     for child in rig.children:
@@ -92,69 +138,46 @@ def prepare():
             child.lock_scale[2] = True
             
     # MESH FOR RAY CASTING:
-    # create new object from character meshes and make a BVHTree from it
-    bpy.ops.object.mode_set(mode='OBJECT')
-    bpy.ops.object.select_all(action='DESELECT')
-    for mesh in rig.children:
-        if mesh.type == 'MESH':
-            mesh.hide_select = False
-            mesh.select_set(True)
-    bpy.context.view_layer.objects.active = rig.children[0]
-    bpy.ops.object.duplicate_move()
-    bpy.ops.object.join()
-    bpy.ops.object.transform_apply(location=True, rotation=True, scale=True)
-
-    merged_character_mesh = bpy.context.active_object
-
-    bvh_tree = BVHTree.FromObject(bpy.context.scene.objects[merged_character_mesh.name], bpy.context.depsgraph)
-
-    bpy.ops.object.select_all(action='DESELECT')
-    rig.select_set(True)
-    bpy.context.view_layer.objects.active = rig
+    bvh_tree, mesh_fingerprint = character_bvh_tree([child for child in rig.children if child.type == 'MESH'])
+    # ray results of earlier generations (dropped if the mesh has changed)
+    if not use_ray_cache:
+        clear_ray_cache(rig)
+    bvh_tree = load_ray_cache(rig, bvh_tree, mesh_fingerprint)
         
     # SHAPE COLLECTION
     link_collection('GYAZ_game_rigger_widgets', Constants.source_path)
     
     # BONE GROUPS
-    bpy.ops.object.mode_set(mode='POSE')
     bgroups = rig.pose.bone_groups
-
-    bg = bgroups.new(name=Constants.base_group)
-    bg.color_set = Constants.base_group_color_set
-
-    bg = bgroups.new(name=Constants.fk_group)
-    bg.color_set = Constants.fk_group_color_set
-
-    bg = bgroups.new(name=Constants.central_ik_group)
-    bg.color_set = Constants.central_ik_group_color_set
-
-    bg = bgroups.new(name=Constants.left_ik_group)
-    bg.color_set = Constants.left_ik_group_color_set
-
-    bg = bgroups.new(name=Constants.right_ik_group)
-    bg.color_set = Constants.right_ik_group_color_set
-
-    bg = bgroups.new(name=Constants.twist_group)
-    bg.color_set = Constants.twist_group_color_set
-
-    bg = bgroups.new(name=Constants.spring_group)
-    bg.color_set = Constants.spring_group_color_set
-
-    bg = bgroups.new(name=Constants.ik_prop_group)
-    bg.color_set = Constants.ik_prop_group_color_set
-
-    bg = bgroups.new(name=Constants.face_group)
-    bg.color_set = Constants.face_group_color_set
-
-    bg = bgroups.new(name=Constants.target_group)
-    bg.color_set = Constants.target_group_color_set
+    
+    groups = ((Constants.base_group, Constants.base_group_color_set),
+              (Constants.fk_group, Constants.fk_group_color_set),
+              (Constants.central_ik_group, Constants.central_ik_group_color_set),
+              (Constants.left_ik_group, Constants.left_ik_group_color_set),
+              (Constants.right_ik_group, Constants.right_ik_group_color_set),
+              (Constants.twist_group, Constants.twist_group_color_set),
+              (Constants.spring_group, Constants.spring_group_color_set),
+              (Constants.ik_prop_group, Constants.ik_prop_group_color_set),
+              (Constants.face_group, Constants.face_group_color_set),
+              (Constants.target_group, Constants.target_group_color_set)
+              )
+    
+    for name, color_set in groups:
+        # kept from the last generation
+        if bgroups.get(name) is not None:
+            continue
+        bg = bgroups.new(name=name)
+        bg.color_set = color_set
+    
+    # from here on the rig stays in edit mode until all modules are done
+    create_module_prop_bone(module='general')
             
 
-    return bvh_tree, bpy.data.collections['GYAZ_game_rigger_widgets'], merged_character_mesh
+    return bvh_tree, bpy.data.collections['GYAZ_game_rigger_widgets']
 
 
 
-def finalize(merged_character_mesh):
+def finalize(bvh_tree, shape_collection):
     
     rig = bpy.context.object
 
@@ -234,6 +257,11 @@ def finalize(merged_character_mesh):
                         expression='v1'
                         )
 
+    # all modules are laid out in edit mode, write the pose side of the rig in one go
+    apply_rig_spec(bvh_tree, shape_collection)
+    
+    bvh_tree.store(rig)
+
     visible_layers = set()
     visible_layers = visible_layers.union({Constants.fk_layer, Constants.ctrl_ik_layer, Constants.touch_layer})
     all_layers = set(n for n in range(32))
@@ -245,11 +273,9 @@ def finalize(merged_character_mesh):
     for n in hidden_layers:
         rig.data.layers[n] = False
 
-    bpy.data.objects.remove(merged_character_mesh, do_unlink=True)
-
     rig.show_in_front = False
 
-    bpy.ops.object.mode_set(mode='POSE')
+    set_mode('POSE')
 
     rig['snap_start'] = 1
     rig['snap_end'] = 250
@@ -274,16 +300,12 @@ def finalize(merged_character_mesh):
     if 'temp' in rig.data:
         del rig.data['temp']
 
-    # save default values of all props
-    prop_info = []
-
-    for pbone in pbones:
-        for key in pbone.keys():
-            if key != '_RNA_UI':
-                info = {'bone': pbone.name, 'key': key, 'value': pbone[key]}
-                prop_info.append(info)
+    # save default values of all props,
+    # props of kept modules weren't rewritten, their stored defaults are kept
+    store_prop_defaults(rig, written=get_spec().props if is_incremental_generation() else None)
 
-    rig.data['prop_defaults'] = prop_info
+    # bone lookups of the ui operators
+    module_index(rig, rebuild=True)
 
     # rig has been generated successfuly
     rig.data['GYAZ_rig_generated'] = 1
@@ -294,7 +316,7 @@ def root_bone(shape_collection):
     rig = bpy.context.object
 
     name = 'root'
-    bpy.ops.object.mode_set(mode='EDIT')
+    set_mode('EDIT')
     ebone = rig.data.edit_bones.new(name=name)
     ebone.head = Vector((0, 0, 0))
     ebone.tail = ebone.head + Vector((0, Constants.root_size, 0))
@@ -309,7 +331,6 @@ def root_bone(shape_collection):
                   )
 
     name = 'root_extract'
-    bpy.ops.object.mode_set(mode='EDIT')
     ebone = rig.data.edit_bones.new(name=name)
     ebone.head = Vector((0, 0, 0))
     ebone.tail = ebone.head + Vector((0, Constants.root_extract_size, 0))
@@ -38,6 +38,9 @@ from .utils import get_ik_group_name
 from .utils import snappable_module
 from .utils import create_twist_bones
 from .utils import get_parent_name
+from .utils import set_mode
+from .utils import add_constraint
+from .utils import set_snap_info
 
 
 def biped_arm(bvh_tree, shape_collection, module, chain, pole_target_name, forearm_bend_back_limit, ik_hand_parent_name, pole_target_parent_name, side, upperarm_twist_count, forearm_twist_count):
@@ -63,7 +66,7 @@ def biped_arm(bvh_tree, shape_collection, module, chain, pole_target_name, forea
 
     # LOW-LEVEL BONES
     # set parents
-    bpy.ops.object.mode_set(mode='EDIT')
+    set_mode('EDIT')
     ebones = rig.data.edit_bones
     ebones[shoulder_name].parent = ebones[first_parent_name]
     ebones[upperarm_name].parent = ebones[shoulder_name]
@@ -104,17 +107,14 @@ def biped_arm(bvh_tree, shape_collection, module, chain, pole_target_name, forea
     relevant_bone_names.append(name)
 
     # bind low-level bones to FK constraints
-    bpy.ops.object.mode_set(mode='POSE')
-    pbone = rig.pose.bones[shoulder_name]
-
-    c = pbone.constraints.new('COPY_ROTATION')
-    c.name = 'bind_to_fk_1'
-    c.target = rig
-    c.subtarget = fk_prefix + shoulder_name
-    c.mute = True
+    add_constraint(bone_name=shoulder_name,
+                   type='COPY_ROTATION',
+                   name='bind_to_fk_1',
+                   subtarget=fk_prefix + shoulder_name,
+                   mute=True
+                   )
 
     # filler bones (needed for GYAZ retargeter)
-    bpy.ops.object.mode_set(mode='EDIT')
     filler_name = 'fk_filler_' + shoulder_name
     ebone = rig.data.edit_bones.new(filler_name)
     ebones = rig.data.edit_bones
@@ -151,14 +151,12 @@ def biped_arm(bvh_tree, shape_collection, module, chain, pole_target_name, forea
     relevant_bone_names.append(name)
 
     # bind low-level bones to IK constraints
-    bpy.ops.object.mode_set(mode='POSE')
-    pbone = rig.pose.bones[shoulder_name]
-
-    c = pbone.constraints.new('COPY_ROTATION')
-    c.name = 'bind_to_ik_1'
-    c.target = rig
-    c.subtarget = ik_prefix + shoulder_name
-    c.mute = True
+    add_constraint(bone_name=shoulder_name,
+                   type='COPY_ROTATION',
+                   name='bind_to_ik_1',
+                   subtarget=ik_prefix + shoulder_name,
+                   mute=True
+                   )
 
     # BIND TO (0: FK, 1: IK, 2:BIND)
     prop_to_drive_constraint(prop_bone_name=prop_bone_name, 
@@ -190,9 +188,7 @@ def biped_arm(bvh_tree, shape_collection, module, chain, pole_target_name, forea
                     )
 
     # SNAP INFO
-    bpy.ops.object.mode_set(mode='POSE')
-    pbone = rig.pose.bones[prop_bone_name]
-    pbone['snapinfo_singlebone_0'] = [fk_prefix + shoulder_name, ik_prefix + shoulder_name]
+    set_snap_info(prop_bone_name, 'snapinfo_singlebone_0', [fk_prefix + shoulder_name, ik_prefix + shoulder_name])
 
     # three bone limb set-up
     three_bone_limb(bvh_tree, 
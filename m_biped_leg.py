@@ -43,6 +43,10 @@ from .utils import prop_to_drive_pbone_attribute_with_array_index
 from .utils import prop_to_drive_pbone_attribute_with_array_index
 from .utils import create_twist_bones
 from .utils import snappable_module
+from .utils import set_mode
+from .utils import add_constraint
+from .utils import set_snap_info
+from .utils import get_spec
 
 
 def biped_leg(bvh_tree, shape_collection, module, chain, pole_target_name, shin_bend_back_limit, ik_foot_parent_name, pole_target_parent_name, side, thigh_twist_count, shin_twist_count):
@@ -77,8 +81,8 @@ def biped_leg(bvh_tree, shape_collection, module, chain, pole_target_name, shin_
 
     # LOW-LEVEL BONES
     # set parents
+    set_mode('EDIT')
     for index, name in enumerate(chain):
-        bpy.ops.object.mode_set(mode='EDIT')
         ebones = rig.data.edit_bones
         if index == 0:
             ebones[name].parent = ebones[first_parent_name]
@@ -142,14 +146,12 @@ def biped_leg(bvh_tree, shape_collection, module, chain, pole_target_name, shin_
     relevant_bone_names.append(name)
 
     # bind low-level bones to FK constraints
-    bpy.ops.object.mode_set(mode='POSE')
-    pbone = rig.pose.bones[toes_name]
-
-    c = pbone.constraints.new('COPY_ROTATION')
-    c.name = 'bind_to_fk_1'
-    c.target = rig
-    c.subtarget = fk_prefix + toes_name
-    c.mute = True
+    add_constraint(bone_name=toes_name,
+                   type='COPY_ROTATION',
+                   name='bind_to_fk_1',
+                   subtarget=fk_prefix + toes_name,
+                   mute=True
+                   )
 
     # lock toe axes
     if toes_bend_axis == 'X' or toes_bend_axis == '-X':
@@ -170,7 +172,6 @@ def biped_leg(bvh_tree, shape_collection, module, chain, pole_target_name, shin_
                                                        )
 
     # filler bones (needed for GYAZ retargeter)
-    bpy.ops.object.mode_set(mode='EDIT')
     filler_name = 'fk_filler_' + thigh_name
     ebone = rig.data.edit_bones.new(name=filler_name)
     ebones = rig.data.edit_bones
@@ -222,14 +223,12 @@ def biped_leg(bvh_tree, shape_collection, module, chain, pole_target_name, shin_
                                                        )
 
     # bind low-level bones to IK constraints
-    bpy.ops.object.mode_set(mode='POSE')
-    pbone = rig.pose.bones[toes_name]
-
-    c = pbone.constraints.new('COPY_ROTATION')
-    c.name = 'bind_to_ik_1'
-    c.target = rig
-    c.subtarget = ik_prefix + toes_name
-    c.mute = True
+    add_constraint(bone_name=toes_name,
+                   type='COPY_ROTATION',
+                   name='bind_to_ik_1',
+                   subtarget=ik_prefix + toes_name,
+                   mute=True
+                   )
 
     # BIND TO (0: FK, 1: IK, 2:BIND)
     prop_to_drive_constraint(prop_bone_name=prop_bone_name, 
@@ -256,13 +255,10 @@ def biped_leg(bvh_tree, shape_collection, module, chain, pole_target_name, shin_
                              )
 
     # SNAP INFO
-    bpy.ops.object.mode_set(mode='POSE')
-    pbone = rig.pose.bones[prop_bone_name]
-    pbone['snapinfo_singlebone_0'] = [fk_prefix + toes_name, ik_prefix + toes_name]
+    set_snap_info(prop_bone_name, 'snapinfo_singlebone_0', [fk_prefix + toes_name, ik_prefix + toes_name])
 
     # FOOT ROLL:
     # get heel position
-    bpy.ops.object.mode_set(mode='EDIT')
 
     # set ray start and direction
     ray_start = rig.data.edit_bones[toes_name].head
@@ -281,7 +277,6 @@ def biped_leg(bvh_tree, shape_collection, module, chain, pole_target_name, shin_
     third_point = hit_loc + difference
 
     # ik foot main
-    bpy.ops.object.mode_set(mode='EDIT')
     ebones = rig.data.edit_bones
     ik_foot_main_name = ik_prefix + 'main_' + foot_name
     ebone = ebones.new(name=ik_foot_main_name)
@@ -320,7 +315,6 @@ def biped_leg(bvh_tree, shape_collection, module, chain, pole_target_name, shin_
                   )
 
     # foot roll back
-    bpy.ops.object.mode_set(mode='EDIT')
     ebones = rig.data.edit_bones
     foot_roll_back_name = 'roll_back_' + foot_name
     ebone = ebones.new(name=foot_roll_back_name)
@@ -337,7 +331,6 @@ def biped_leg(bvh_tree, shape_collection, module, chain, pole_target_name, shin_
                   )
 
     # foot roll front
-    bpy.ops.object.mode_set(mode='EDIT')
     ebones = rig.data.edit_bones
     foot_roll_front_name = 'roll_front_' + foot_name
     ebone = ebones.new(name=foot_roll_front_name)
@@ -355,7 +348,6 @@ def biped_leg(bvh_tree, shape_collection, module, chain, pole_target_name, shin_
                   )
 
     # foot roll main
-    bpy.ops.object.mode_set(mode='EDIT')
     ebones = rig.data.edit_bones
     foot_roll_main_name = 'roll_main_' + foot_name
     ebone = ebones.new(name=foot_roll_main_name)
@@ -380,7 +372,6 @@ def biped_leg(bvh_tree, shape_collection, module, chain, pole_target_name, shin_
     relevant_bone_names.append(foot_roll_main_name)
 
     # parent pole target to foot_roll_main_name
-    bpy.ops.object.mode_set(mode='EDIT')
     ebones = rig.data.edit_bones
     ebones['target_' + pole_target_name].parent = ebones[ik_foot_main_name]
 
@@ -395,7 +386,6 @@ def biped_leg(bvh_tree, shape_collection, module, chain, pole_target_name, shin_
                   lock_loc=True,
                   lock_scale=True
                   )
-    bpy.ops.object.mode_set(mode='EDIT')
     ebones = rig.data.edit_bones
     ebones[ik_prefix + toes_name].parent = ebones[ik_toes_parent_name]
 
@@ -404,35 +394,30 @@ def biped_leg(bvh_tree, shape_collection, module, chain, pole_target_name, shin_
                         layer_index=Constants.ctrl_ik_extra_layer
                         )
     # update snap_info
-    bpy.ops.object.mode_set(mode='POSE')
-    pbones = rig.pose.bones
-    old_snap_info = pbones['module_props__' + module]["snapinfo_3bonelimb_0"]
-    old_snap_info[9], old_snap_info[10], old_snap_info[11] = snap_target_foot_name, ik_foot_main_name, foot_roll_main_name
-    pbones['module_props__' + module]["snapinfo_3bonelimb_0"] = old_snap_info
-
-    bpy.ops.object.mode_set(mode='POSE')
-    pbones = rig.pose.bones
+    snap_info = get_spec().get_snap_info('module_props__' + module, "snapinfo_3bonelimb_0")
+    snap_info[9], snap_info[10], snap_info[11] = snap_target_foot_name, ik_foot_main_name, foot_roll_main_name
+
     # foot roll constraints:
     # foot roll front
     if toes_bend_axis == '-X':
         use_x = True
         use_z = False
 
-    pbone = pbones[foot_roll_front_name]
-    c = pbone.constraints.new('COPY_ROTATION')
-    c.name = 'copy foot_roll_main'
-    c.target = rig
-    c.subtarget = foot_roll_main_name
-    c.use_x = use_x
-    c.use_y = False
-    c.use_z = use_z
-    c.invert_x = False
-    c.invert_y = False
-    c.invert_z = False
-    c.use_offset = False
-    c.target_space = 'LOCAL'
-    c.owner_space = 'LOCAL'
-    c.influence = 1
+    add_constraint(bone_name=foot_roll_front_name,
+                   type='COPY_ROTATION',
+                   name='copy foot_roll_main',
+                   subtarget=foot_roll_main_name,
+                   use_x=use_x,
+                   use_y=False,
+                   use_z=use_z,
+                   invert_x=False,
+                   invert_y=False,
+                   invert_z=False,
+                   use_offset=False,
+                   target_space='LOCAL',
+                   owner_space='LOCAL',
+                   influence=1
+                   )
 
     if toes_bend_axis == '-X':
         min_x = 0
@@ -440,41 +425,42 @@ def biped_leg(bvh_tree, shape_collection, module, chain, pole_target_name, shin_
         min_z = 0
         max_z = 0
 
-    c = pbone.constraints.new('LIMIT_ROTATION')
-    c.name = 'limit rotation'
-    c.owner_space = 'LOCAL'
-    c.use_transform_limit = True
-    c.influence = 1
-    c.use_limit_x = True
-    c.use_limit_y = True
-    c.use_limit_z = True
-    c.min_x = min_x
-    c.max_x = max_x
-    c.min_y = 0
-    c.min_y = 0
-    c.min_z = min_z
-    c.max_z = max_z
+    add_constraint(bone_name=foot_roll_front_name,
+                   type='LIMIT_ROTATION',
+                   name='limit rotation',
+                   owner_space='LOCAL',
+                   use_transform_limit=True,
+                   influence=1,
+                   use_limit_x=True,
+                   use_limit_y=True,
+                   use_limit_z=True,
+                   min_x=min_x,
+                   max_x=max_x,
+                   min_y=0,
+                   min_z=min_z,
+                   max_z=max_z
+                   )
 
     if toes_bend_axis == '-X':
         use_x = True
         use_z = False
 
     # foot roll back
-    pbone = pbones[foot_roll_back_name]
-    c = pbone.constraints.new('COPY_ROTATION')
-    c.name = 'copy foot_roll_main_name'
-    c.target = rig
-    c.subtarget = foot_roll_main_name
-    c.use_x = use_x
-    c.use_y = False
-    c.use_z = use_z
-    c.invert_x = use_x
-    c.invert_y = False
-    c.invert_z = use_z
-    c.use_offset = False
-    c.target_space = 'LOCAL'
-    c.owner_space = 'LOCAL'
-    c.influence = 1
+    add_constraint(bone_name=foot_roll_back_name,
+                   type='COPY_ROTATION',
+                   name='copy foot_roll_main_name',
+                   subtarget=foot_roll_main_name,
+                   use_x=use_x,
+                   use_y=False,
+                   use_z=use_z,
+                   invert_x=use_x,
+                   invert_y=False,
+                   invert_z=use_z,
+                   use_offset=False,
+                   target_space='LOCAL',
+                   owner_space='LOCAL',
+                   influence=1
+                   )
 
     if toes_bend_axis == '-X':
         min_x = 0
@@ -482,20 +468,21 @@ def biped_leg(bvh_tree, shape_collection, module, chain, pole_target_name, shin_
         min_z = 0
         max_z = 0
 
-    c = pbone.constraints.new('LIMIT_ROTATION')
-    c.name = 'limit rotation'
-    c.owner_space = 'LOCAL'
-    c.use_transform_limit = True
-    c.influence = 1
-    c.use_limit_x = True
-    c.use_limit_y = True
-    c.use_limit_z = True
-    c.min_x = min_x
-    c.max_x = max_x
-    c.min_y = 0
-    c.min_y = 0
-    c.min_z = min_z
-    c.max_z = max_z
+    add_constraint(bone_name=foot_roll_back_name,
+                   type='LIMIT_ROTATION',
+                   name='limit rotation',
+                   owner_space='LOCAL',
+                   use_transform_limit=True,
+                   influence=1,
+                   use_limit_x=True,
+                   use_limit_y=True,
+                   use_limit_z=True,
+                   min_x=min_x,
+                   max_x=max_x,
+                   min_y=0,
+                   min_z=min_z,
+                   max_z=max_z
+                   )
 
     # foot roll main
     if toes_bend_axis == '-X':
@@ -504,42 +491,42 @@ def biped_leg(bvh_tree, shape_collection, module, chain, pole_target_name, shin_
         min_z = 0
         max_z = 0
 
-    pbone = pbones[foot_roll_main_name]
-    c = pbone.constraints.new('LIMIT_ROTATION')
-    c.name = 'limit rotation'
-    c.owner_space = 'LOCAL'
-    c.use_transform_limit = True
-    c.influence = 1
-    c.use_limit_x = True
-    c.use_limit_y = True
-    c.use_limit_z = True
-    c.min_x = min_x
-    c.max_x = max_x
-    c.min_y = 0
-    c.min_y = 0
-    c.min_z = min_z
-    c.max_z = max_z
+    add_constraint(bone_name=foot_roll_main_name,
+                   type='LIMIT_ROTATION',
+                   name='limit rotation',
+                   owner_space='LOCAL',
+                   use_transform_limit=True,
+                   influence=1,
+                   use_limit_x=True,
+                   use_limit_y=True,
+                   use_limit_z=True,
+                   min_x=min_x,
+                   max_x=max_x,
+                   min_y=0,
+                   min_z=min_z,
+                   max_z=max_z
+                   )
 
     # ik_toes_parent
     if toes_bend_axis == '-X':
         use_x = True
         use_z = False
 
-    pbone = pbones[ik_toes_parent_name]
-    c = pbone.constraints.new('COPY_ROTATION')
-    c.name = 'copy foot_roll_front'
-    c.target = rig
-    c.subtarget = foot_roll_front_name
-    c.use_x = use_x
-    c.use_y = False
-    c.use_z = use_z
-    c.invert_x = True
-    c.invert_y = False
-    c.invert_z = True
-    c.use_offset = True
-    c.target_space = 'LOCAL'
-    c.owner_space = 'LOCAL'
-    c.influence = 1
+    add_constraint(bone_name=ik_toes_parent_name,
+                   type='COPY_ROTATION',
+                   name='copy foot_roll_front',
+                   subtarget=foot_roll_front_name,
+                   use_x=use_x,
+                   use_y=False,
+                   use_z=use_z,
+                   invert_x=True,
+                   invert_y=False,
+                   invert_z=True,
+                   use_offset=True,
+                   target_space='LOCAL',
+                   owner_space='LOCAL',
+                   influence=1
+                   )
 
     bone_visibility(prop_bone_name=prop_bone_name, 
                     module=module, 
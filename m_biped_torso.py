@@ -34,6 +34,11 @@ from .utils import prop_to_drive_constraint
 from .utils import mirror_bone_to_point
 from .utils import bone_visibility
 from .utils import set_module_on_relevant_bones
+from .utils import set_mode
+from .utils import add_constraint
+from .utils import set_pose_bone_prop
+from .utils import set_snap_info
+from .utils import get_spec
 
 
 def biped_torso(bvh_tree, shape_collection, module, chain, first_parent_name):
@@ -99,29 +104,26 @@ def biped_torso(bvh_tree, shape_collection, module, chain, first_parent_name):
         relevant_bone_names.append(fk_prefix + name)
 
     # LOW-LEVEL TO FK RIG CONSTRAINTS
-    bpy.ops.object.mode_set(mode='POSE')
-    pbones = rig.pose.bones
     for index, name in enumerate(chain):
-        pbone = pbones[name]
-        cs = pbone.constraints
-
-        c = cs.new('COPY_ROTATION')
-        c.name = 'bind_to_fk_1'
-        c.target = rig
-        c.subtarget = fk_prefix + name
-        c.mute = True
+        add_constraint(bone_name=name,
+                       type='COPY_ROTATION',
+                       name='bind_to_fk_1',
+                       subtarget=fk_prefix + name,
+                       mute=True
+                       )
 
         if index == 0:
-            c = cs.new('COPY_LOCATION')
-            c.name = 'bind_to_fk_2'
-            c.target = rig
-            c.subtarget = fk_prefix + name
-            c.head_tail = 0
-            c.mute = True
+            add_constraint(bone_name=name,
+                           type='COPY_LOCATION',
+                           name='bind_to_fk_2',
+                           subtarget=fk_prefix + name,
+                           head_tail=0,
+                           mute=True
+                           )
 
     # IK BONES
     # create torso bone
-    bpy.ops.object.mode_set(mode='EDIT')
+    set_mode('EDIT')
     ebones = rig.data.edit_bones
     ctrl_torso = 'ctrl_torso'
     ebone = ebones.new(name=ctrl_torso)
@@ -151,7 +153,6 @@ def biped_torso(bvh_tree, shape_collection, module, chain, first_parent_name):
     
     # create control bones
     def spine_control(ctrl_name, length_multiplier, parent_name, is_on_extra_layer, group, use_custom_shape, bone_shape_bone):
-        bpy.ops.object.mode_set(mode='EDIT')
         ebones = rig.data.edit_bones
         ctrl_spine_name = 'ctrl_' + ctrl_name
         ebone = ebones.new(name=ctrl_spine_name)
@@ -211,20 +212,16 @@ def biped_torso(bvh_tree, shape_collection, module, chain, first_parent_name):
     relevant_bone_names.append(ctrl_chest)
 
     # ctrl_waist_parent constraints
-    bpy.ops.object.mode_set(mode='POSE')
-    pbone = rig.pose.bones[ctrl_waist_parent]
-    cs = pbone.constraints
-
-    # constraints
-    c = cs.new('COPY_ROTATION')
-    c.name = 'copy ' + ctrl_chest
-    c.target = rig
-    c.subtarget = ctrl_chest
-    c.influence = Constants.ctrl_waist__copy__ctrl_chest
+    add_constraint(bone_name=ctrl_waist_parent,
+                   type='COPY_ROTATION',
+                   name='copy ' + ctrl_chest,
+                   subtarget=ctrl_chest,
+                   influence=Constants.ctrl_waist__copy__ctrl_chest
+                   )
 
     prop_to_drive_constraint(prop_bone_name=ctrl_waist, 
                              bone_name=ctrl_waist_parent, 
-                             constraint_name=c.name,
+                             constraint_name='copy ' + ctrl_chest,
                              prop_name='ctrl_waist_copy_chest', 
                              attribute='influence', 
                              prop_min=0.0,
@@ -234,15 +231,16 @@ def biped_torso(bvh_tree, shape_collection, module, chain, first_parent_name):
                              expression='v1'
                              )
 
-    c = cs.new('COPY_ROTATION')
-    c.name = 'copy ' + ctrl_hips
-    c.target = rig
-    c.subtarget = ctrl_hips
-    c.influence = Constants.ctrl_waist__copy__ctrl_hips
+    add_constraint(bone_name=ctrl_waist_parent,
+                   type='COPY_ROTATION',
+                   name='copy ' + ctrl_hips,
+                   subtarget=ctrl_hips,
+                   influence=Constants.ctrl_waist__copy__ctrl_hips
+                   )
 
     prop_to_drive_constraint(prop_bone_name=ctrl_waist,
                              bone_name=ctrl_waist_parent, 
-                             constraint_name=c.name,
+                             constraint_name='copy ' + ctrl_hips,
                              prop_name='ctrl_waist_copy_hips', 
                              attribute='influence', 
                              prop_min=0.0,
@@ -254,7 +252,6 @@ def biped_torso(bvh_tree, shape_collection, module, chain, first_parent_name):
 
     for index, name in enumerate(chain):
         # create distributor bone
-        bpy.ops.object.mode_set(mode='EDIT')
         ebones = rig.data.edit_bones
         dist_bone_name = ik_prefix + name + '_dist'
         ebone = ebones.new(name=dist_bone_name)
@@ -274,7 +271,6 @@ def biped_torso(bvh_tree, shape_collection, module, chain, first_parent_name):
                       )
 
         # create ik fwd bone
-        bpy.ops.object.mode_set(mode='EDIT')
         ebones = rig.data.edit_bones
         ik_bone_name = ik_prefix + 'fwd_' + name
         
@@ -292,7 +288,6 @@ def biped_torso(bvh_tree, shape_collection, module, chain, first_parent_name):
                       )
 
     # reverse hips
-    bpy.ops.object.mode_set(mode='EDIT')
     ebones = rig.data.edit_bones
     ik_hips_name = ik_prefix + 'fwd_' + chain[0]
     ebones[ik_hips_name].head = ebones[chain[0]].tail
@@ -306,17 +301,13 @@ def biped_torso(bvh_tree, shape_collection, module, chain, first_parent_name):
     ebones[ik_prefix + chain[1] + '_dist'].parent = ebones[ctrl_torso]
 
     # distributor constraints
-    bpy.ops.object.mode_set(mode='POSE')
-    pbones = rig.pose.bones
-
     def simple_spine_constraint(chain_index, ctrl_bone_name):
-        pbone = pbones[ik_prefix + chain[chain_index] + '_dist']
-        cs = pbone.constraints
-        c = cs.new('COPY_ROTATION')
-        c.name = 'copy ' + ctrl_bone_name
-        c.target = rig
-        c.subtarget = ctrl_bone_name
-        c.influence = 1
+        add_constraint(bone_name=ik_prefix + chain[chain_index] + '_dist',
+                       type='COPY_ROTATION',
+                       name='copy ' + ctrl_bone_name,
+                       subtarget=ctrl_bone_name,
+                       influence=1
+                       )
 
     # 0, 1, 3
     simple_spine_constraint(0, ctrl_hips)
@@ -324,18 +315,18 @@ def biped_torso(bvh_tree, shape_collection, module, chain, first_parent_name):
     simple_spine_constraint(3, ctrl_chest)
 
     # 2
-    pbone = pbones[ik_prefix + chain[2] + '_dist']
-    cs = pbone.constraints
+    dist_bone_name = ik_prefix + chain[2] + '_dist'
 
-    c = cs.new('COPY_ROTATION')
-    c.name = 'copy ' + ctrl_waist
-    c.target = rig
-    c.subtarget = ctrl_waist
-    c.influence = Constants.ik_spine_2__copy__ctrl_waist
+    add_constraint(bone_name=dist_bone_name,
+                   type='COPY_ROTATION',
+                   name='copy ' + ctrl_waist,
+                   subtarget=ctrl_waist,
+                   influence=Constants.ik_spine_2__copy__ctrl_waist
+                   )
 
     prop_to_drive_constraint (prop_bone_name=ctrl_waist, 
-                              bone_name=pbone.name, 
-                              constraint_name=c.name, 
+                              bone_name=dist_bone_name, 
+                              constraint_name='copy ' + ctrl_waist, 
                               prop_name='ctrl_spine_2_copy_waist', 
                               attribute='influence', 
                               prop_min=0.0, 
@@ -345,15 +336,16 @@ def biped_torso(bvh_tree, shape_collection, module, chain, first_parent_name):
                               expression='v1'
                               )
 
-    c = cs.new('COPY_ROTATION')
-    c.name = 'copy ' + ctrl_chest
-    c.target = rig
-    c.subtarget = ctrl_chest
-    c.influence = Constants.ik_spine_2__copy__ctrl_waist
+    add_constraint(bone_name=dist_bone_name,
+                   type='COPY_ROTATION',
+                   name='copy ' + ctrl_chest,
+                   subtarget=ctrl_chest,
+                   influence=Constants.ik_spine_2__copy__ctrl_waist
+                   )
 
     prop_to_drive_constraint(prop_bone_name=ctrl_chest, 
-                             bone_name=pbone.name, 
-                             constraint_name=c.name,
+                             bone_name=dist_bone_name, 
+                             constraint_name='copy ' + ctrl_chest,
                              prop_name='ctrl_spine_2_copy_chest', 
                              attribute='influence', 
                              prop_min=0.0,
@@ -382,17 +374,12 @@ def biped_torso(bvh_tree, shape_collection, module, chain, first_parent_name):
 
         if index != 0:
             # constrain it to ik_fwd bones
-            bpy.ops.object.mode_set(mode='POSE')
-            bone_name = ik_prefix + name
-            pbone = rig.pose.bones[bone_name]
-            cs = pbone.constraints
-
-            c = cs.new('COPY_ROTATION')
-            c.target = rig
-            c.subtarget = ik_prefix + 'fwd_' + name
+            add_constraint(bone_name=ik_prefix + name,
+                           type='COPY_ROTATION',
+                           subtarget=ik_prefix + 'fwd_' + name
+                           )
 
     # reverse hips
-    bpy.ops.object.mode_set(mode='EDIT')
     ebones = rig.data.edit_bones
     ik_hips_name = ik_prefix + chain[0]
     ebones[ik_hips_name].head = ebones[chain[0]].tail
@@ -403,13 +390,10 @@ def biped_torso(bvh_tree, shape_collection, module, chain, first_parent_name):
     ebones[ik_prefix + chain[1]].parent = ebones[ctrl_torso]
 
     # ik_hips copies ik_fwd_hips' rot
-    bpy.ops.object.mode_set(mode='POSE')
-    pbone = rig.pose.bones[ik_hips_name]
-    cs = pbone.constraints
-
-    c = cs.new('COPY_ROTATION')
-    c.target = rig
-    c.subtarget = ik_prefix + 'fwd_' + chain[0]
+    add_constraint(bone_name=ik_hips_name,
+                   type='COPY_ROTATION',
+                   subtarget=ik_prefix + 'fwd_' + chain[0]
+                   )
 
     # PIVOT SLIDER
     # reverse spine chain from above hips
@@ -433,33 +417,29 @@ def biped_torso(bvh_tree, shape_collection, module, chain, first_parent_name):
 
             # stick rev bones together
             if index > 1:
-                bpy.ops.object.mode_set(mode='POSE')
-                pbone = rig.pose.bones[rev_bone_name]
-                cs = pbone.constraints
-                c = cs.new('COPY_LOCATION')
-                c.target = rig
-                c.subtarget = ik_prefix + 'rev_' + chain[index - 1]
-                c.head_tail = 1
+                add_constraint(bone_name=rev_bone_name,
+                               type='COPY_LOCATION',
+                               subtarget=ik_prefix + 'rev_' + chain[index - 1],
+                               head_tail=1
+                               )
 
     # constraints
-    bpy.ops.object.mode_set(mode='POSE')
     bone_name = ik_prefix + chain[1]
-    pbone = rig.pose.bones[bone_name]
-    cs = pbone.constraints
 
     for index, name in enumerate(chain):
         if index > 0:
-            c = cs.new('COPY_LOCATION')
-            c.name = 'pivot_slide_' + str(index)
-            c.target = rig
-            c.subtarget = ik_prefix + 'rev_' + name
-            c.head_tail = 1
-            c.influence = 0
+            add_constraint(bone_name=bone_name,
+                           type='COPY_LOCATION',
+                           name='pivot_slide_' + str(index),
+                           subtarget=ik_prefix + 'rev_' + name,
+                           head_tail=1,
+                           influence=0
+                           )
 
             # constraint driven by prop
             prop_to_drive_constraint(prop_bone_name=ctrl_torso, 
                                      bone_name=bone_name, 
-                                     constraint_name=c.name,
+                                     constraint_name='pivot_slide_' + str(index),
                                      prop_name='ctrl_spine_pivot_slide', 
                                      attribute='influence',
                                      prop_min=0.25, 
@@ -470,41 +450,38 @@ def biped_torso(bvh_tree, shape_collection, module, chain, first_parent_name):
                                      )
                                      
     # ctrl bone shape transform
-    bpy.ops.object.mode_set(mode='POSE')
-    pbones = rig.pose.bones
-    pbones[ctrl_hips].custom_shape_transform = pbones[ik_prefix + chain[1]]                 
-    pbones[ctrl_waist].custom_shape_transform = pbones[ik_prefix + chain[2]]                   
-    pbones[ctrl_chest].custom_shape_transform = pbones[ik_prefix + chain[3]]  
+    spec = get_spec()
+    spec.bone(ctrl_hips).custom_shape_transform = ik_prefix + chain[1]
+    spec.bone(ctrl_waist).custom_shape_transform = ik_prefix + chain[2]
+    spec.bone(ctrl_chest).custom_shape_transform = ik_prefix + chain[3]
 
     # LOW-LEVEL TO IK RIG CONSTRAINTS
-    bpy.ops.object.mode_set(mode='POSE')
-    pbones = rig.pose.bones
     for index, name in enumerate(chain):
-        pbone = pbones[name]
-        cs = pbone.constraints
         if index > 0:
-            c = cs.new('COPY_ROTATION')
-            c.name = 'bind_to_ik_1'
-            c.target = rig
-            c.subtarget = ik_prefix + name
-            c.mute = True
+            add_constraint(bone_name=name,
+                           type='COPY_ROTATION',
+                           name='bind_to_ik_1',
+                           subtarget=ik_prefix + name,
+                           mute=True
+                           )
 
         else:
-            c = cs.new('COPY_LOCATION')
-            c.name = 'bind_to_ik_2'
-            c.target = rig
-            c.subtarget = ik_prefix + name
-            c.head_tail = 1
-            c.mute = True
-
-            c = cs.new('TRACK_TO')
-            c.name = 'bind_to_ik_1'
-            c.target = rig
-            c.subtarget = ik_prefix + name
-            c.track_axis = 'TRACK_Y'
-            c.head_tail = 0
-            c.use_target_z = True
-            c.mute = True
+            add_constraint(bone_name=name,
+                           type='COPY_LOCATION',
+                           name='bind_to_ik_2',
+                           subtarget=ik_prefix + name,
+                           head_tail=1,
+                           mute=True
+                           )
+            add_constraint(bone_name=name,
+                           type='TRACK_TO',
+                           name='bind_to_ik_1',
+                           subtarget=ik_prefix + name,
+                           track_axis='TRACK_Y',
+                           head_tail=0,
+                           use_target_z=True,
+                           mute=True
+                           )
 
     # BIND TO (0: FK, 1: IK, 2:BIND)
     for index, name in enumerate(chain):
@@ -544,15 +521,12 @@ def biped_torso(bvh_tree, shape_collection, module, chain, first_parent_name):
                                  )
 
     # snap_info
-    bpy.ops.object.mode_set(mode='POSE')
-    pbones = rig.pose.bones
-    pbone = pbones[prop_bone_name]
-    pbone['snapinfo_simpletobase_0'] = chain
+    set_snap_info(prop_bone_name, 'snapinfo_simpletobase_0', chain)
 
-    pbone['snap_n_key__should_snap'] = 0
+    set_pose_bone_prop(prop_bone_name, 'snap_n_key__should_snap', 0)
 
     sm = 'snappable_modules'
-    if sm in rig.data:
-        rig.data[sm] += [module]
-    else:
+    if sm not in rig.data:
         rig.data[sm] = [module]
+    elif module not in rig.data[sm]:
+        rig.data[sm] += [module]
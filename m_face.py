@@ -37,6 +37,8 @@ from .utils import get_parent_name
 from .utils import create_no_twist_bone
 from .utils import set_bone_only_layer
 from .utils import set_bone_shape
+from .utils import set_mode
+from .utils import add_constraint
 
 
 def face_base(bvh_tree, shape_collection, module, use_jaw, parent_name):
@@ -59,7 +61,7 @@ def face_base(bvh_tree, shape_collection, module, use_jaw, parent_name):
     parent_name = 'face_parent'
 
     # create look target bones
-    bpy.ops.object.mode_set(mode='EDIT')
+    set_mode('EDIT')
     # eye_targets
     for side in sides:
         ebone = rig.data.edit_bones.new(name='target_eye' + side)
@@ -106,7 +108,6 @@ def face_base(bvh_tree, shape_collection, module, use_jaw, parent_name):
         shape_bone_layer.append('chin')
 
     for name, bone_parent, use_deform, lock_loc, lock_rot, bone_shape, transform_bone_name, scale, group, shape_parent_override in bone_table:
-        bpy.ops.object.mode_set(mode='EDIT')
         ebones = rig.data.edit_bones
         ebones[name].parent = ebones[bone_parent]
         ebones[name].roll = 0
@@ -146,15 +147,13 @@ def face_base(bvh_tree, shape_collection, module, use_jaw, parent_name):
         create_no_twist_bone(source_bone_name='eye' + side)
 
     # constraints
-    bpy.ops.object.mode_set(mode='POSE')
-    pbones = rig.pose.bones
-
     if use_jaw == True:
-        c = pbones['teeth_lower'].constraints.new('COPY_ROTATION')
-        c.name = 'Copy Jaw'
-        c.target = rig
-        c.subtarget = 'jaw'
-        c.influence = Constants.teeth_lower_copy_jaw_rot
+        add_constraint(bone_name='teeth_lower',
+                       type='COPY_ROTATION',
+                       name='Copy Jaw',
+                       subtarget='jaw',
+                       influence=Constants.teeth_lower_copy_jaw_rot
+                       )
 
         prop_to_drive_constraint(prop_bone_name='jaw', 
                                  bone_name='teeth_lower', 
@@ -170,25 +169,26 @@ def face_base(bvh_tree, shape_collection, module, use_jaw, parent_name):
 
     # eye constraints
     for side in sides:
-        c = pbones['eye' + side].constraints.new('TRACK_TO')
-        c.name = 'Eye Target'
-        c.target = rig
-        c.subtarget = 'target_eye' + side
-        c.track_axis = 'TRACK_Z'
-        c.up_axis = 'UP_Y'
-        c.mute = True
-
-        c = pbones['upperlid' + side].constraints.new('COPY_ROTATION')
-        c.name = 'Copy Eye'
-        c.target = rig
-        c.subtarget = 'no_twist_eye' + side
-        c.influence = Constants.upperlid_copy_eye_rot
-
-        c = pbones['lowerlid' + side].constraints.new('COPY_ROTATION')
-        c.name = 'Copy Eye'
-        c.target = rig
-        c.subtarget = 'no_twist_eye' + side
-        c.influence = Constants.lowerlid_copy_eye_rot
+        add_constraint(bone_name='eye' + side,
+                       type='TRACK_TO',
+                       name='Eye Target',
+                       subtarget='target_eye' + side,
+                       track_axis='TRACK_Z',
+                       up_axis='UP_Y',
+                       mute=True
+                       )
+        add_constraint(bone_name='upperlid' + side,
+                       type='COPY_ROTATION',
+                       name='Copy Eye',
+                       subtarget='no_twist_eye' + side,
+                       influence=Constants.upperlid_copy_eye_rot
+                       )
+        add_constraint(bone_name='lowerlid' + side,
+                       type='COPY_ROTATION',
+                       name='Copy Eye',
+                       subtarget='no_twist_eye' + side,
+                       influence=Constants.lowerlid_copy_eye_rot
+                       )
 
         prop_to_drive_constraint(prop_bone_name=look, 
                                  bone_name='eye' + side, 
@@ -271,7 +271,6 @@ def face_detail(bvh_tree, shape_collection, module):
     extra_bones = ['lowerlip']
 
     for name, bone_parent, use_deform, lock_loc, lock_rot, bone_shape, shape_transform_bone_name in bone_table:
-        bpy.ops.object.mode_set(mode='EDIT')
         ebones = rig.data.edit_bones
         ebones[name].parent = ebones[bone_parent]
         ebones[name].roll = 0
@@ -303,14 +302,12 @@ def face_detail(bvh_tree, shape_collection, module):
         relevant_bone_names.append(name)
 
     # constraints
-    bpy.ops.object.mode_set(mode='POSE')
-    pbones = rig.pose.bones
-
-    c = pbones['lowerlip'].constraints.new('COPY_ROTATION')
-    c.name = 'Copy Jaw'
-    c.target = rig
-    c.subtarget = 'jaw'
-    c.influence = Constants.lowerlip_copy_jaw_rot
+    add_constraint(bone_name='lowerlip',
+                   type='COPY_ROTATION',
+                   name='Copy Jaw',
+                   subtarget='jaw',
+                   influence=Constants.lowerlip_copy_jaw_rot
+                   )
 
     prop_to_drive_constraint(prop_bone_name='jaw', 
                              bone_name='lowerlip', 
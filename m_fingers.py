@@ -40,6 +40,8 @@ from .utils import snappable_module
 from .utils import create_twist_bones
 from .utils import get_parent_name
 from .utils import set_bone_shape
+from .utils import set_mode
+from .utils import add_constraint
 
 
 def fingers(bvh_tree, shape_collection, module, finger_names, side):
@@ -64,7 +66,7 @@ def fingers(bvh_tree, shape_collection, module, finger_names, side):
     first_parent_name = get_parent_name(finger_names[0] + '_1' + side)
 
     # BASE
-    bpy.ops.object.mode_set(mode='EDIT')
+    set_mode('EDIT')
     ebones = rig.data.edit_bones
     for finger in finger_names:
         for n in range(1, 4):
@@ -88,7 +90,6 @@ def fingers(bvh_tree, shape_collection, module, finger_names, side):
             relevant_bone_names.append(name)
 
     def create_finger_bones(prefix, set_shape, layer, group, constraint_name, type):
-        bpy.ops.object.mode_set(mode='EDIT')
         for finger in finger_names:
             for n in range(1, 4):
                 name = prefix + finger + '_' + str(n) + side
@@ -117,17 +118,15 @@ def fingers(bvh_tree, shape_collection, module, finger_names, side):
                 relevant_bone_names.append(name)
 
         # BIND RIG TO FK RIG constraints
-        bpy.ops.object.mode_set(mode='POSE')
-        pbones = rig.pose.bones
-
         for finger in finger_names:
             for n in range(1, 4):
                 name = finger + '_' + str(n) + side
-                c = pbones[name].constraints.new('COPY_ROTATION')
-                c.name = constraint_name
-                c.target = rig
-                c.subtarget = prefix + name
-                c.mute = True
+                add_constraint(bone_name=name,
+                               type='COPY_ROTATION',
+                               name=constraint_name,
+                               subtarget=prefix + name,
+                               mute=True
+                               )
 
     # FK
     create_finger_bones(prefix=fk_prefix, 
@@ -173,8 +172,6 @@ def fingers(bvh_tree, shape_collection, module, finger_names, side):
         relevant_bone_names.append(ctrl_name)
 
     # constraints
-    bpy.ops.object.mode_set(mode='POSE')
-    pbones = rig.pose.bones
     for index, finger in enumerate(finger_names):
 
         # constraint ik finger bones to finger ctrl bones
@@ -182,94 +179,96 @@ def fingers(bvh_tree, shape_collection, module, finger_names, side):
             name = ik_prefix + finger + '_2' + side
         else:
             name = ik_prefix + finger + '_1' + side
-        pbone = pbones[name]
-        c = pbone.constraints.new('COPY_ROTATION')
-        c.name = 'copy ctrl finger'
-        c.target = rig
-        c.subtarget = 'ctrl_' + finger + side
-        c.use_x = True
-        c.use_y = True
-        c.use_z = True
-        c.invert_x = False
-        c.invert_y = False
-        c.invert_z = False
-        c.use_offset = False
-        c.target_space = 'LOCAL'
-        c.owner_space = 'LOCAL'
-        c.influence = 1
+        add_constraint(bone_name=name,
+                       type='COPY_ROTATION',
+                       name='copy ctrl finger',
+                       subtarget='ctrl_' + finger + side,
+                       use_x=True,
+                       use_y=True,
+                       use_z=True,
+                       invert_x=False,
+                       invert_y=False,
+                       invert_z=False,
+                       use_offset=False,
+                       target_space='LOCAL',
+                       owner_space='LOCAL',
+                       influence=1
+                       )
 
         # ctrl finger scale to finger rot
-        def add_c(pbone, scale_fwd, rot_fwd, scale_bwd, rot_bwd):
-            c = pbone.constraints.new('TRANSFORM')
-            c.name = 'ctrl finger scale to bend fwd'
-            c.use_motion_extrapolate = False
-            c.target = rig
-            c.subtarget = 'ctrl_' + finger + side
-            c.map_from = 'SCALE'
-            c.map_to = 'ROTATION'
-            c.map_to_x_from = 'Y'
-            c.map_to_y_from = 'Y'
-            c.map_to_z_from = 'Y'
-            c.from_min_x_scale = 1
-            c.from_max_x_scale = 1
-            c.from_min_y_scale = scale_fwd
-            c.from_max_y_scale = 1
-            c.from_min_z_scale = 1
-            c.from_max_z_scale = 1
-
+        def add_c(bone_name, scale_fwd, rot_fwd, scale_bwd, rot_bwd):
             if bend_axis == '-X':
-                c.to_min_x_rot = radians(rot_fwd)
-                c.to_max_x_rot = 0
-
-            c.target_space = 'LOCAL'
-            c.owner_space = 'LOCAL'
-            c.influence = 1
+                rot_limits = {'to_min_x_rot': radians(rot_fwd), 'to_max_x_rot': 0}
+            else:
+                rot_limits = {}
 
-            c = pbone.constraints.new('TRANSFORM')
-            c.name = 'ctrl finger scale to bend bwd'
-            c.use_motion_extrapolate = False
-            c.target = rig
-            c.subtarget = 'ctrl_' + finger + side
-            c.map_from = 'SCALE'
-            c.map_to = 'ROTATION'
-            c.map_to_x_from = 'Y'
-            c.map_to_y_from = 'Y'
-            c.map_to_z_from = 'Y'
-            c.from_min_x_scale = 1
-            c.from_max_x_scale = 1
-            c.from_min_y_scale = 1
-            c.from_max_y_scale = scale_bwd
-            c.from_min_z_scale = 1
-            c.from_max_z_scale = 1
+            add_constraint(bone_name=bone_name,
+                           type='TRANSFORM',
+                           name='ctrl finger scale to bend fwd',
+                           use_motion_extrapolate=False,
+                           subtarget='ctrl_' + finger + side,
+                           map_from='SCALE',
+                           map_to='ROTATION',
+                           map_to_x_from='Y',
+                           map_to_y_from='Y',
+                           map_to_z_from='Y',
+                           from_min_x_scale=1,
+                           from_max_x_scale=1,
+                           from_min_y_scale=scale_fwd,
+                           from_max_y_scale=1,
+                           from_min_z_scale=1,
+                           from_max_z_scale=1,
+                           target_space='LOCAL',
+                           owner_space='LOCAL',
+                           influence=1,
+                           **rot_limits
+                           )
 
             if bend_axis == '-X':
-                c.to_min_x_rot = 0
-                c.to_max_x_rot = radians(rot_bwd)
+                rot_limits = {'to_min_x_rot': 0, 'to_max_x_rot': radians(rot_bwd)}
 
-            c.target_space = 'LOCAL'
-            c.owner_space = 'LOCAL'
-            c.influence = 1
+            add_constraint(bone_name=bone_name,
+                           type='TRANSFORM',
+                           name='ctrl finger scale to bend bwd',
+                           use_motion_extrapolate=False,
+                           subtarget='ctrl_' + finger + side,
+                           map_from='SCALE',
+                           map_to='ROTATION',
+                           map_to_x_from='Y',
+                           map_to_y_from='Y',
+                           map_to_z_from='Y',
+                           from_min_x_scale=1,
+                           from_max_x_scale=1,
+                           from_min_y_scale=1,
+                           from_max_y_scale=scale_bwd,
+                           from_min_z_scale=1,
+                           from_max_z_scale=1,
+                           target_space='LOCAL',
+                           owner_space='LOCAL',
+                           influence=1,
+                           **rot_limits
+                           )
 
         if index == 0:
-            add_c(pbone=pbones[ik_prefix + finger + '_3' + side], 
+            add_c(bone_name=ik_prefix + finger + '_3' + side, 
                   scale_fwd=Constants.ctrl_finger_scale__to_finger_2_3_bend_fwd__scale,
                   rot_fwd=Constants.ctrl_finger_scale__to_thumb_2_bend_fwd__rot,
                   scale_bwd=Constants.ctrl_finger_scale__to_finger_2_3_bend_bwd__scale,
                   rot_bwd=Constants.ctrl_finger_scale__to_thumb_2_bend_bwd__rot
                   )
 
-            pbone = pbones[ik_prefix + finger + '_1' + side]
-            c = pbone.constraints.new('DAMPED_TRACK')
-            c.name = 'track to ctrl_finger.head'
-            c.target = rig
-            c.subtarget = 'ctrl_' + finger + side
-            c.head_tail = 0
-            c.track_axis = 'TRACK_Y'
-            c.influence = 1
+            add_constraint(bone_name=ik_prefix + finger + '_1' + side,
+                           type='DAMPED_TRACK',
+                           name='track to ctrl_finger.head',
+                           subtarget='ctrl_' + finger + side,
+                           head_tail=0,
+                           track_axis='TRACK_Y',
+                           influence=1
+                           )
 
         else:
             for n in range(2, 4):
-                add_c(pbone=pbones[ik_prefix + finger + '_' + str(n) + side], 
+                add_c(bone_name=ik_prefix + finger + '_' + str(n) + side, 
                       scale_fwd=Constants.ctrl_finger_scale__to_finger_2_3_bend_fwd__scale,
                       rot_fwd=Constants.ctrl_finger_scale__to_finger_2_3_bend_fwd__rot,
                       scale_bwd=Constants.ctrl_finger_scale__to_finger_2_3_bend_bwd__scale,
@@ -277,24 +276,25 @@ def fingers(bvh_tree, shape_collection, module, finger_names, side):
                       )
 
         # limit ctrl finger bone scale
-        pbone = pbones['ctrl_' + finger + side]
-        c = pbone.constraints.new('LIMIT_SCALE')
-        c.name = 'limit scale'
-        c.owner_space = 'LOCAL'
-        c.influence = 1
-        c.use_transform_limit = True
-        c.use_min_x = True
-        c.use_min_y = True
-        c.use_min_z = True
-        c.use_max_x = True
-        c.use_max_y = True
-        c.use_max_z = True
-        c.min_x = 1
-        c.max_x = 1
-        c.min_y = Constants.ctrl_finger_scale__to_finger_2_3_bend_fwd__scale
-        c.max_y = Constants.ctrl_finger_scale__to_finger_2_3_bend_bwd__scale
-        c.min_z = 1
-        c.max_z = 1
+        add_constraint(bone_name='ctrl_' + finger + side,
+                       type='LIMIT_SCALE',
+                       name='limit scale',
+                       owner_space='LOCAL',
+                       influence=1,
+                       use_transform_limit=True,
+                       use_min_x=True,
+                       use_min_y=True,
+                       use_min_z=True,
+                       use_max_x=True,
+                       use_max_y=True,
+                       use_max_z=True,
+                       min_x=1,
+                       max_x=1,
+                       min_y=Constants.ctrl_finger_scale__to_finger_2_3_bend_fwd__scale,
+                       max_y=Constants.ctrl_finger_scale__to_finger_2_3_bend_bwd__scale,
+                       min_z=1,
+                       max_z=1
+                       )
 
     # BIND RIG TO (0:fk, 1:ik, 2:bind)
     for finger in finger_names:
@@ -35,6 +35,9 @@ from .utils import bone_visibility
 from .utils import get_parent_name
 from .utils import create_leaf_bone
 from .utils import set_bone_only_layer
+from .utils import set_mode
+from .utils import add_constraint
+from .utils import get_spec
 
 
 def head(bvh_tree, shape_collection, module, bone_name, ik_rot_bone_name, ik_loc_bone_name, distributor_parent_name):
@@ -55,7 +58,7 @@ def head(bvh_tree, shape_collection, module, bone_name, ik_rot_bone_name, ik_loc
     # LOW-LEVEL BONES
 
     head_name = bone_name
-    bpy.ops.object.mode_set(mode='EDIT')
+    set_mode('EDIT')
     ebones = rig.data.edit_bones
     ebones[head_name].parent = ebones[parent_name]
     ebones[head_name].parent = ebones[parent_name]
@@ -94,21 +97,17 @@ def head(bvh_tree, shape_collection, module, bone_name, ik_rot_bone_name, ik_loc
     relevant_bone_names.append(name)
 
     # LOW-LEVEL TO FK RIG constraint
-    bpy.ops.object.mode_set(mode='POSE')
-    pbone = rig.pose.bones[head_name]
-    cs = pbone.constraints
-
-    c = cs.new('COPY_ROTATION')
-    c.name = 'bind_to_fk_1'
-    c.target = rig
-    c.subtarget = fk_prefix + head_name
-    c.mute = True
+    add_constraint(bone_name=head_name,
+                   type='COPY_ROTATION',
+                   name='bind_to_fk_1',
+                   subtarget=fk_prefix + head_name,
+                   mute=True
+                   )
 
     # _____________________________________________________________________________________________________
 
     # IK BONES
 
-    bpy.ops.object.mode_set(mode='EDIT')
     # distributor
     distributor_name = Constants.ctrl_prefix + head_name
     ebone = rig.data.edit_bones.new(name=distributor_name)
@@ -125,38 +124,37 @@ def head(bvh_tree, shape_collection, module, bone_name, ik_rot_bone_name, ik_loc
                    )
 
     # costraints
-    bpy.ops.object.mode_set(mode='POSE')
-    pbone = rig.pose.bones[distributor_name]
-
-    c = pbone.constraints.new('COPY_ROTATION')
-    c.name = 'inherit_rot'
-    c.target = rig
-    c.subtarget = ik_rot_bone_name
-    c.use_x = True
-    c.use_y = True
-    c.use_z = True
-    c.invert_x = False
-    c.invert_y = False
-    c.invert_z = False
-    c.use_offset = True
-    c.target_space = 'LOCAL'
-    c.owner_space = 'LOCAL'
-    c.influence = Constants.fixate_ctrl_head
+    add_constraint(bone_name=distributor_name,
+                   type='COPY_ROTATION',
+                   name='inherit_rot',
+                   subtarget=ik_rot_bone_name,
+                   use_x=True,
+                   use_y=True,
+                   use_z=True,
+                   invert_x=False,
+                   invert_y=False,
+                   invert_z=False,
+                   use_offset=True,
+                   target_space='LOCAL',
+                   owner_space='LOCAL',
+                   influence=Constants.fixate_ctrl_head
+                   )
 
-    c = pbone.constraints.new('COPY_LOCATION')
-    c.target = rig
-    c.subtarget = ik_loc_bone_name
-    c.head_tail = 1
-    c.use_x = True
-    c.use_y = True
-    c.use_z = True
-    c.invert_x = False
-    c.invert_y = False
-    c.invert_z = False
-    c.use_offset = False
-    c.target_space = 'WORLD'
-    c.owner_space = 'WORLD'
-    c.influence = 1
+    add_constraint(bone_name=distributor_name,
+                   type='COPY_LOCATION',
+                   subtarget=ik_loc_bone_name,
+                   head_tail=1,
+                   use_x=True,
+                   use_y=True,
+                   use_z=True,
+                   invert_x=False,
+                   invert_y=False,
+                   invert_z=False,
+                   use_offset=False,
+                   target_space='WORLD',
+                   owner_space='WORLD',
+                   influence=1
+                   )
 
     # bone settings
     bone_settings(bone_name=distributor_name, 
@@ -179,12 +177,13 @@ def head(bvh_tree, shape_collection, module, bone_name, ik_rot_bone_name, ik_loc
                     layer_index=Constants.misc_layer
                     )
     # use fk_head's bone scale
-    bpy.ops.object.mode_set(mode='POSE')
-    pbones = rig.pose.bones
-    pbones[distributor_name].custom_shape_transform = pbones[shape_bone_name]
-    pbones[distributor_name].custom_shape = pbones[fk_prefix + head_name].custom_shape
-    pbones[distributor_name].custom_shape_scale = pbones[fk_prefix + head_name].custom_shape_scale
-    pbones[distributor_name].use_custom_shape_bone_size = pbones[fk_prefix + head_name].use_custom_shape_bone_size                  
+    spec = get_spec()
+    fk_record = spec.bone(fk_prefix + head_name)
+    record = spec.bone(distributor_name)
+    record.custom_shape_transform = shape_bone_name
+    record.custom_shape = fk_record.custom_shape
+    record.custom_shape_scale = fk_record.custom_shape_scale
+    record.use_custom_shape_bone_size = fk_record.use_custom_shape_bone_size
                   
     bone_settings(bone_name=name, 
                   layer_index=Constants.ctrl_ik_extra_layer, 
@@ -204,15 +203,12 @@ def head(bvh_tree, shape_collection, module, bone_name, ik_rot_bone_name, ik_loc
                              )
 
     # LOW-LEVEL TO IK RIG constraint
-    bpy.ops.object.mode_set(mode='POSE')
-    pbone = rig.pose.bones[head_name]
-    cs = pbone.constraints
-
-    c = cs.new('COPY_ROTATION')
-    c.name = 'bind_to_ik_1'
-    c.target = rig
-    c.subtarget = ik_prefix + head_name
-    c.mute = True
+    add_constraint(bone_name=head_name,
+                   type='COPY_ROTATION',
+                   name='bind_to_ik_1',
+                   subtarget=ik_prefix + head_name,
+                   mute=True
+                   )
 
     # BIND TO (0: FK, 1: IK, 2:BIND)
     prop_to_drive_constraint(prop_bone_name=prop_bone_name, 
@@ -252,9 +248,6 @@ def head(bvh_tree, shape_collection, module, bone_name, ik_rot_bone_name, ik_loc
                                  )
 
     # snap_info
-    bpy.ops.object.mode_set(mode='POSE')
-    pbones = rig.pose.bones
-    pbone = pbones[prop_bone_name]
-    si = 'snapinfo_simpletobase_0'
-    if si in pbone:
-        pbone[si] = pbone[si] + [head_name]
+    snap_info = get_spec().get_snap_info(prop_bone_name, 'snapinfo_simpletobase_0')
+    if snap_info is not None:
+        snap_info.append(head_name)
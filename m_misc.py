@@ -31,6 +31,10 @@ from .utils import prop_to_drive_layer
 from .utils import get_ik_group_name
 from .utils import bone_visibility
 from .utils import translate_bone_local
+from .utils import set_mode
+from .utils import add_constraint
+from .utils import set_pose_bone_prop
+from .utils import get_shape_scale
 
 def ik_prop_bone(bvh_tree, shape_collection, name, source_bone_name, parent_name):
     
@@ -51,8 +55,6 @@ def ik_prop_bone(bvh_tree, shape_collection, name, source_bone_name, parent_name
 
 def touch_bone(bvh_tree, shape_collection, module, source_bone_name, ik_bone_name, side, bone_shape_up):
     
-    rig = bpy.context.object
-    
     group = get_ik_group_name(side)
 
     name = 'touch_' + source_bone_name
@@ -61,8 +63,6 @@ def touch_bone(bvh_tree, shape_collection, module, source_bone_name, ik_bone_nam
                    parent_name=''
                    )
     
-    bpy.ops.object.mode_set(mode='POSE')
-    
     bone_settings(bvh_tree=bvh_tree,
                   shape_collection=shape_collection, 
                   bone_name=name, 
@@ -71,30 +71,26 @@ def touch_bone(bvh_tree, shape_collection, module, source_bone_name, ik_bone_nam
                   lock_scale=True,  
                   bone_shape_name='twist_target', 
                   bone_shape_pos='HEAD',
-                  bone_shape_manual_scale=rig.pose.bones[ik_bone_name].custom_shape_scale,
+                  bone_shape_manual_scale=get_shape_scale(ik_bone_name),
                   bone_shape_up=bone_shape_up,
                   bone_type=Constants.touch_type
                   )
     
-    bpy.ops.object.mode_set(mode='POSE')
-    pbones = rig.pose.bones
-    pbone = pbones[name]
-    c = pbone.constraints.new('CHILD_OF')
-    c.name = 'Touch Bone'
-    c.target = rig
-    # set inverse matrix
-    rig.data.bones.active = rig.data.bones[name]
-    context_copy = bpy.context.copy()
-    context_copy["constraint"] = pbone.constraints['Touch Bone']
-    bpy.ops.constraint.childof_set_inverse(context_copy, constraint='Touch Bone', owner='BONE')
+    # child of the whole rig, set inverse matrix
+    add_constraint(bone_name=name,
+                   type='CHILD_OF',
+                   set_inverse=True,
+                   name='Touch Bone',
+                   subtarget=''
+                   )
 
     # ik bone copy touch bone transforms
-    pbone = pbones[ik_bone_name]
-    c = pbone.constraints.new('COPY_TRANSFORMS')
-    c.name = 'Copy Touch Bone'
-    c.target = rig
-    c.subtarget = name
-    c.mute = False
+    add_constraint(bone_name=ik_bone_name,
+                   type='COPY_TRANSFORMS',
+                   name='Copy Touch Bone',
+                   subtarget=name,
+                   mute=False
+                   )
 
     prop_to_drive_constraint(prop_bone_name=ik_bone_name, 
                              bone_name=ik_bone_name, 
@@ -116,14 +112,13 @@ def touch_bone(bvh_tree, shape_collection, module, source_bone_name, ik_bone_nam
                     )
 
     # for ui
-    pbone = pbones[name]
-    pbone['module'] = module
+    set_pose_bone_prop(name, 'module', module)
 
 
 def chain_target(bvh_tree, shape_collection, fk_chain, ik_chain, chain_target_distance, chain_target_size, target_name, bone_shape_name, use_copy_loc, copy_loc_target_bone_name, add_constraint_to_layer, module, prop_name):
     
     rig = bpy.context.object
-    bpy.ops.object.mode_set(mode='EDIT')
+    set_mode('EDIT')
     ebone = rig.data.edit_bones.new(name=target_name)
     ebone.head = rig.data.edit_bones[fk_chain[-1]].head + Vector((0, -chain_target_distance, 0))
     ebone.tail = ebone.head + Vector((0, 0, chain_target_size))
@@ -143,7 +138,6 @@ def chain_target(bvh_tree, shape_collection, fk_chain, ik_chain, chain_target_di
     def create_servants(layer, source_bones):
         servants = []
         for name in source_bones:
-            bpy.ops.object.mode_set(mode='EDIT')
             servant = 'target_servant_' + name
             duplicate_bone(source_name=name, 
                            new_name=servant, 
@@ -173,20 +167,19 @@ def chain_target(bvh_tree, shape_collection, fk_chain, ik_chain, chain_target_di
 
     # CONSTRAINT TO TARGET
     def constraint_to_target(servants, constraint_bones):
-        bpy.ops.object.mode_set(mode='POSE')
-        pbones = rig.pose.bones
         for index, name in enumerate(constraint_bones):
-            c = pbones[name].constraints.new('TRACK_TO')
-            c.target = rig
-            c.subtarget = servants[index]
-            c.up_axis = 'UP_Y'
-            c.track_axis = 'TRACK_Z'
-            c.influence = 0
-            c.name = target_name
+            add_constraint(bone_name=name,
+                           type='TRACK_TO',
+                           subtarget=servants[index],
+                           up_axis='UP_Y',
+                           track_axis='TRACK_Z',
+                           influence=0,
+                           name=target_name
+                           )
 
             prop_to_drive_constraint(prop_bone_name=name, 
                                      bone_name=name, 
-                                     constraint_name=c.name,
+                                     constraint_name=target_name,
                                      prop_name=name + '_to_' + target_name, 
                                      attribute='influence',
                                      prop_min=0.0, 
@@ -201,19 +194,18 @@ def chain_target(bvh_tree, shape_collection, fk_chain, ik_chain, chain_target_di
                          )
 
     if use_copy_loc:
-        bpy.ops.object.mode_set(mode='POSE')
-        pbones = rig.pose.bones
-        c = pbones[target_name].constraints.new('COPY_LOCATION')
-        c.name = 'Copy ' + copy_loc_target_bone_name
-        c.target = rig
-        c.subtarget = copy_loc_target_bone_name
-        c.use_offset = True
-        c.target_space = 'LOCAL'
-        c.owner_space = 'LOCAL'
+        add_constraint(bone_name=target_name,
+                       type='COPY_LOCATION',
+                       name='Copy ' + copy_loc_target_bone_name,
+                       subtarget=copy_loc_target_bone_name,
+                       use_offset=True,
+                       target_space='LOCAL',
+                       owner_space='LOCAL'
+                       )
 
         prop_to_drive_constraint(prop_bone_name=target_name, 
                                  bone_name=target_name, 
-                                 constraint_name=c.name,
+                                 constraint_name='Copy ' + copy_loc_target_bone_name,
                                  prop_name='stick_to_' + copy_loc_target_bone_name, 
                                  attribute='influence',
                                  prop_min=0.0, 
@@ -35,6 +35,9 @@ from .utils import bone_visibility
 from .utils import get_parent_name
 from .utils import create_leaf_bone
 from .utils import set_bone_only_layer
+from .utils import set_mode
+from .utils import add_constraint
+from .utils import get_spec
 
 
 def short_neck(bvh_tree, shape_collection, module, bone_name, distributor_parent_name, ik_rot_bone_name, ik_loc_bone_name, use_twist):
@@ -56,7 +59,7 @@ def short_neck(bvh_tree, shape_collection, module, bone_name, distributor_parent
     # LOW-LEVEL BONES
 
     neck_name = bone_name
-    bpy.ops.object.mode_set(mode='EDIT')
+    set_mode('EDIT')
     ebones = rig.data.edit_bones
     ebones[neck_name].parent = ebones[parent]
     
@@ -74,7 +77,6 @@ def short_neck(bvh_tree, shape_collection, module, bone_name, distributor_parent
 
     # FK BONES
 
-    bpy.ops.object.mode_set(mode='EDIT')
     name = fk_prefix + neck_name
     ebone = rig.data.edit_bones.new(name=name)
     ebones = rig.data.edit_bones
@@ -98,15 +100,12 @@ def short_neck(bvh_tree, shape_collection, module, bone_name, distributor_parent
     relevant_bone_names.append(name)
 
     # LOW-LEVEL TO FK RIG constraint
-    bpy.ops.object.mode_set(mode='POSE')
-    pbone = rig.pose.bones[neck_name]
-    cs = pbone.constraints
-
-    c = cs.new('COPY_ROTATION')
-    c.name = 'bind_to_fk_1'
-    c.target = rig
-    c.subtarget = fk_prefix + neck_name
-    c.mute = True
+    add_constraint(bone_name=neck_name,
+                   type='COPY_ROTATION',
+                   name='bind_to_fk_1',
+                   subtarget=fk_prefix + neck_name,
+                   mute=True
+                   )
 
     # _____________________________________________________________________________________________________
 
@@ -135,7 +134,7 @@ def short_neck(bvh_tree, shape_collection, module, bone_name, distributor_parent
         
         duplicate_bone(source_name=neck_name, 
                        new_name=neck_mediator_name, 
-                       parent_name=rig.data.bones[neck_name].parent.name
+                       parent_name=get_parent_name(neck_name)
                        )
         bone_settings(bone_name=neck_mediator_name, 
                       layer_index=Constants.misc_layer, 
@@ -144,63 +143,66 @@ def short_neck(bvh_tree, shape_collection, module, bone_name, distributor_parent
                       )
 
         # constraints (neck_twist)
-        pbone = rig.pose.bones[neck_twist_name]
-
-        c = pbone.constraints.new('TRACK_TO')
-        c.target = rig
-        c.subtarget = 'head'
-        c.head_tail = 0
-        c.track_axis = 'TRACK_Y'
-        c.up_axis = 'UP_Z'
-        c.use_target_z = True
-        c.target_space = 'POSE'
-        c.owner_space = 'POSE'
-        c.influence = Constants.neck_twist_track_to_head
-
-        c = pbone.constraints.new('LIMIT_ROTATION')
-        c.owner_space = 'LOCAL'
-        c.use_limit_x = True
-        c.use_limit_y = False
-        c.use_limit_z = True
-        c.min_x = 0
-        c.max_x = 0
-        c.min_z = 0
-        c.max_z = 0
-        c.use_transform_limit = True
-        c.influence = 1
-
-        c = pbone.constraints.new('COPY_ROTATION')
-        c.target = rig
-        c.subtarget = 'neck_mediator'
-        c.use_x = True
-        c.use_y = True
-        c.use_z = True
-        c.invert_x = False
-        c.invert_y = False
-        c.invert_z = False
-        c.use_offset = False
-        c.target_space = 'POSE'
-        c.owner_space = 'POSE'
-        c.influence = Constants.neck_twist_rotate_back
-
-        c = pbone.constraints.new('LIMIT_ROTATION')
-        c.owner_space = 'LOCAL'
-        c.influence = 1
-        c.use_limit_x = False
-        c.use_limit_y = False
-        c.use_limit_z = True
-        c.min_x = 0
-        c.max_x = 0
-        c.min_y = 0
-        c.max_y = 0
-        c.min_z = radians(Constants.neck_twist_min_y)
-        c.max_z = 0
-        c.use_transform_limit = True
+        add_constraint(bone_name=neck_twist_name,
+                       type='TRACK_TO',
+                       subtarget='head',
+                       head_tail=0,
+                       track_axis='TRACK_Y',
+                       up_axis='UP_Z',
+                       use_target_z=True,
+                       target_space='POSE',
+                       owner_space='POSE',
+                       influence=Constants.neck_twist_track_to_head
+                       )
+
+        add_constraint(bone_name=neck_twist_name,
+                       type='LIMIT_ROTATION',
+                       owner_space='LOCAL',
+                       use_limit_x=True,
+                       use_limit_y=False,
+                       use_limit_z=True,
+                       min_x=0,
+                       max_x=0,
+                       min_z=0,
+                       max_z=0,
+                       use_transform_limit=True,
+                       influence=1
+                       )
+
+        add_constraint(bone_name=neck_twist_name,
+                       type='COPY_ROTATION',
+                       subtarget='neck_mediator',
+                       use_x=True,
+                       use_y=True,
+                       use_z=True,
+                       invert_x=False,
+                       invert_y=False,
+                       invert_z=False,
+                       use_offset=False,
+                       target_space='POSE',
+                       owner_space='POSE',
+                       influence=Constants.neck_twist_rotate_back
+                       )
+
+        add_constraint(bone_name=neck_twist_name,
+                       type='LIMIT_ROTATION',
+                       owner_space='LOCAL',
+                       influence=1,
+                       use_limit_x=False,
+                       use_limit_y=False,
+                       use_limit_z=True,
+                       min_x=0,
+                       max_x=0,
+                       min_y=0,
+                       max_y=0,
+                       min_z=radians(Constants.neck_twist_min_y),
+                       max_z=0,
+                       use_transform_limit=True
+                       )
 
     # _____________________________________________________________________________________________________
 
     # IK BONES
-    bpy.ops.object.mode_set(mode='EDIT')
     
     # distributor
     distributor_name = Constants.ctrl_prefix + neck_name
@@ -228,12 +230,13 @@ def short_neck(bvh_tree, shape_collection, module, bone_name, distributor_parent
                         layer_index=Constants.misc_layer
                         )
     # use fk_neck's bone scale
-    bpy.ops.object.mode_set(mode='POSE')
-    pbones = rig.pose.bones
-    pbones[distributor_name].custom_shape_transform = pbones[shape_bone_name]
-    pbones[distributor_name].custom_shape = pbones[fk_prefix + neck_name].custom_shape
-    pbones[distributor_name].custom_shape_scale = pbones[fk_prefix + neck_name].custom_shape_scale
-    pbones[distributor_name].use_custom_shape_bone_size = pbones[fk_prefix + neck_name].use_custom_shape_bone_size
+    spec = get_spec()
+    fk_record = spec.bone(fk_prefix + neck_name)
+    record = spec.bone(distributor_name)
+    record.custom_shape_transform = shape_bone_name
+    record.custom_shape = fk_record.custom_shape
+    record.custom_shape_scale = fk_record.custom_shape_scale
+    record.use_custom_shape_bone_size = fk_record.use_custom_shape_bone_size
     
     # ik_neck
     name = ik_prefix + neck_name
@@ -250,38 +253,37 @@ def short_neck(bvh_tree, shape_collection, module, bone_name, distributor_parent
                   )
                   
     # costraints
-    bpy.ops.object.mode_set(mode='POSE')
-    pbone = rig.pose.bones[distributor_name]
-
-    c = pbone.constraints.new('COPY_ROTATION')
-    c.name = 'inherit_rot'
-    c.target = rig
-    c.subtarget = ik_rot_bone_name
-    c.use_x = True
-    c.use_y = True
-    c.use_z = True
-    c.invert_x = False
-    c.invert_y = False
-    c.invert_z = False
-    c.use_offset = True
-    c.target_space = 'LOCAL'
-    c.owner_space = 'LOCAL'
-    c.influence = Constants.fixate_ctrl_neck
-
-    c = pbone.constraints.new('COPY_LOCATION')
-    c.target = rig
-    c.subtarget = ik_loc_bone_name
-    c.head_tail = 1
-    c.use_x = True
-    c.use_y = True
-    c.use_z = True
-    c.invert_x = False
-    c.invert_y = False
-    c.invert_z = False
-    c.use_offset = False
-    c.target_space = 'WORLD'
-    c.owner_space = 'WORLD'
-    c.influence = 1
+    add_constraint(bone_name=distributor_name,
+                   type='COPY_ROTATION',
+                   name='inherit_rot',
+                   subtarget=ik_rot_bone_name,
+                   use_x=True,
+                   use_y=True,
+                   use_z=True,
+                   invert_x=False,
+                   invert_y=False,
+                   invert_z=False,
+                   use_offset=True,
+                   target_space='LOCAL',
+                   owner_space='LOCAL',
+                   influence=Constants.fixate_ctrl_neck
+                   )
+
+    add_constraint(bone_name=distributor_name,
+                   type='COPY_LOCATION',
+                   subtarget=ik_loc_bone_name,
+                   head_tail=1,
+                   use_x=True,
+                   use_y=True,
+                   use_z=True,
+                   invert_x=False,
+                   invert_y=False,
+                   invert_z=False,
+                   use_offset=False,
+                   target_space='WORLD',
+                   owner_space='WORLD',
+                   influence=1
+                   )
                   
     prop_to_drive_constraint(prop_bone_name=distributor_name, 
                              bone_name=distributor_name, 
@@ -296,15 +298,12 @@ def short_neck(bvh_tree, shape_collection, module, bone_name, distributor_parent
                              )
 
     # LOW-LEVEL TO IK RIG constraint
-    bpy.ops.object.mode_set(mode='POSE')
-    pbone = rig.pose.bones[neck_name]
-    cs = pbone.constraints
-
-    c = cs.new('COPY_ROTATION')
-    c.name = 'bind_to_ik_1'
-    c.target = rig
-    c.subtarget = ik_prefix + neck_name
-    c.mute = True
+    add_constraint(bone_name=neck_name,
+                   type='COPY_ROTATION',
+                   name='bind_to_ik_1',
+                   subtarget=ik_prefix + neck_name,
+                   mute=True
+                   )
 
     # BIND TO (0: FK, 1: IK, 2:BIND)
     prop_to_drive_constraint(prop_bone_name=prop_bone_name, 
@@ -344,9 +343,6 @@ def short_neck(bvh_tree, shape_collection, module, bone_name, distributor_parent
                                  )
 
     # snap_info
-    bpy.ops.object.mode_set(mode='POSE')
-    pbones = rig.pose.bones
-    pbone = pbones[prop_bone_name]
-    si = 'snapinfo_simpletobase_0'
-    if si in pbone:
-        pbone[si] = pbone[si] + [neck_name]
+    snap_info = get_spec().get_snap_info(prop_bone_name, 'snapinfo_simpletobase_0')
+    if snap_info is not None:
+        snap_info.append(neck_name)
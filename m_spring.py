@@ -33,6 +33,8 @@ from .utils import subdivide_bone
 from .utils import rotate_bone_local
 from .utils import create_no_twist_bone
 from .utils import set_bone_shape
+from .utils import set_mode
+from .utils import add_constraint
 
 
 def spring_belly(bvh_tree, shape_collection, module, waist_bone_names, loc_pelvis_front, loc_sternum_lower):
@@ -43,7 +45,7 @@ def spring_belly(bvh_tree, shape_collection, module, waist_bone_names, loc_pelvi
     relevant_bone_names = []
 
     # target belly
-    bpy.ops.object.mode_set(mode='EDIT')
+    set_mode('EDIT')
     ebones = rig.data.edit_bones
     ebone = ebones.new(name='target_belly')
     ebone.head = (ebones[loc_sternum_lower].head + ebones[loc_pelvis_front].head) * .5
@@ -85,126 +87,122 @@ def spring_belly(bvh_tree, shape_collection, module, waist_bone_names, loc_pelvi
     ebone.parent = ebones[waist_bone_names[0]]
 
     # constraints
-    bpy.ops.object.mode_set(mode='POSE')
-    pbones = rig.pose.bones
-
-    pbone = pbones['waist_mediator']
-    c = pbone.constraints.new('DAMPED_TRACK')
-    c.name = 'track to waist_upper.tail'
-    c.target = rig
-    c.subtarget = waist_bone_names[-1]
-    c.head_tail = 1
-    c.track_axis = 'TRACK_Y'
-    c.influence = 1
-
-    pbone = pbones['target_belly']
-    cs = pbone.constraints
-    c = cs.new('COPY_LOCATION')
-    c.name = 'mean: sternum, hips 1'
-    c.target = rig
-    c.subtarget = loc_sternum_lower
-    c.use_x = True
-    c.use_y = True
-    c.use_z = True
-    c.invert_x = False
-    c.invert_y = False
-    c.invert_z = False
-    c.use_offset = False
-    c.head_tail = 0
-    c.target_space = 'WORLD'
-    c.owner_space = 'WORLD'
-    c.influence = 1
-
-    c = cs.new('COPY_LOCATION')
-    c.name = 'mean: sternum, hips 2'
-    c.target = rig
-    c.subtarget = loc_pelvis_front
-    c.use_x = True
-    c.use_y = True
-    c.use_z = True
-    c.invert_x = False
-    c.invert_y = False
-    c.invert_z = False
-    c.use_offset = False
-    c.head_tail = 0
-    c.target_space = 'WORLD'
-    c.owner_space = 'WORLD'
-    c.influence = 0.5
-
-    pbone = pbones['spring_belly']
-    cs = pbone.constraints
-    c = cs.new('TRANSFORM')
-    c.name = 'waist_lower rot to scale'
-    c.use_motion_extrapolate = False
-    c.target = rig
-    c.subtarget = 'waist_mediator'
-    c.map_from = 'ROTATION'
-    c.map_to = 'SCALE'
-    c.map_to_x_from = 'X'
-    c.map_to_y_from = 'X'
-    c.map_to_z_from = 'X'
-    c.from_min_x_rot = 0
-    c.from_max_x_rot = radians(Constants.spring_belly__waist_lower_rot_to_scale__waist_lower_rot)
-    c.to_min_y_scale = 1
-    c.to_max_y_scale = Constants.spring_belly__waist_lower_rot_to_scale__scale
-    c.to_min_x_scale = 1
-    c.to_max_x_scale = Constants.spring_belly__waist_lower_rot_to_scale__scale
-    c.to_min_z_scale = 1
-    c.to_max_z_scale = Constants.spring_belly__waist_lower_rot_to_scale__scale
-    c.target_space = 'LOCAL'
-    c.owner_space = 'LOCAL'
-    c.influence = 1
-
-    c = cs.new('COPY_ROTATION')
-    c.name = 'copy tracker_belly'
-    c.target = rig
-    c.subtarget = 'tracker_belly'
-    c.use_x = True
-    c.use_y = True
-    c.use_z = True
-    c.invert_x = False
-    c.invert_y = False
-    c.invert_z = False
-    c.use_offset = True
-    c.target_space = 'LOCAL'
-    c.owner_space = 'LOCAL'
-    c.influence = 1
-
-    pbone = pbones['tracker_belly']
-    c = pbone.constraints.new('TRACK_TO')
-    c.name = 'track to target belly'
-    c.target = rig
-    c.subtarget = 'target_belly'
-    c.head_tail = 0
-    c.track_axis = 'TRACK_Y'
-    c.up_axis = 'UP_Z'
-    c.use_target_z = True
-    c.target_space = 'WORLD'
-    c.owner_space = 'WORLD'
-    c.influence = 1
-
-    pbone = pbones['belly']
-    c = pbone.constraints.new('LIMIT_SCALE')
-    c.name = 'keep scale 1'
-    c.use_min_x = True
-    c.use_max_x = True
-    c.use_min_y = True
-    c.use_max_y = True
-    c.use_min_z = True
-    c.use_max_z = True
-    c.min_x = 1
-    c.max_x = 1
-    c.min_y = 1
-    c.max_y = 1
-    c.min_z = 1
-    c.max_z = 1
-    c.use_transform_limit = True
-    c.owner_space = 'POSE'
-    c.influence = 1
+    add_constraint(bone_name='waist_mediator',
+                   type='DAMPED_TRACK',
+                   name='track to waist_upper.tail',
+                   subtarget=waist_bone_names[-1],
+                   head_tail=1,
+                   track_axis='TRACK_Y',
+                   influence=1
+                   )
+
+    add_constraint(bone_name='target_belly',
+                   type='COPY_LOCATION',
+                   name='mean: sternum, hips 1',
+                   subtarget=loc_sternum_lower,
+                   use_x=True,
+                   use_y=True,
+                   use_z=True,
+                   invert_x=False,
+                   invert_y=False,
+                   invert_z=False,
+                   use_offset=False,
+                   head_tail=0,
+                   target_space='WORLD',
+                   owner_space='WORLD',
+                   influence=1
+                   )
+
+    add_constraint(bone_name='target_belly',
+                   type='COPY_LOCATION',
+                   name='mean: sternum, hips 2',
+                   subtarget=loc_pelvis_front,
+                   use_x=True,
+                   use_y=True,
+                   use_z=True,
+                   invert_x=False,
+                   invert_y=False,
+                   invert_z=False,
+                   use_offset=False,
+                   head_tail=0,
+                   target_space='WORLD',
+                   owner_space='WORLD',
+                   influence=0.5
+                   )
+
+    add_constraint(bone_name='spring_belly',
+                   type='TRANSFORM',
+                   name='waist_lower rot to scale',
+                   use_motion_extrapolate=False,
+                   subtarget='waist_mediator',
+                   map_from='ROTATION',
+                   map_to='SCALE',
+                   map_to_x_from='X',
+                   map_to_y_from='X',
+                   map_to_z_from='X',
+                   from_min_x_rot=0,
+                   from_max_x_rot=radians(Constants.spring_belly__waist_lower_rot_to_scale__waist_lower_rot),
+                   to_min_y_scale=1,
+                   to_max_y_scale=Constants.spring_belly__waist_lower_rot_to_scale__scale,
+                   to_min_x_scale=1,
+                   to_max_x_scale=Constants.spring_belly__waist_lower_rot_to_scale__scale,
+                   to_min_z_scale=1,
+                   to_max_z_scale=Constants.spring_belly__waist_lower_rot_to_scale__scale,
+                   target_space='LOCAL',
+                   owner_space='LOCAL',
+                   influence=1
+                   )
+
+    add_constraint(bone_name='spring_belly',
+                   type='COPY_ROTATION',
+                   name='copy tracker_belly',
+                   subtarget='tracker_belly',
+                   use_x=True,
+                   use_y=True,
+                   use_z=True,
+                   invert_x=False,
+                   invert_y=False,
+                   invert_z=False,
+                   use_offset=True,
+                   target_space='LOCAL',
+                   owner_space='LOCAL',
+                   influence=1
+                   )
+
+    add_constraint(bone_name='tracker_belly',
+                   type='TRACK_TO',
+                   name='track to target belly',
+                   subtarget='target_belly',
+                   head_tail=0,
+                   track_axis='TRACK_Y',
+                   up_axis='UP_Z',
+                   use_target_z=True,
+                   target_space='WORLD',
+                   owner_space='WORLD',
+                   influence=1
+                   )
+
+    add_constraint(bone_name='belly',
+                   type='LIMIT_SCALE',
+                   name='keep scale 1',
+                   use_min_x=True,
+                   use_max_x=True,
+                   use_min_y=True,
+                   use_max_y=True,
+                   use_min_z=True,
+                   use_max_z=True,
+                   min_x=1,
+                   max_x=1,
+                   min_y=1,
+                   max_y=1,
+                   min_z=1,
+                   max_z=1,
+                   use_transform_limit=True,
+                   owner_space='POSE',
+                   influence=1
+                   )
 
     # format bones
-    bpy.ops.object.mode_set(mode='POSE')
-    
     bone_settings(bone_name='spring_belly', 
                   layer_index=Constants.spring_layer, 
                   group_name=Constants.spring_group, 
@@ -251,8 +249,6 @@ def spring_belly(bvh_tree, shape_collection, module, waist_bone_names, loc_pelvi
 
 def spring_chest(bvh_tree, shape_collection, module, chest_name, shoulder_name):
     
-    rig = bpy.context.object
-    
     # bones that should be used for animation
     relevant_bone_names = []
 
@@ -276,60 +272,60 @@ def spring_chest(bvh_tree, shape_collection, module, chest_name, shoulder_name):
     left_suffix = Constants.sides[0]
     side = 'left' if chest_name.endswith(left_suffix) else 'right'
 
-    bpy.ops.object.mode_set(mode='POSE')
-    pbones = rig.pose.bones
-    pbone = pbones[chest_name]
-    c = pbone.constraints.new('TRANSFORM')
-    c.name = 'move shoulder up'
-    c.use_motion_extrapolate = False
-    c.target = rig
-    c.subtarget = shoulder_name
-    c.map_from = 'ROTATION'
-    c.map_to = 'ROTATION'
-    c.map_to_x_from = 'Z'
-    c.map_to_y_from = 'Z'
-    c.map_to_z_from = 'Z'
-
-    if side == 'left':
-        c.from_min_z_rot = 0
-        c.from_max_z_rot = radians(Constants.spring_chest__shoulder_up__shoulder_rot)
-        c.to_min_x_rot = 0
-        c.to_max_x_rot = radians(Constants.spring_chest__shoulder_up__rot)
-    else:
-        c.from_min_z_rot = radians(Constants.spring_chest__shoulder_up__shoulder_rot) * -1
-        c.from_max_z_rot = 0
-        c.to_min_x_rot = radians(Constants.spring_chest__shoulder_up__rot)
-        c.to_max_x_rot = 0
-
-    c.target_space = 'LOCAL'
-    c.owner_space = 'LOCAL'
-    c.influence = 1
-
-    c = pbone.constraints.new('TRANSFORM')
-    c.name = 'move shoulder down'
-    c.use_motion_extrapolate = False
-    c.target = rig
-    c.subtarget = shoulder_name
-    c.map_from = 'ROTATION'
-    c.map_to = 'ROTATION'
-    c.map_to_x_from = 'Z'
-    c.map_to_y_from = 'Z'
-    c.map_to_z_from = 'Z'
-
     if side == 'left':
-        c.from_min_z_rot = radians(Constants.spring_chest__shoulder_down__shoulder_rot)
-        c.from_max_z_rot = 0
-        c.to_min_x_rot = radians(Constants.spring_chest__shoulder_down__rot)
-        c.to_max_x_rot = 0
+        up_ranges = {'from_min_z_rot': 0,
+                     'from_max_z_rot': radians(Constants.spring_chest__shoulder_up__shoulder_rot),
+                     'to_min_x_rot': 0,
+                     'to_max_x_rot': radians(Constants.spring_chest__shoulder_up__rot)
+                     }
+        down_ranges = {'from_min_z_rot': radians(Constants.spring_chest__shoulder_down__shoulder_rot),
+                       'from_max_z_rot': 0,
+                       'to_min_x_rot': radians(Constants.spring_chest__shoulder_down__rot),
+                       'to_max_x_rot': 0
+                       }
     else:
-        c.from_min_z_rot = 0
-        c.from_max_z_rot = radians(Constants.spring_chest__shoulder_down__shoulder_rot) * -1
-        c.to_min_x_rot = 0
-        c.to_max_x_rot = radians(Constants.spring_chest__shoulder_down__rot)
+        up_ranges = {'from_min_z_rot': radians(Constants.spring_chest__shoulder_up__shoulder_rot) * -1,
+                     'from_max_z_rot': 0,
+                     'to_min_x_rot': radians(Constants.spring_chest__shoulder_up__rot),
+                     'to_max_x_rot': 0
+                     }
+        down_ranges = {'from_min_z_rot': 0,
+                       'from_max_z_rot': radians(Constants.spring_chest__shoulder_down__shoulder_rot) * -1,
+                       'to_min_x_rot': 0,
+                       'to_max_x_rot': radians(Constants.spring_chest__shoulder_down__rot)
+                       }
+
+    add_constraint(bone_name=chest_name,
+                   type='TRANSFORM',
+                   name='move shoulder up',
+                   use_motion_extrapolate=False,
+                   subtarget=shoulder_name,
+                   map_from='ROTATION',
+                   map_to='ROTATION',
+                   map_to_x_from='Z',
+                   map_to_y_from='Z',
+                   map_to_z_from='Z',
+                   target_space='LOCAL',
+                   owner_space='LOCAL',
+                   influence=1,
+                   **up_ranges
+                   )
 
-    c.target_space = 'LOCAL'
-    c.owner_space = 'LOCAL'
-    c.influence = 1
+    add_constraint(bone_name=chest_name,
+                   type='TRANSFORM',
+                   name='move shoulder down',
+                   use_motion_extrapolate=False,
+                   subtarget=shoulder_name,
+                   map_from='ROTATION',
+                   map_to='ROTATION',
+                   map_to_x_from='Z',
+                   map_to_y_from='Z',
+                   map_to_z_from='Z',
+                   target_space='LOCAL',
+                   owner_space='LOCAL',
+                   influence=1,
+                   **down_ranges
+                   )
 
     # set module name on relevant bones (used by the 'N-panel' interface)
     set_module_on_relevant_bones(relevant_bone_names=relevant_bone_names, 
@@ -346,7 +342,7 @@ def spring_bottom(bvh_tree, shape_collection, module, source_bone_name, parent_n
     relevant_bone_names = []
 
     # create spring bottom
-    bpy.ops.object.mode_set(mode='EDIT')
+    set_mode('EDIT')
     bottom_raw_name = 'bottom_raw' + side 
     duplicate_bone(source_name=source_bone_name,
                    new_name=bottom_raw_name, 
@@ -367,7 +363,6 @@ def spring_bottom(bvh_tree, shape_collection, module, source_bone_name, parent_n
     ebones = rig.data.edit_bones
     ray_start = ebones[source_bone_name].head
     ray_direction = ebones[bottom_raw_name].tail - ray_start
-    bpy.ops.object.mode_set(mode='OBJECT')
     ray_distance = 10
 
     # cast ray
@@ -377,7 +372,6 @@ def spring_bottom(bvh_tree, shape_collection, module, source_bone_name, parent_n
                                                               )
 
     # adjust tail
-    bpy.ops.object.mode_set(mode='EDIT')
     ebones = rig.data.edit_bones
     ebone = ebones[bottom_raw_name]
     ebone.tail = hit_loc
@@ -432,119 +426,109 @@ def spring_bottom(bvh_tree, shape_collection, module, source_bone_name, parent_n
                   bone_type=Constants.spring_type
                   )
                   
-    bpy.ops.object.mode_set(mode='POSE')
-    pbones = rig.pose.bones
-    pbone = pbones[spring_bottom_name]
-    c = pbone.constraints.new('TRANSFORM')
-    c.name = 'thigh bend fwd to scale'
-    c.use_motion_extrapolate = False
-    c.target = rig
-    c.subtarget = no_twist_name
-    c.map_from = 'ROTATION'
-    c.map_to = 'SCALE'
+    add_constraint(bone_name=spring_bottom_name,
+                   type='TRANSFORM',
+                   name='thigh bend fwd to scale',
+                   use_motion_extrapolate=False,
+                   subtarget=no_twist_name,
+                   map_from='ROTATION',
+                   map_to='SCALE',
+                   map_to_x_from='X',
+                   map_to_y_from='X',
+                   map_to_z_from='X',
+                   from_min_x_rot=0,
+                   from_max_x_rot=radians(Constants.spring_bottom__thigh_bend_fwd_to_scale__thigh_rot),
+                   to_min_x_scale=1,
+                   to_max_x_scale=Constants.spring_bottom__thigh_bend_fwd_to_scale__scale,
+                   to_min_y_scale=1,
+                   to_max_y_scale=Constants.spring_bottom__thigh_bend_fwd_to_scale__scale,
+                   to_min_z_scale=1,
+                   to_max_z_scale=Constants.spring_bottom__thigh_bend_fwd_to_scale__scale,
+                   target_space='LOCAL',
+                   owner_space='LOCAL',
+                   influence=0.5
+                   )
 
-    if source_bone_bend_axis == '-X':
-        c.map_to_x_from = 'X'
-        c.map_to_y_from = 'X'
-        c.map_to_z_from = 'X'
-        c.from_min_x_rot = 0
-        c.from_max_x_rot = radians(Constants.spring_bottom__thigh_bend_fwd_to_scale__thigh_rot)
-        c.to_min_x_scale = 1
-        c.to_max_x_scale = Constants.spring_bottom__thigh_bend_fwd_to_scale__scale
-        c.to_min_y_scale = 1
-        c.to_max_y_scale = Constants.spring_bottom__thigh_bend_fwd_to_scale__scale
-        c.to_min_z_scale = 1
-        c.to_max_z_scale = Constants.spring_bottom__thigh_bend_fwd_to_scale__scale
-
-    c.target_space = 'LOCAL'
-    c.owner_space = 'LOCAL'
-    c.influence = 0.5
-
-    c = pbone.constraints.new('TRANSFORM')
-    c.name = 'thigh bend fwd to rot'
-    c.use_motion_extrapolate = False
-    c.target = rig
-    c.subtarget = no_twist_name
-    c.map_from = 'ROTATION'
-    c.map_to = 'ROTATION'
+    add_constraint(bone_name=spring_bottom_name,
+                   type='TRANSFORM',
+                   name='thigh bend fwd to rot',
+                   use_motion_extrapolate=False,
+                   subtarget=no_twist_name,
+                   map_from='ROTATION',
+                   map_to='ROTATION',
+                   map_to_x_from='X',
+                   map_to_y_from='X',
+                   map_to_z_from='X',
+                   from_min_x_rot=0,
+                   from_max_x_rot=radians(Constants.spring_bottom__thigh_bend_fwd_to_rot__thigh_rot),
+                   to_min_x_rot=0,
+                   to_max_x_rot=radians(Constants.spring_bottom__thigh_bend_fwd_to_rot__rot),
+                   target_space='LOCAL',
+                   owner_space='LOCAL',
+                   influence=0.5
+                   )
 
-    if source_bone_bend_axis == '-X':
-        c.map_to_x_from = 'X'
-        c.map_to_y_from = 'X'
-        c.map_to_z_from = 'X'
-        c.from_min_x_rot = 0
-        c.from_max_x_rot = radians(Constants.spring_bottom__thigh_bend_fwd_to_rot__thigh_rot)
-        c.to_min_x_rot = 0
-        c.to_max_x_rot = radians(Constants.spring_bottom__thigh_bend_fwd_to_rot__rot)
-
-    c.target_space = 'LOCAL'
-    c.owner_space = 'LOCAL'
-    c.influence = 0.5
-
-    c = pbone.constraints.new('TRANSFORM')
-    c.name = 'thigh bend bwd to scale'
-    c.use_motion_extrapolate = False
-    c.target = rig
-    c.subtarget = no_twist_name
-    c.map_from = 'ROTATION'
-    c.map_to = 'SCALE'
+    add_constraint(bone_name=spring_bottom_name,
+                   type='TRANSFORM',
+                   name='thigh bend bwd to scale',
+                   use_motion_extrapolate=False,
+                   subtarget=no_twist_name,
+                   map_from='ROTATION',
+                   map_to='SCALE',
+                   map_to_x_from='X',
+                   map_to_y_from='X',
+                   map_to_z_from='X',
+                   from_min_x_rot=radians(Constants.spring_bottom__thigh_bend_bwd_to_scale__thigh_rot),
+                   from_max_x_rot=0,
+                   to_min_x_scale=Constants.spring_bottom__thigh_bend_bwd_to_scale__scale,
+                   to_max_x_scale=1,
+                   to_min_y_scale=Constants.spring_bottom__thigh_bend_bwd_to_scale__scale,
+                   to_max_y_scale=1,
+                   to_min_z_scale=Constants.spring_bottom__thigh_bend_bwd_to_scale__scale,
+                   to_max_z_scale=1,
+                   target_space='LOCAL',
+                   owner_space='LOCAL',
+                   influence=0.5
+                   )
 
-    if source_bone_bend_axis == '-X':
-        c.map_to_x_from = 'X'
-        c.map_to_y_from = 'X'
-        c.map_to_z_from = 'X'
-        c.from_min_x_rot = radians(Constants.spring_bottom__thigh_bend_bwd_to_scale__thigh_rot)
-        c.from_max_x_rot = 0
-        c.to_min_x_scale = Constants.spring_bottom__thigh_bend_bwd_to_scale__scale
-        c.to_max_x_scale = 1
-        c.to_min_y_scale = Constants.spring_bottom__thigh_bend_bwd_to_scale__scale
-        c.to_max_y_scale = 1
-        c.to_min_z_scale = Constants.spring_bottom__thigh_bend_bwd_to_scale__scale
-        c.to_max_z_scale = 1
-
-    c.target_space = 'LOCAL'
-    c.owner_space = 'LOCAL'
-    c.influence = 0.5
-
-    c = pbone.constraints.new('TRANSFORM')
-    c.name = 'thigh bend bwd to rot'
-    c.use_motion_extrapolate = False
-    c.target = rig
-    c.subtarget = no_twist_name
-    c.map_from = 'ROTATION'
-    c.map_to = 'ROTATION'
+    add_constraint(bone_name=spring_bottom_name,
+                   type='TRANSFORM',
+                   name='thigh bend bwd to rot',
+                   use_motion_extrapolate=False,
+                   subtarget=no_twist_name,
+                   map_from='ROTATION',
+                   map_to='ROTATION',
+                   map_to_x_from='X',
+                   map_to_y_from='X',
+                   map_to_z_from='X',
+                   from_min_x_rot=radians(Constants.spring_bottom__thigh_bend_bwd_to_scale__thigh_rot),
+                   from_max_x_rot=0,
+                   to_min_x_rot=radians(Constants.spring_bottom__thigh_bend_bwd_to_rot__rot),
+                   to_max_x_rot=0,
+                   target_space='LOCAL',
+                   owner_space='LOCAL',
+                   influence=0.5
+                   )
 
-    if source_bone_bend_axis == '-X':
-        c.map_to_x_from = 'X'
-        c.map_to_y_from = 'X'
-        c.map_to_z_from = 'X'
-        c.from_min_x_rot = radians(Constants.spring_bottom__thigh_bend_bwd_to_scale__thigh_rot)
-        c.from_max_x_rot = 0
-        c.to_min_x_rot = radians(Constants.spring_bottom__thigh_bend_bwd_to_rot__rot)
-        c.to_max_x_rot = 0
-
-    c.target_space = 'LOCAL'
-    c.owner_space = 'LOCAL'
-    c.influence = 0.5
-
-    pbone = pbones[bottom_name]
-    c = pbone.constraints.new('LIMIT_SCALE')
-    c.name = 'keep scale 1'
-    c.use_min_x = True
-    c.use_max_x = True
-    c.use_min_y = True
-    c.use_max_y = True
-    c.use_min_z = True
-    c.use_max_z = True
-    c.min_x = 1
-    c.max_x = 1
-    c.min_y = 1
-    c.max_y = 1
-    c.min_z = 1
-    c.max_z = 1
-    c.use_transform_limit = True
-    c.owner_space = 'POSE'
-    c.influence = 1
+    add_constraint(bone_name=bottom_name,
+                   type='LIMIT_SCALE',
+                   name='keep scale 1',
+                   use_min_x=True,
+                   use_max_x=True,
+                   use_min_y=True,
+                   use_max_y=True,
+                   use_min_z=True,
+                   use_max_z=True,
+                   min_x=1,
+                   max_x=1,
+                   min_y=1,
+                   max_y=1,
+                   min_z=1,
+                   max_z=1,
+                   use_transform_limit=True,
+                   owner_space='POSE',
+                   influence=1
+                   )
 
     # set module name on relevant bones (used by the 'N-panel' interface)
     set_module_on_relevant_bones(relevant_bone_names=[spring_bottom_name, bottom_name], 
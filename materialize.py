@@ -0,0 +1,150 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any laTter version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+##########################################################################################################
+##########################################################################################################
+
+import bpy
+
+
+# writes a RigSpec (rig_spec.py) to the armature, expects pose mode,
+# returns the number of props, bones with ui data and drivers written
+def materialize(rig, spec, shape_collection):
+
+    pbones = rig.pose.bones
+    bones = rig.data.bones
+    bone_groups = rig.pose.bone_groups
+
+    # BONES:
+    for record in spec.bones.values():
+        pbone = pbones[record.name]
+        bone = bones[record.name]
+
+        if record.layer is not None:
+            bools = [False] * 32
+            bools[record.layer] = True
+            bone.layers = bools
+        if record.use_deform is not None:
+            bone.use_deform = record.use_deform
+        if record.hide_select is not None:
+            bone.hide_select = record.hide_select
+        if record.reset_flags:
+            bone.hide = False
+            bone.use_inherit_rotation = True
+            bone.use_local_location = True
+            bone.use_inherit_scale = True
+
+        if record.group is not None:
+            pbone.bone_group = bone_groups[record.group] if record.group != '' else None
+        if record.lock_location is not None:
+            pbone.lock_location = record.lock_location
+        if record.lock_rotation is not None:
+            pbone.lock_rotation = record.lock_rotation
+        if record.lock_scale is not None:
+            pbone.lock_scale = record.lock_scale
+        if record.bone_type != '':
+            pbone['bone_type'] = record.bone_type
+
+        if record.custom_shape is not None:
+            if record.custom_shape != '':
+                pbone.custom_shape = shape_collection.objects['GYAZ_game_rigger_WIDGET__' + record.custom_shape]
+            else:
+                pbone.custom_shape = None
+        if record.custom_shape_scale is not None:
+            pbone.custom_shape_scale = record.custom_shape_scale
+        if record.use_custom_shape_bone_size is not None:
+            pbone.use_custom_shape_bone_size = record.use_custom_shape_bone_size
+        if record.custom_shape_transform is not None:
+            pbone.custom_shape_transform = pbones[record.custom_shape_transform]
+
+        for attribute, value in record.pose_attributes.items():
+            setattr(pbone, attribute, value)
+
+    # PROPS:
+    ui_per_bone = {}
+    for record in spec.props.values():
+        pbones[record.bone_name][record.prop_name] = record.value
+        if record.ui is not None:
+            ui_per_bone.setdefault(record.bone_name, {})[record.prop_name] = record.ui
+    
+    # min, max soft_min, soft_max, description on properties,
+    # converting _RNA_UI to an id property is costly, so it's written once per bone
+    for bone_name, ui in ui_per_bone.items():
+        pbone = pbones[bone_name]
+        rna_ui = pbone["_RNA_UI"].to_dict() if "_RNA_UI" in pbone else {}
+        rna_ui.update(ui)
+        pbone["_RNA_UI"] = rna_ui
+
+    # SNAP INFO:
+    for (bone_name, name), items in spec.snap_info.items():
+        pbones[bone_name][name] = items
+
+    # CONSTRAINTS:
+    for record in spec.constraints:
+        pbone = pbones[record.bone_name]
+        c = pbone.constraints.new(record.type)
+        for attribute, value in record.settings.items():
+            if attribute == 'subtarget':
+                c.target = rig
+            elif attribute == 'pole_subtarget':
+                c.pole_target = rig
+            setattr(c, attribute, value)
+        record.name = c.name
+
+        if record.set_inverse:
+            # 'Child Of' constraint
+            bones.active = bones[record.bone_name]
+            context_copy = bpy.context.copy()
+            context_copy["constraint"] = c
+            bpy.ops.constraint.childof_set_inverse(context_copy,
+                                                   constraint=c.name,
+                                                   owner='BONE'
+                                                   )
+
+    # DRIVERS:
+    materialize_drivers(rig, spec.drivers, spec.replace_drivers)
+    
+    return {'props': len(spec.props),
+            'ui_bones': len(ui_per_bone),
+            'drivers': len(spec.drivers)
+            }
+
+
+# drivers: [DriverRecord], replace: remove existing drivers on the same channels first
+def materialize_drivers(rig, drivers, replace):
+    owners = {'OBJECT': rig, 'DATA': rig.data}
+    # most drivers read one of a few switch props
+    target_paths = {}
+    for record in drivers:
+        owner = owners[record.owner]
+        if replace:
+            owner.driver_remove(record.data_path, record.array_index)
+        d = owner.driver_add(record.data_path, record.array_index).driver
+        for variable_name, prop_bone_name, prop_name in record.variables:
+            target_path = target_paths.get((prop_bone_name, prop_name))
+            if target_path is None:
+                target_path = 'pose.bones["' + prop_bone_name + '"]["' + prop_name + '"]'
+                target_paths[(prop_bone_name, prop_name)] = target_path
+            v = d.variables.new()
+            v.name = variable_name
+            v.type = 'SINGLE_PROP'
+            t = v.targets[0]
+            t.id = rig
+            t.data_path = target_path
+        d.expression = record.expression
@@ -0,0 +1,131 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any laTter version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+##########################################################################################################
+##########################################################################################################
+
+from .snap_registry import stamp_prop_name
+
+
+# MODULE INDEX:
+# which bones belong to which module, read from the 'module' and 'bone_type' props of the pose bones once,
+# so the ui operators don't scan every pose bone on each click or redraw.
+# The prop rows the panels draw are kept here too, built the first time a bone is drawn,
+# rebuilt after props are written (write_pose_props) or when the bone's prop count changes (Custom Properties panel).
+# Cached per rig for the session, rebuilt when the rig is regenerated (generation stamp)
+# or on demand (bones edited by hand)
+
+# bumped by props_written, rows built before are stale
+prop_writes = 0
+
+
+def props_written():
+    global prop_writes
+    prop_writes += 1
+
+
+class ModuleIndex():
+
+    def __init__(self, rig):
+        # module: {bone type ('' if none): [bone names]}
+        self.module_bones = {}
+        # bone name: module
+        self.bone_module = {}
+        # module: name of the bone holding the module's props
+        self.props_bones = {}
+        for pbone in rig.pose.bones:
+            if pbone.name.startswith('module_props__'):
+                self.props_bones[pbone.name[14:]] = pbone.name
+            module = pbone.get('module')
+            if module is not None:
+                self.bone_module[pbone.name] = module
+                types = self.module_bones.setdefault(module, {})
+                types.setdefault(pbone.get('bone_type', ''), []).append(pbone.name)
+        # (bone name, kind): (prop count, [(prop path, slider)])
+        self.rows = {}
+        self.rows_prop_writes = prop_writes
+        # snap & key panel: [(module, props bone name)]
+        self.snap_rows = None
+
+    def module_of(self, bone_name):
+        return self.bone_module.get(bone_name)
+
+    # bone_type: None for every bone of the module
+    def bones_of(self, module, bone_type=None):
+        types = self.module_bones.get(module, {})
+        if bone_type is None:
+            return [name for names in types.values() for name in names]
+        return types.get(bone_type, [])
+
+    def props_bone_of(self, module):
+        return self.props_bones.get(module)
+
+    # PANEL ROWS:
+    # kind: 'GENERAL' (low-level rig props), 'MODULE' (switch and visible props of a module), 'BONE' (active bone)
+    def prop_rows(self, pbones, bone_name, kind):
+        if self.rows_prop_writes != prop_writes:
+            self.rows = {}
+            self.rows_prop_writes = prop_writes
+        pbone = pbones.get(bone_name)
+        if pbone is None:
+            return []
+        keys = pbone.keys()
+        cached = self.rows.get((bone_name, kind))
+        if cached is not None and cached[0] == len(keys):
+            return cached[1]
+        rows = []
+        for prop in keys:
+            if kind == 'GENERAL':
+                if prop != '_RNA_UI':
+                    rows.append((prop, not prop.startswith(('switch', 'visible', 'limit'))))
+            elif kind == 'MODULE':
+                if prop.startswith(('switch', 'visible')):
+                    rows.append((prop, False))
+            elif prop not in ('_RNA_UI', 'bone_type', 'module', 'source_bone', 'chain_mute_drivers'):
+                rows.append((prop, not prop.startswith(('limit', 'active'))))
+        rows = [('["' + prop + '"]', slider) for prop, slider in rows]
+        self.rows[(bone_name, kind)] = (len(keys), rows)
+        return rows
+
+    def snap_panel_rows(self, rig):
+        if self.snap_rows is None:
+            self.snap_rows = []
+            for module in rig.data.get('snappable_modules', []):
+                bone_name = self.props_bone_of(module)
+                if bone_name is not None:
+                    self.snap_rows.append((module, bone_name))
+        return self.snap_rows
+
+
+# armature data pointer: (stamp, index)
+indices = {}
+
+
+# rigs generated before the stamp was added can't tell when they change, their index is built on every call
+def module_index(rig, rebuild=False):
+    key = rig.data.as_pointer()
+    stamp = rig.data.get(stamp_prop_name)
+    cached = indices.get(key)
+    if stamp is None:
+        indices.pop(key, None)
+        return ModuleIndex(rig)
+    if rebuild or cached is None or cached[0] != stamp:
+        cached = (stamp, ModuleIndex(rig))
+        indices[key] = cached
+    return cached[1]
@@ -0,0 +1,152 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any laTter version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+##########################################################################################################
+##########################################################################################################
+
+import bpy
+import json
+import time
+from functools import wraps
+
+
+# GENERATION PROFILER:
+# opt-in, while it's off (None) profiled functions only pay for one global lookup
+profiler = None
+
+report_text_name = 'GYAZ_generation_profile'
+report_json_name = 'GYAZ_generation_profile.json'
+
+
+class GenerationProfiler():
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.end = None
+        # name: [calls, seconds], times are inclusive (nested primitives are counted in both)
+        self.primitives = {}
+        self.modules = []
+
+    def add_call(self, name, seconds):
+        entry = self.primitives.get(name)
+        if entry is None:
+            entry = [0, 0.0]
+            self.primitives[name] = entry
+        entry[0] += 1
+        entry[1] += seconds
+
+
+def begin_profiling():
+    global profiler
+    profiler = GenerationProfiler()
+
+
+def is_profiling():
+    return profiler is not None
+
+
+# wall time and call count of a function, while profiling
+def profiled(name):
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if profiler is None:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profiler.add_call(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def record_module(key, seconds, kept, bones, constraints, drivers):
+    if profiler is not None:
+        profiler.modules.append({'key': key,
+                                 'seconds': seconds,
+                                 'kept': kept,
+                                 'bones': bones,
+                                 'constraints': constraints,
+                                 'drivers': drivers
+                                 })
+
+
+def profile_data(generation_stats):
+    from . import bl_info
+
+    primitives = [{'name': name, 'calls': calls, 'seconds': seconds} for name, (calls, seconds) in profiler.primitives.items()]
+    primitives.sort(key=lambda item: item['seconds'], reverse=True)
+
+    return {'addon_version': '.'.join(str(n) for n in bl_info['version']),
+            'blender_version': bpy.app.version_string,
+            'seconds': profiler.end - profiler.start,
+            'mode_switches': generation_stats['mode_switches'],
+            'bones_created': sum(module['bones'] for module in profiler.modules),
+            'constraints_created': generation_stats['constraints'],
+            'drivers_created': generation_stats['drivers'],
+            'modules': profiler.modules,
+            'primitives': primitives
+            }
+
+
+def profile_text(data):
+    lines = ['GYAZ Game Rigger generation profile',
+             'addon: ' + data['addon_version'] + '   blender: ' + data['blender_version'],
+             'total: %.3f s   mode switches: %d' % (data['seconds'], data['mode_switches']),
+             'created: %d bones, %d constraints, %d drivers' % (data['bones_created'], data['constraints_created'], data['drivers_created']),
+             '',
+             '%-28s %10s %8s %12s %8s' % ('MODULE', 'time (s)', 'bones', 'constraints', 'drivers')
+             ]
+    for module in sorted(data['modules'], key=lambda item: item['seconds'], reverse=True):
+        name = module['key'] + (' (kept)' if module['kept'] else '')
+        lines.append('%-28s %10.3f %8d %12d %8d' % (name, module['seconds'], module['bones'], module['constraints'], module['drivers']))
+
+    lines += ['',
+              '%-28s %10s %10s %10s' % ('PRIMITIVE', 'calls', 'total (s)', 'mean (ms)')
+              ]
+    for primitive in data['primitives']:
+        lines.append('%-28s %10d %10.3f %10.3f' % (primitive['name'],
+                                                   primitive['calls'],
+                                                   primitive['seconds'],
+                                                   primitive['seconds'] / primitive['calls'] * 1000
+                                                   )
+                     )
+    return '\n'.join(lines)
+
+
+def write_text(name, content):
+    text = bpy.data.texts.get(name)
+    if text is None:
+        text = bpy.data.texts.new(name)
+    text.clear()
+    text.write(content)
+
+
+# writes the report (sorted by time) and its json to text datablocks, returns the report data
+def end_profiling(generation_stats):
+    global profiler
+    profiler.end = time.perf_counter()
+
+    data = profile_data(generation_stats)
+    write_text(report_text_name, profile_text(data))
+    write_text(report_json_name, json.dumps(data, indent=2))
+
+    profiler = None
+    return data
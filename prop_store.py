@@ -0,0 +1,118 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any laTter version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+##########################################################################################################
+##########################################################################################################
+
+from .snap_registry import stamp_prop_name
+
+
+# PROP STORE:
+# values of the rig's pose bone props (defaults on the armature, saved props on actions),
+# stored on the ID as {bone name: {prop name: value}} and indexed by prop name in memory.
+# Only number props are kept, the others (module, bone_type, snap info, etc.) describe the rig and never change.
+
+defaults_prop_name = 'prop_defaults'
+saved_prop_name = 'gyaz_game_rig_save_props'
+
+
+class PropStore():
+
+    def __init__(self, bones=None):
+        # bone name: {prop name: value}
+        self.bones = bones if bones is not None else {}
+        # prop name: [(bone name, value)]
+        self.props = {}
+        for bone_name, props in self.bones.items():
+            for prop_name, value in props.items():
+                self.props.setdefault(prop_name, []).append((bone_name, value))
+
+    # {(bone name, prop name): value} of every prop or of one prop, for utils.write_pose_props
+    def writes(self, prop_name=None):
+        if prop_name is not None:
+            return {(bone_name, prop_name): value for bone_name, value in self.props.get(prop_name, [])}
+        return {(bone_name, name): value for bone_name, props in self.bones.items() for name, value in props.items()}
+
+    def store(self, id, name):
+        id[name] = self.bones
+
+
+# exclude: prop names not to keep
+def prop_store_from_rig(rig, exclude=()):
+    bones = {}
+    for pbone in rig.pose.bones:
+        props = {}
+        for key in pbone.keys():
+            if key not in exclude:
+                value = pbone[key]
+                if isinstance(value, (int, float)):
+                    props[key] = value
+        if len(props) > 0:
+            bones[pbone.name] = props
+    return PropStore(bones)
+
+
+# None if nothing was stored, stores of earlier versions ([{'bone', 'key', 'value'}, ...]) are read too
+def load_prop_store(id, name):
+    if name not in id:
+        return None
+    stored = id[name]
+    if hasattr(stored, 'to_dict'):
+        return PropStore(stored.to_dict())
+    bones = {}
+    for item in stored:
+        value = item['value']
+        if isinstance(value, (int, float)):
+            bones.setdefault(item['bone'], {})[item['key']] = value
+    return PropStore(bones)
+
+
+# armature data pointer: (stamp, store)
+default_stores = {}
+
+
+# defaults are written once per generation, so they're read from the armature once per session,
+# unstamped rigs read them on every call
+def prop_defaults(rig):
+    key = rig.data.as_pointer()
+    stamp = rig.data.get(stamp_prop_name)
+    if stamp is None:
+        default_stores.pop(key, None)
+        return load_prop_store(rig.data, defaults_prop_name)
+    cached = default_stores.get(key)
+    if cached is None or cached[0] != stamp:
+        cached = (stamp, load_prop_store(rig.data, defaults_prop_name))
+        default_stores[key] = cached
+    return cached[1]
+
+
+# called by finalize,
+# written: (bone name, prop name) of the props set by this generation, the other props keep their stored defaults
+def store_prop_defaults(rig, written=None):
+    store = prop_store_from_rig(rig)
+    stored = load_prop_store(rig.data, defaults_prop_name) if written is not None else None
+    if stored is not None:
+        for bone_name, props in store.bones.items():
+            stored_props = stored.bones.get(bone_name, {})
+            for prop_name in props:
+                if (bone_name, prop_name) not in written and prop_name in stored_props:
+                    props[prop_name] = stored_props[prop_name]
+        store = PropStore(store.bones)
+    store.store(rig.data, defaults_prop_name)
+    default_stores[rig.data.as_pointer()] = (rig.data.get(stamp_prop_name), store)
@@ -0,0 +1,98 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any laTter version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+##########################################################################################################
+##########################################################################################################
+
+import hashlib
+from mathutils import Vector
+
+from .profiler import profiled
+
+
+# armature data prop the cache is stored in
+cache_prop_name = 'GYAZ_ray_cache'
+
+
+# Wraps the character mesh's BVHTree, ray_cast() has the same signature and return value.
+# Results are keyed by a hash of the query and the mesh fingerprint and stored on the armature data,
+# so regenerating a rig only casts rays that changed.
+class CachedBVHTree():
+
+    def __init__(self, bvh_tree, mesh_fingerprint, rays=None):
+        self.bvh_tree = bvh_tree
+        self.mesh_fingerprint = mesh_fingerprint
+        # key: [] (miss) or [loc x, y, z, normal x, y, z, index, distance]
+        self.rays = rays if rays is not None else {}
+        self.hits = 0
+        self.misses = 0
+
+    def ray_key(self, origin, direction, distance):
+        query = '%.5f %.5f %.5f %.5f %.5f %.5f %.5f %s' % (origin[0], origin[1], origin[2],
+                                                            direction[0], direction[1], direction[2],
+                                                            distance,
+                                                            self.mesh_fingerprint
+                                                            )
+        return hashlib.md5(query.encode()).hexdigest()
+
+    @profiled('ray_cast')
+    def ray_cast(self, origin, direction, distance=10):
+        key = self.ray_key(origin, direction, distance)
+
+        if key in self.rays:
+            self.hits += 1
+            ray = self.rays[key]
+            if len(ray) == 0:
+                return None, None, None, None
+            return Vector(ray[0:3]), Vector(ray[3:6]), int(ray[6]), ray[7]
+
+        self.misses += 1
+        hit_loc, hit_nor, hit_index, hit_dist = self.bvh_tree.ray_cast(origin, direction, distance)
+        if hit_loc is None:
+            self.rays[key] = []
+        else:
+            self.rays[key] = list(hit_loc) + list(hit_nor) + [float(hit_index), hit_dist]
+        return hit_loc, hit_nor, hit_index, hit_dist
+
+    def stats(self):
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'stored': len(self.rays)
+                }
+
+    # rays of modules kept by an incremental generation are not cast again, so every ray of the current mesh is kept
+    def store(self, rig):
+        rig.data[cache_prop_name] = {'mesh_fingerprint': self.mesh_fingerprint,
+                                     'rays': self.rays
+                                     }
+
+
+# cached rays are dropped if the mesh has changed since they were stored
+def load_ray_cache(rig, bvh_tree, mesh_fingerprint):
+    rays = {}
+    if cache_prop_name in rig.data:
+        cache = rig.data[cache_prop_name].to_dict()
+        if cache.get('mesh_fingerprint') == mesh_fingerprint:
+            rays = {key: list(ray) for key, ray in cache.get('rays', {}).items()}
+    return CachedBVHTree(bvh_tree, mesh_fingerprint, rays)
+
+
+def clear_ray_cache(rig):
+    if cache_prop_name in rig.data:
+        del rig.data[cache_prop_name]
@@ -0,0 +1,178 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any laTter version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+##########################################################################################################
+##########################################################################################################
+
+# In-memory description of everything the modules set on the pose side of the rig.
+# Plain python only (no bpy), so module logic can be inspected and tested without Blender.
+# The materializer (materialize.py) writes a finished spec to the armature in one pass.
+
+
+# None means 'leave as it is'
+class BoneRecord():
+
+    def __init__(self, name):
+        self.name = name
+        # bone
+        self.layer = None
+        self.use_deform = None
+        self.hide_select = None
+        # reset hide, inherit rotation/scale and local location
+        self.reset_flags = False
+        # pose bone
+        self.group = None
+        self.lock_location = None
+        self.lock_rotation = None
+        self.lock_scale = None
+        self.bone_type = ''
+        # custom shape: widget name, '' clears the shape
+        self.custom_shape = None
+        # float or a pending sizing query (shape_sizing.py)
+        self.custom_shape_scale = None
+        self.use_custom_shape_bone_size = None
+        self.custom_shape_transform = None
+        # any other pose bone attribute (ik limits, etc.), in the order they should be set
+        self.pose_attributes = {}
+
+
+class ConstraintRecord():
+
+    def __init__(self, bone_name, type, settings, set_inverse):
+        self.bone_name = bone_name
+        self.type = type
+        # attribute: value, in the order they should be set
+        self.settings = settings
+        self.set_inverse = set_inverse
+        # name Blender gave the constraint, known once materialized
+        self.name = None
+        # data path of the driver muting the constraint while its control chain isn't used (utils.py)
+        self.mute_driver = None
+
+
+# ui: dict with min, max, soft_min, soft_max, description or None
+class PropRecord():
+
+    def __init__(self, bone_name, prop_name, value, ui=None):
+        self.bone_name = bone_name
+        self.prop_name = prop_name
+        self.value = value
+        self.ui = ui
+
+
+# owner: 'OBJECT' (rig) or 'DATA' (armature)
+# variables: [(variable name, prop bone name, prop name), ...]
+class DriverRecord():
+
+    def __init__(self, owner, data_path, array_index, expression, variables):
+        self.owner = owner
+        self.data_path = data_path
+        self.array_index = array_index
+        self.expression = expression
+        self.variables = variables
+
+
+class RigSpec():
+
+    def __init__(self):
+        self.bones = {}
+        self.constraints = []
+        self.props = {}
+        self.drivers = []
+        # (owner, data path, array index): position in drivers
+        self.driver_index = {}
+        # (prop bone name, snap info name): list of strings
+        self.snap_info = {}
+        # remove existing drivers on the same data path before adding (incremental generation)
+        self.replace_drivers = False
+
+    # BONES
+
+    def new_bone(self, name):
+        record = BoneRecord(name)
+        self.bones[name] = record
+        return record
+
+    def bone(self, name):
+        if name not in self.bones:
+            return self.new_bone(name)
+        return self.bones[name]
+
+    # CONSTRAINTS
+
+    def add_constraint(self, bone_name, type, settings, set_inverse=False):
+        record = ConstraintRecord(bone_name, type, settings, set_inverse)
+        self.constraints.append(record)
+        return record
+
+    def constraints_of(self, bone_name):
+        return [record for record in self.constraints if record.bone_name == bone_name]
+
+    # PROPS
+
+    # identical definitions (modules sharing a switch prop) are only stored once
+    def set_prop(self, bone_name, prop_name, value, ui=None):
+        record = self.props.get((bone_name, prop_name))
+        if record is not None and record.value == value and record.ui == ui:
+            return record
+        record = PropRecord(bone_name, prop_name, value, ui)
+        self.props[(bone_name, prop_name)] = record
+        return record
+
+    def get_prop(self, bone_name, prop_name, default=None):
+        record = self.props.get((bone_name, prop_name))
+        return record.value if record is not None else default
+
+    # DRIVERS
+
+    # a channel has one driver, a later driver on the same channel replaces the earlier one
+    def add_driver(self, owner, data_path, expression, variables, array_index=-1):
+        record = DriverRecord(owner, data_path, array_index, expression, variables)
+        key = (owner, data_path, array_index)
+        if key in self.driver_index:
+            self.drivers[self.driver_index[key]] = record
+        else:
+            self.driver_index[key] = len(self.drivers)
+            self.drivers.append(record)
+        return record
+
+    # SNAP INFO
+
+    def set_snap_info(self, bone_name, name, items):
+        self.snap_info[(bone_name, name)] = list(items)
+
+    def get_snap_info(self, bone_name, name):
+        return self.snap_info.get((bone_name, name))
+
+    # first free 'stem + index' name on a prop bone
+    def free_snap_info_name(self, bone_name, stem):
+        index = 0
+        while (bone_name, stem + str(index)) in self.snap_info:
+            index += 1
+        return stem + str(index)
+
+    # SUMMARY
+
+    def stats(self):
+        return {'bones': len(self.bones),
+                'constraints': len(self.constraints),
+                'props': len(self.props),
+                'drivers': len(self.drivers),
+                'snap_info': len(self.snap_info)
+                }
@@ -0,0 +1,74 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any laTter version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+##########################################################################################################
+##########################################################################################################
+
+import numpy as np
+
+
+# ROTATION MATRICES:
+# (n, 3, 3) rotation matrices of n quaternion, euler and axis angle values at once, like Blender computes them.
+# Plain numpy only (no bpy), shared by the fk evaluator and key reduction.
+
+
+def quaternion_matrices(q):
+    # q: (n, 4) w, x, y, z, normalized like Blender does
+    q = q / np.linalg.norm(q, axis=1)[:, None]
+    w, x, y, z = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+    m = np.empty((len(q), 3, 3))
+    m[:, 0, 0] = 1 - 2 * (y * y + z * z)
+    m[:, 0, 1] = 2 * (x * y - w * z)
+    m[:, 0, 2] = 2 * (x * z + w * y)
+    m[:, 1, 0] = 2 * (x * y + w * z)
+    m[:, 1, 1] = 1 - 2 * (x * x + z * z)
+    m[:, 1, 2] = 2 * (y * z - w * x)
+    m[:, 2, 0] = 2 * (x * z - w * y)
+    m[:, 2, 1] = 2 * (y * z + w * x)
+    m[:, 2, 2] = 1 - 2 * (x * x + y * y)
+    return m
+
+
+def axis_rotation_matrices(axis, angles):
+    c = np.cos(angles)
+    s = np.sin(angles)
+    m = np.zeros((len(angles), 3, 3))
+    a, b = {'X': (1, 2), 'Y': (2, 0), 'Z': (0, 1)}[axis]
+    m[:, 3 - a - b, 3 - a - b] = 1
+    m[:, a, a] = c
+    m[:, a, b] = -s
+    m[:, b, a] = s
+    m[:, b, b] = c
+    return m
+
+
+# order: 'XYZ', ... the first axis is applied first
+def euler_matrices(e, order):
+    m = np.broadcast_to(np.eye(3), (len(e), 3, 3))
+    for axis in order:
+        m = axis_rotation_matrices(axis, e[:, 'XYZ'.index(axis)]) @ m
+    return m
+
+
+def axis_angle_matrices(aa):
+    # aa: (n, 4) angle, x, y, z
+    angle = aa[:, 0]
+    axis = aa[:, 1:4] / np.maximum(np.linalg.norm(aa[:, 1:4], axis=1), 1e-12)[:, None]
+    half = angle * .5
+    return quaternion_matrices(np.column_stack((np.cos(half), axis * np.sin(half)[:, None])))
@@ -0,0 +1,150 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any laTter version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+##########################################################################################################
+##########################################################################################################
+
+import numpy as np
+from mathutils import Vector
+
+from .constants import Constants
+
+
+# SHAPE SIZING STAGE:
+# bone_settings and set_bone_shape only register their ray casts here,
+# all of them are resolved in one pass at the end of the edit pass
+
+
+# rays are cast around 'origin' perpendicular to the bone's y axis,
+# matrix: 3x3 orientation (rows) the rays are rotated by
+class ShapeSizeQuery():
+
+    def __init__(self, bone_name, origin, matrix):
+        self.bone_name = bone_name
+        self.origin = tuple(origin)
+        self.matrix = tuple(tuple(row) for row in matrix)
+        self.result = None
+
+
+# a single ray, a shape transform bone is created at the hit location (face bones)
+class ShapeBoneQuery():
+
+    def __init__(self, bone_name, origin, direction, parent_name):
+        self.bone_name = bone_name
+        self.origin = tuple(origin)
+        self.direction = tuple(direction)
+        self.parent_name = parent_name
+        self.result = None
+
+
+class ShapeSizingStage():
+
+    number_of_checks = 4
+    ray_distance = 10
+
+    def __init__(self):
+        self.size_queries = []
+        self.bone_queries = []
+
+    def add_size_query(self, bone_name, origin, matrix):
+        query = ShapeSizeQuery(bone_name, origin, matrix)
+        self.size_queries.append(query)
+        return query
+
+    def add_bone_query(self, bone_name, origin, direction, parent_name):
+        query = ShapeBoneQuery(bone_name, origin, direction, parent_name)
+        self.bone_queries.append(query)
+        return query
+
+    # ray directions of all size queries, shape: (queries, checks, 3)
+    def size_query_directions(self):
+        count = len(self.size_queries)
+        if count == 0:
+            return np.zeros((0, self.number_of_checks, 3))
+
+        # rotating (0, 0, 1) around Y by angle and then by the inverted bone matrix
+        # is the combination of the inverted matrix's x and z rows
+        inverted = np.linalg.inv(np.array([query.matrix for query in self.size_queries]))
+        angles = np.radians(np.arange(self.number_of_checks) * (360 / self.number_of_checks))
+        directions = (-np.sin(angles)[None, :, None] * inverted[:, None, 0, :] +
+                      np.cos(angles)[None, :, None] * inverted[:, None, 2, :])
+        lengths = np.linalg.norm(directions, axis=2)[:, :, None]
+        return directions / lengths
+
+    # returns bone name: shape scale
+    def resolve_sizes(self, bvh_tree):
+        count = len(self.size_queries)
+        directions = self.size_query_directions().reshape(-1, 3).tolist()
+        origins = np.repeat(np.array([query.origin for query in self.size_queries]).reshape(-1, 3),
+                            self.number_of_checks,
+                            axis=0
+                            ).tolist()
+
+        # misses are stored as -1
+        distances = np.full(len(directions), -1.0)
+        for index, (origin, direction) in enumerate(zip(origins, directions)):
+            hit_loc, hit_nor, hit_index, hit_dist = bvh_tree.ray_cast(Vector(origin),
+                                                                      Vector(direction),
+                                                                      self.ray_distance
+                                                                      )
+            if hit_dist is not None:
+                distances[index] = hit_dist
+
+        farthest = distances.reshape(count, self.number_of_checks).max(axis=1)
+        scales = np.where(farthest >= 0,
+                          farthest * Constants.bone_shape_scale_multiplier,
+                          Constants.fallback_shape_size
+                          )
+        sizes = {}
+        for query, scale in zip(self.size_queries, scales.tolist()):
+            query.result = scale
+            sizes[query.bone_name] = scale
+        return sizes
+
+    # creates shape transform bones (expects edit mode)
+    def resolve_bones(self, bvh_tree, rig, spec):
+        ebones = rig.data.edit_bones
+        for query in self.bone_queries:
+            hit_loc, hit_nor, hit_index, hit_dist = bvh_tree.ray_cast(Vector(query.origin),
+                                                                      Vector(query.direction),
+                                                                      self.ray_distance
+                                                                      )
+            if hit_loc is not None:
+                ebone = ebones.new('shape_' + query.bone_name)
+                ebone.head = hit_loc
+                ebone.tail = hit_loc + Vector((0, 0, Constants.face_shape_size))
+                ebone.roll = 0
+                ebone.parent = ebones[query.parent_name]
+                query.result = ebone.name
+
+                spec.bone(ebone.name).layer = Constants.shape_layer
+                spec.bone(query.bone_name).custom_shape_transform = ebone.name
+
+    # resolves every query and replaces pending sizes in the spec
+    def resolve(self, bvh_tree, rig, spec):
+        sizes = self.resolve_sizes(bvh_tree)
+        self.resolve_bones(bvh_tree, rig, spec)
+
+        for record in spec.bones.values():
+            if isinstance(record.custom_shape_scale, ShapeSizeQuery):
+                record.custom_shape_scale = record.custom_shape_scale.result
+
+        self.size_queries = []
+        self.bone_queries = []
+        return sizes
@@ -0,0 +1,123 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any laTter version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+##########################################################################################################
+##########################################################################################################
+
+import time
+
+from .constants import Constants
+
+
+# SNAP REGISTRY:
+# The snap info string lists on the module prop bones ('snapinfo_*') are parsed once per rig
+# into typed records and cached for the session, snapping looks them up by module name.
+# The cache is dropped when the rig is regenerated (or generation is undone) through a stamp on the armature data.
+
+stamp_prop_name = 'GYAZ_generation_stamp'
+
+
+# fk/ik limb with a pole target ('snapinfo_3bonelimb_*')
+class LimbSnap():
+
+    def __init__(self, items):
+        self.fk = tuple(items[0:3])
+        self.ik = tuple(items[3:6])
+        self.pole_target = items[6]
+        self.pole_target_distance = float(items[7])
+        # child of fk bone 2 the pole target snaps to
+        self.snap_pole_target = items[8]
+        # child of fk bone 3 the ik target snaps to and the ik target
+        self.ik_snap_target = items[9]
+        self.ik_main = items[10]
+        # reset when snapping ik to fk, None if the limb has no roll bone
+        self.ik_roll = items[11] if items[11] != 'None' else None
+
+    def bone_names(self):
+        names = self.fk + self.ik + (self.pole_target, self.snap_pole_target, self.ik_snap_target, self.ik_main)
+        return names + (self.ik_roll,) if self.ik_roll is not None else names
+
+
+# fk bone and its ik/ctrl counterpart ('snapinfo_singlebone_*')
+class SingleBoneSnap():
+
+    def __init__(self, items):
+        self.fk = items[0]
+        self.ik = items[1]
+
+    def bone_names(self):
+        return (self.fk, self.ik)
+
+
+# fk chain snapped to the base bones it's named after ('snapinfo_simpletobase_*')
+class SimpleToBaseSnap():
+
+    def __init__(self, items):
+        self.base = tuple(items)
+        self.fk = tuple(Constants.fk_prefix + name for name in items)
+
+    def bone_names(self):
+        return self.base + self.fk
+
+
+snap_types = (('snapinfo_3bonelimb', LimbSnap),
+              ('snapinfo_singlebone', SingleBoneSnap),
+              ('snapinfo_simpletobase', SimpleToBaseSnap)
+              )
+
+
+class SnapRegistry():
+
+    def __init__(self, rig):
+        # module: [records], in the order they are snapped (bones higher in the hierarchy first)
+        self.modules = {}
+        for pbone in rig.pose.bones:
+            if pbone.name.startswith('module_props__'):
+                records = []
+                for prop in pbone.keys():
+                    for prefix, snap_type in snap_types:
+                        if prop.startswith(prefix):
+                            records.append(snap_type([str(item) for item in pbone[prop]]))
+                self.modules[pbone.name[14:]] = records
+
+    def snaps(self, module):
+        return self.modules.get(module, [])
+
+
+# armature data pointer: (stamp, registry)
+registries = {}
+
+
+# rigs generated before the stamp was added can't tell when they change, their registry is built on every call
+def snap_registry(rig):
+    key = rig.data.as_pointer()
+    stamp = rig.data.get(stamp_prop_name)
+    if stamp is None:
+        registries.pop(key, None)
+        return SnapRegistry(rig)
+    cached = registries.get(key)
+    if cached is None or cached[0] != stamp:
+        cached = (stamp, SnapRegistry(rig))
+        registries[key] = cached
+    return cached[1]
+
+
+# called by generation
+def stamp_generation(rig):
+    rig.data[stamp_prop_name] = time.time()
@@ -0,0 +1,294 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any laTter version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+##########################################################################################################
+##########################################################################################################
+
+import bpy
+from mathutils import Matrix
+
+from .constants import Constants
+from .snap_registry import snap_registry
+from .module_index import module_index
+
+
+# POSE WRITER:
+# Puts pose bones at armature space matrices like 'pbone.matrix = ...', but without evaluating
+# the depsgraph after every bone: local transforms are solved from the rest matrices and the
+# pose matrices the writer has already set on the parent chain. The rig's bones inherit
+# rotation and scale (generation resets them), which is what the solve expects.
+# Constraints of written bones are not taken into account, same as with the 'matrix' setter.
+class PoseWriter():
+
+    def __init__(self, rig):
+        self.pbones = rig.pose.bones
+        # bone name: armature space matrix set by the writer
+        self.written = {}
+        # bone name: whether the bone or any of its parents has been written
+        self.moved = {}
+
+    def is_moved(self, pbone):
+        name = pbone.name
+        if name not in self.moved:
+            self.moved[name] = name in self.written or (pbone.parent is not None and self.is_moved(pbone.parent))
+        return self.moved[name]
+
+    # parent pose @ parent rest (inverted) @ rest, the pose matrix of the bone with an identity basis
+    def rest_in_pose(self, pbone, parent_matrix):
+        bone = pbone.bone
+        if bone.parent is None:
+            return bone.matrix_local
+        return parent_matrix @ bone.parent.matrix_local.inverted() @ bone.matrix_local
+
+    # current armature space matrix, including what the writer has set so far
+    def matrix(self, name):
+        if name in self.written:
+            return self.written[name]
+        pbone = self.pbones[name]
+        if not self.is_moved(pbone):
+            return pbone.matrix.copy()
+        return self.rest_in_pose(pbone, self.matrix(pbone.parent.name)) @ pbone.matrix_basis
+
+    def set_matrix(self, name, matrix):
+        pbone = self.pbones[name]
+        parent_matrix = self.matrix(pbone.parent.name) if pbone.parent is not None else None
+        pbone.matrix_basis = self.rest_in_pose(pbone, parent_matrix).inverted() @ matrix
+        
+        self.written[name] = matrix.copy()
+        # children of the bone are moved now
+        self.moved = {}
+
+    # evaluate everything written once
+    def update(self):
+        if len(self.written) > 0:
+            bpy.context.view_layer.update()
+            self.written = {}
+            self.moved = {}
+
+
+def rotation_path(pbone):
+    if pbone.rotation_mode == 'QUATERNION':
+        return 'rotation_quaternion'
+    elif pbone.rotation_mode == 'AXIS_ANGLE':
+        return 'rotation_axis_angle'
+    return 'rotation_euler'
+
+
+# KEY BUFFER:
+# Collects the keys of snapping passes and writes them straight into the action's f-curves,
+# instead of a keyframe_insert_menu call per bone set and frame.
+# keying_set: 'Rotation' (rotation channels of the bone's rotation mode), 'BUILTIN_KSI_LocRot' (location and rotation)
+class KeyBuffer():
+
+    def __init__(self, rig):
+        self.rig = rig
+        # (data path, array index, group name): {frame: value}
+        self.channels = {}
+
+    def add(self, bone_names, keying_set, frame):
+        pbones = self.rig.pose.bones
+        for name in bone_names:
+            if name == 'None':
+                continue
+            pbone = pbones[name]
+            attributes = ['location', rotation_path(pbone)] if keying_set == 'BUILTIN_KSI_LocRot' else [rotation_path(pbone)]
+            for attribute in attributes:
+                data_path = 'pose.bones["' + name + '"].' + attribute
+                for index, value in enumerate(getattr(pbone, attribute)):
+                    self.channels.setdefault((data_path, index, name), {})[frame] = value
+
+    # keys basis matrices (frames, 4, 4) of a bone computed outside of the pose (action converters),
+    # quaternions are kept on the same hemisphere and eulers compatible with the previous frame
+    def add_matrices(self, bone_name, keying_set, frames, matrices):
+        pbone = self.rig.pose.bones[bone_name]
+        attribute = rotation_path(pbone)
+        previous = None
+        for frame, matrix in zip(frames, matrices):
+            location, rotation, scale = Matrix([list(row) for row in matrix]).decompose()
+            if attribute == 'rotation_quaternion':
+                if previous is not None and previous.dot(rotation) < 0:
+                    rotation.negate()
+                previous = rotation
+                values = rotation
+            elif attribute == 'rotation_axis_angle':
+                axis, angle = rotation.to_axis_angle()
+                values = (angle, axis[0], axis[1], axis[2])
+            else:
+                values = rotation.to_euler(pbone.rotation_mode, previous) if previous is not None else rotation.to_euler(pbone.rotation_mode)
+                previous = values
+            
+            channels = [(attribute, values)]
+            if keying_set == 'BUILTIN_KSI_LocRot':
+                channels.append(('location', location))
+            for channel_attribute, channel_values in channels:
+                data_path = 'pose.bones["' + bone_name + '"].' + channel_attribute
+                for index, value in enumerate(channel_values):
+                    self.channels.setdefault((data_path, index, bone_name), {})[frame] = value
+
+    # returns the names of the keyed bones
+    def write(self):
+        if len(self.channels) == 0:
+            return set()
+        
+        rig = self.rig
+        if rig.animation_data is None:
+            rig.animation_data_create()
+        action = rig.animation_data.action
+        if action is None:
+            action = bpy.data.actions.new(name=rig.name + 'Action')
+            rig.animation_data.action = action
+        
+        # the user's defaults for new keys, like keyframe_insert
+        edit_prefs = bpy.context.preferences.edit
+        interpolation = edit_prefs.keyframe_new_interpolation_type
+        handle_type = edit_prefs.keyframe_new_handle_type
+        
+        for (data_path, index, group_name), keys in self.channels.items():
+            fcurve = action.fcurves.find(data_path, index=index)
+            if fcurve is None:
+                fcurve = action.fcurves.new(data_path, index=index, action_group=group_name)
+            else:
+                # existing keys on the keyed frames are replaced, last one first so the others stay valid
+                for point in reversed([point for point in fcurve.keyframe_points if point.co[0] in keys]):
+                    fcurve.keyframe_points.remove(point, fast=True)
+            
+            points = fcurve.keyframe_points
+            start = len(points)
+            points.add(len(keys))
+            
+            co = [0.0] * (len(points) * 2)
+            handle_left = [0.0] * (len(points) * 2)
+            handle_right = [0.0] * (len(points) * 2)
+            points.foreach_get('co', co)
+            points.foreach_get('handle_left', handle_left)
+            points.foreach_get('handle_right', handle_right)
+            # flat handles a third of the way to the neighbouring keys, kept by free and aligned handle types,
+            # automatic handle types are recalculated by update
+            frames = sorted(keys)
+            for offset, frame in enumerate(frames):
+                previous_frame = frames[offset - 1] if offset > 0 else frame - 1
+                next_frame = frames[offset + 1] if offset + 1 < len(frames) else frame + 1
+                index = (start + offset) * 2
+                co[index:index + 2] = frame, keys[frame]
+                handle_left[index:index + 2] = frame - (frame - previous_frame) / 3, keys[frame]
+                handle_right[index:index + 2] = frame + (next_frame - frame) / 3, keys[frame]
+            points.foreach_set('co', co)
+            points.foreach_set('handle_left', handle_left)
+            points.foreach_set('handle_right', handle_right)
+            
+            for point in points[start:]:
+                point.interpolation = interpolation
+                point.handle_left_type = handle_type
+                point.handle_right_type = handle_type
+            # sort and recalculate handles
+            fcurve.update()
+        
+        bone_names = set(group_name for data_path, index, group_name in self.channels)
+        self.channels = {}
+        return bone_names
+
+
+# SNAP & KEY:
+
+# modules to snap (snap_n_key props of the module prop bones),
+# in generation order (the spine comes before the arms that follow it)
+def snap_n_key_modules(rig):
+    modules = []
+    for module in rig.data["snappable_modules"]:
+        prop_bone = rig.pose.bones["module_props__" + module]
+        fk_ik = prop_bone.get("snap_n_key__fk_ik", 0)
+        if prop_bone["snap_n_key__should_snap"]:
+            if fk_ik == 1:
+                modules.append((module, 'IK_to_FK'))
+            elif fk_ik == 0:
+                modules.append((module, 'FK_to_IK'))
+    return modules
+
+
+# SPARSE SNAP & KEY:
+
+# the bones and every bone they follow through their parents or constraint targets
+def followed_bones(rig, bone_names):
+    pbones = rig.pose.bones
+    visited = set()
+    stack = list(bone_names)
+    while len(stack) > 0:
+        name = stack.pop()
+        if name in visited:
+            continue
+        visited.add(name)
+        pbone = pbones.get(name)
+        if pbone is None:
+            continue
+        if pbone.parent is not None:
+            stack.append(pbone.parent.name)
+        for c in pbone.constraints:
+            if getattr(c, 'target', None) == rig:
+                stack.append(c.subtarget)
+            if getattr(c, 'pole_target', None) == rig:
+                stack.append(c.pole_subtarget)
+    return visited
+
+
+# bones a module is snapped from: ik/ctrl side for 'FK_to_IK', fk side for 'IK_to_FK',
+# with the bones they follow outside the module (spine, root), their keys move the sources too
+def snap_source_bones(rig, module, mode):
+    from_fk = mode == 'IK_to_FK'
+    
+    candidates = list(module_index(rig).bones_of(module))
+    for record in snap_registry(rig).snaps(module):
+        candidates += record.bone_names()
+    
+    sources = {name for name in candidates if name.startswith(Constants.fk_prefix) == from_fk}
+    return followed_bones(rig, sources)
+
+
+def bone_fcurves(action, bone_names):
+    fcurves = []
+    if action is not None:
+        for fcurve in action.fcurves:
+            if fcurve.data_path.startswith('pose.bones["'):
+                if fcurve.data_path[12:].split('"]', 1)[0] in bone_names:
+                    fcurves.append(fcurve)
+    return fcurves
+
+
+# frames of the range (and its ends) that carry keys on the fcurves,
+# with tolerance, the midpoint of two frames is added where a curve leaves the straight line
+# between them by more than the tolerance (may be a subframe)
+def keyed_frames(fcurves, start, end, tolerance=None):
+    frames = {start, end}
+    for fcurve in fcurves:
+        co = [0.0] * (len(fcurve.keyframe_points) * 2)
+        fcurve.keyframe_points.foreach_get('co', co)
+        frames.update(frame for frame in co[0::2] if start <= frame <= end)
+    frames = sorted(frames)
+    
+    if tolerance is not None:
+        midpoints = []
+        for a, b in zip(frames[:-1], frames[1:]):
+            middle = (a + b) * .5
+            for fcurve in fcurves:
+                straight = (fcurve.evaluate(a) + fcurve.evaluate(b)) * .5
+                if abs(fcurve.evaluate(middle) - straight) > tolerance:
+                    midpoints.append(middle)
+                    break
+        frames = sorted(frames + midpoints)
+    
+    return frames
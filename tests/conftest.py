@@ -0,0 +1,11 @@
+import os
+import sys
+import types
+
+
+# The addon's __init__ registers with Blender, so the pure python modules are imported
+# from a package of the same directory that skips it.
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+package = types.ModuleType('gyaz_game_rigger')
+package.__path__ = [package_dir]
+sys.modules.setdefault('gyaz_game_rigger', package)
@@ -0,0 +1,74 @@
+import pytest
+
+from gyaz_game_rigger.driver_expressions import simple_expression
+from gyaz_game_rigger.driver_expressions import validate_drivers
+
+
+@pytest.mark.parametrize('expression', ['v1', '1 - (v1 < 1)', '1 - (v1 > 0 and v1 < 2)', 'v1 != 0',
+                                        'not v1 == 2', '0 < v1 <= 2 or v2', '1 if v1 == 1 else 0',
+                                        'max(v1, 0) * 2', 'v1 / 2 + 1'])
+def test_simple_expressions_keep_their_value(expression):
+    rewritten = simple_expression(expression)
+    assert rewritten is not None
+    for v1 in (0, 1, 2):
+        for v2 in (0, 1):
+            assert eval(rewritten, {'max': max}, {'v1': v1, 'v2': v2}) == eval(expression, {'max': max}, {'v1': v1, 'v2': v2})
+
+
+def test_power_and_math_calls_are_rewritten():
+    assert simple_expression('v1 ** 2') == 'pow(v1, 2)'
+    assert simple_expression('math.sqrt(v1)') == 'sqrt(v1)'
+
+
+@pytest.mark.parametrize('expression', ['v1[0]', 'bpy.data.objects', '"a"', 'v1 % 2', 'print(v1)', 'v1 +'])
+def test_expressions_without_simple_form(expression):
+    assert simple_expression(expression) is None
+
+
+class Driver():
+
+    def __init__(self, expression):
+        self.type = 'SCRIPTED'
+        self.expression = expression
+
+    # Blender's simple evaluator takes the rewritten forms as they are
+    @property
+    def is_simple_expression(self):
+        return simple_expression(self.expression) == self.expression
+
+
+class FCurve():
+
+    def __init__(self, data_path, expression):
+        self.data_path = data_path
+        self.array_index = -1
+        self.driver = Driver(expression)
+
+
+class AnimationData():
+
+    def __init__(self, fcurves):
+        self.drivers = fcurves
+
+
+class Owner():
+
+    def __init__(self, fcurves):
+        self.animation_data = AnimationData(fcurves) if fcurves is not None else None
+
+
+class Rig(Owner):
+
+    def __init__(self, fcurves, data_fcurves):
+        Owner.__init__(self, fcurves)
+        self.data = Owner(data_fcurves)
+
+
+def test_validate_drivers():
+    rig = Rig([FCurve('a', 'v1 ** 2'), FCurve('b', 'v1 < 1'), FCurve('c', 'v1[0]')], None)
+    result = validate_drivers(rig)
+    assert result['drivers'] == 3
+    assert result['rewritten'] == 1
+    assert result['python'] == 1
+    assert result['python_paths'] == ['c[-1]']
+    assert rig.animation_data.drivers[0].driver.expression == 'pow(v1, 2)'
@@ -0,0 +1,40 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from gyaz_game_rigger.key_reduction import kept_keys
+from gyaz_game_rigger.key_reduction import transform_errors
+
+
+def rebuilt_values(frames, values, kept):
+    return np.column_stack([np.interp(frames, frames[kept], values[kept, index]) for index in range(values.shape[1])])
+
+
+def test_straight_motion_keeps_the_ends():
+    frames = np.arange(10.0)
+    values = np.column_stack((frames * .1, np.zeros(10), np.zeros(10)))
+    assert kept_keys('location', frames, values, 1e-4, 'XYZ').tolist() == [0, 9]
+
+
+def test_location_error_stays_within_tolerance():
+    frames = np.arange(50.0)
+    values = np.column_stack((np.sin(frames * .2), np.cos(frames * .1), frames * .01))
+    tolerance = .01
+    kept = kept_keys('location', frames, values, tolerance, 'XYZ')
+    assert 2 < len(kept) < len(frames)
+    errors = transform_errors('location', values, rebuilt_values(frames, values, kept), 'XYZ')
+    assert errors.max() <= tolerance
+
+
+def test_rotation_error_stays_within_tolerance():
+    frames = np.arange(40.0)
+    values = np.column_stack((np.sin(frames * .15), frames * .02, np.zeros(40)))
+    tolerance = .002
+    kept = kept_keys('rotation_euler', frames, values, tolerance, 'XYZ')
+    errors = transform_errors('rotation_euler', values, rebuilt_values(frames, values, kept), 'XYZ')
+    assert errors.max() <= tolerance
+
+
+def test_quaternion_sign_is_no_error():
+    q = np.array([[.5, .5, .5, .5]])
+    assert transform_errors('rotation_quaternion', q, -q, 'QUATERNION')[0] == pytest.approx(0, abs=1e-6)
@@ -0,0 +1,43 @@
+from gyaz_game_rigger.rig_spec import RigSpec
+
+
+def test_bone_returns_the_same_record():
+    spec = RigSpec()
+    record = spec.bone('hand_l')
+    record.layer = 3
+    assert spec.bone('hand_l') is record
+    assert spec.bones['hand_l'].layer == 3
+
+
+def test_constraints_keep_their_order_per_bone():
+    spec = RigSpec()
+    spec.add_constraint('hand_l', 'COPY_ROTATION', {'name': 'bind_to_fk_1'})
+    spec.add_constraint('foot_l', 'COPY_ROTATION', {'name': 'bind_to_fk_1'})
+    spec.add_constraint('hand_l', 'COPY_ROTATION', {'name': 'bind_to_ik_1'})
+    names = [record.settings['name'] for record in spec.constraints_of('hand_l')]
+    assert names == ['bind_to_fk_1', 'bind_to_ik_1']
+
+
+def test_identical_props_are_stored_once():
+    spec = RigSpec()
+    first = spec.set_prop('module_props__arm_l', 'switch_arm_l', 0, ui={'min': 0, 'max': 2})
+    second = spec.set_prop('module_props__arm_l', 'switch_arm_l', 0, ui={'min': 0, 'max': 2})
+    assert first is second
+    spec.set_prop('module_props__arm_l', 'switch_arm_l', 1)
+    assert spec.get_prop('module_props__arm_l', 'switch_arm_l') == 1
+    assert spec.get_prop('module_props__arm_l', 'missing', 'default') == 'default'
+
+
+def test_later_driver_replaces_earlier_one_on_the_same_channel():
+    spec = RigSpec()
+    spec.add_driver('DATA', 'layers', 'v1', [('v1', 'module_props__general', 'visible_base_bones')], array_index=1)
+    spec.add_driver('DATA', 'layers', 'v1', [('v1', 'module_props__general', 'visible_twist_bones')], array_index=2)
+    spec.add_driver('DATA', 'layers', '1 - v1', [('v1', 'module_props__general', 'visible_base_bones')], array_index=1)
+    assert [(record.array_index, record.expression) for record in spec.drivers] == [(1, '1 - v1'), (2, 'v1')]
+
+
+def test_free_snap_info_name():
+    spec = RigSpec()
+    spec.set_snap_info('module_props__arm_l', 'snapinfo_3bonelimb_0', ['a', 'b'])
+    assert spec.free_snap_info_name('module_props__arm_l', 'snapinfo_3bonelimb_') == 'snapinfo_3bonelimb_1'
+    assert spec.stats()['snap_info'] == 1
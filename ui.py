@@ -20,18 +20,45 @@
 ##########################################################################################################
 ##########################################################################################################
 
-import bpy, os, addon_utils
+import bpy, os, time, fnmatch, addon_utils
 from mathutils import Vector
-from math import sqrt
+from math import sqrt, degrees
 from bpy.types import Panel, Operator
 from bpy.props import StringProperty, IntProperty, FloatProperty, EnumProperty, BoolProperty
 from functools import reduce
 import bpy.utils.previews
+from bpy.app.handlers import persistent
 from .utils import calculate_pole_target_location_pbone
 from .utils import lerp
 from .utils import report
 from .utils import popup
 from .utils import get_active_action
+from .utils import write_pose_props
+from .utils import suspend_chain_muting
+from .utils import resume_chain_muting
+from .utils import rig_actions
+from .prop_store import prop_defaults
+from .prop_store import prop_store_from_rig
+from .prop_store import load_prop_store
+from .prop_store import saved_prop_name
+from .snapping import PoseWriter
+from .snapping import KeyBuffer
+from .snapping import snap_source_bones
+from .snapping import bone_fcurves
+from .snapping import keyed_frames
+from .snapping import snap_n_key_modules
+from .key_reduction import reduce_action_keys
+from .snap_registry import snap_registry
+from .snap_registry import registries
+from .module_index import indices
+from .prop_store import default_stores
+from .module_index import module_index
+from .action_convert import convert_action
+from .action_convert import batch_convert
+from .action_convert import check_convert_action
+from .snap_registry import LimbSnap
+from .snap_registry import SingleBoneSnap
+from .snap_registry import SimpleToBaseSnap
 
 
 class PG_GYAZ_GameRig(bpy.types.PropertyGroup):
@@ -49,9 +76,19 @@ class PG_GYAZ_GameRig(bpy.types.PropertyGroup):
 #mode: 'FK_to_IK', 'IK_to_FK'
 #key = False, True    
 #switch: False, True
+# module of a pose bone, None if it's not part of any,
+# the index is rebuilt if the bone was given a module after it was built
+def bone_module (rig, pbone):
+    module = module_index (rig).module_of (pbone.name)
+    if module == None and 'module' in pbone:
+        module = module_index (rig, rebuild=True).module_of (pbone.name)
+    return module
+
+
 #module_detection: 'AUTO', 'MANUAL'
 #module_name: string - only used if module_detection is 'MANUAL'
-def snap (mode, key, switch, module_detection, module_name, force_visibility):
+#key_buffer: KeyBuffer the keys are collected in (written by the caller), if None they're written right away
+def snap (mode, key, switch, module_detection, module_name, force_visibility, key_buffer=None):
             
     def main (module):         
     
@@ -60,7 +97,9 @@ def snap (mode, key, switch, module_detection, module_name, force_visibility):
         pbones = rig.pose.bones
         # name of module bone (bone that contains all props of the module)
         prop_bone = pbones['module_props__' + module]
-        ctx = bpy.context.copy ()
+        # bones are solved from their parents' new matrices, the depsgraph is updated once per module
+        writer = PoseWriter (rig)
+        keys = key_buffer if key_buffer is not None else KeyBuffer (rig)
         key_attributes = 'Rotation' if mode == 'FK_to_IK' else 'BUILTIN_KSI_LocRot'
         
         # MAKE SURE BONES ARE VISIBLE
@@ -79,8 +118,7 @@ def snap (mode, key, switch, module_detection, module_name, force_visibility):
         
         def key_bones (bone_names):
             if key == True:
-                ctx['selected_pose_bones'] = [pbones[name] for name in bone_names if name != 'None']
-                bpy.ops.anim.keyframe_insert_menu (ctx, type=key_attributes)
+                keys.add (bone_names, key_attributes, scene.frame_current_final)
                 
         def switch_controls (switch_mode):
             prop_name = 'switch_'+module
@@ -93,41 +131,30 @@ def snap (mode, key, switch, module_detection, module_name, force_visibility):
                     if prop_bone[prop_name] != 1:
                         prop_bone[prop_name] = 1
         
-        bone_custom_props = prop_bone.keys ()
+        # the chain the module is snapped from is read even if it's muted (not switched to),
+        # Snap and Key lifts the muting of all its modules itself
+        suspended = suspend_chain_muting (rig, [module]) if key_buffer is None else []
         
-        # order matters, bones higher in hierarchy should come sooner in this list
-        snap_infos = [prop for prop in bone_custom_props if prop.startswith ('snapinfo')]
+        # order matters, bones higher in hierarchy come sooner
+        snaps = snap_registry (rig).snaps (module)
                        
-        for prop in snap_infos:
-            if prop.startswith ('snapinfo_3bonelimb'):
-
-                # prop on prop_bone that has snap info
-                snap_info = prop_bone[prop]
-                fk_b1, fk_b2, fk_b3, ik_b1, ik_b2, ik_b3 = snap_info[:6]
+        for record in snaps:
+            if isinstance (record, LimbSnap):
                 
-                pole_target = snap_info[6]
-                pole_target_distance = float( snap_info[7] )
-                snap_pole_target = snap_info[8]
-                ik_snap_target_b3 = snap_info[9]
-                ik_main_b3 = snap_info[10]
-                ik_roll = snap_info[11]
+                fk_b1, fk_b2, fk_b3 = record.fk
+                ik_b1, ik_b2, ik_b3 = record.ik
+                pole_target = record.pole_target
 
                 if mode == 'IK_to_FK':           
-
-                    rig = bpy.context.object  
                         
                     # SNAP:
 
                     # ik_target
-                    pbone = pbones[ik_main_b3]
-                    
-                    pbone.matrix = pbones[ik_snap_target_b3].matrix
-                    scene.update ()
+                    writer.set_matrix (record.ik_main, writer.matrix (record.ik_snap_target))
 
                     # pole_target
-                    calc_pole_pos = calculate_pole_target_location_pbone (fk_b1, fk_b2, fk_b3, pole_target_distance)
-                    snap_target = pbones[snap_pole_target]
-                    pole_target_pos = snap_target.matrix.translation
+                    calc_pole_pos = calculate_pole_target_location_pbone (fk_b1, fk_b2, fk_b3, record.pole_target_distance)
+                    pole_target_pos = writer.matrix (record.snap_pole_target).translation
                     a = pbones[fk_b1].matrix.translation
                     b = pbones[fk_b2].matrix.translation
                     c = pbones[fk_b3].matrix.translation
@@ -139,74 +166,63 @@ def snap (mode, key, switch, module_detection, module_name, force_visibility):
                     alpha = max (min(alpha, 1), 0)
                     pole_pos = lerp (calc_pole_pos, pole_target_pos, alpha)
                     
-                    pbone = pbones[pole_target]
-                    scene.update ()
-                    pbone.matrix.translation = pole_pos                    
-                    scene.update ()
+                    pole_matrix = writer.matrix (pole_target)
+                    pole_matrix.translation = pole_pos
+                    writer.set_matrix (pole_target, pole_matrix)
                     
-                    if ik_roll != 'None':
-                        pbones[ik_roll].rotation_quaternion = (1, 0, 0, 0)
-                        scene.update ()
+                    if record.ik_roll != None:
+                        pbones[record.ik_roll].rotation_quaternion = (1, 0, 0, 0)
                     
                     # INSERT KEYS
-                    key_bones ([ik_b3, pole_target, ik_main_b3, ik_roll])                           
+                    key_bones ([ik_b3, pole_target, record.ik_main] + ([record.ik_roll] if record.ik_roll != None else []))
 
                     
                 elif mode == 'FK_to_IK': 
-                    pbones[fk_b1].matrix = pbones[ik_b1].matrix
-                    scene.update () 
-                    pbones[fk_b2].matrix = pbones[ik_b2].matrix
-                    scene.update () 
-                    pbones[fk_b3].matrix = pbones[ik_b3].matrix
-                    scene.update ()
+                    writer.set_matrix (fk_b1, writer.matrix (ik_b1))
+                    writer.set_matrix (fk_b2, writer.matrix (ik_b2))
+                    writer.set_matrix (fk_b3, writer.matrix (ik_b3))
                     key_bones ([fk_b1, fk_b2, fk_b3])
         
                 
-            elif prop.startswith ('snapinfo_singlebone'):
-                
-                # prop on prop_bone that has snap info
-                snap_info = prop_bone[prop]
-                
-                fk_b = snap_info[0]
-                ik_b = snap_info[1]
+            elif isinstance (record, SingleBoneSnap):
                 
                 if mode == 'IK_to_FK':
-                    pbones[ik_b].matrix = pbones[fk_b].matrix
-                    scene.update ()
-                    key_bones ([ik_b])
+                    writer.set_matrix (record.ik, writer.matrix (record.fk))
+                    key_bones ([record.ik])
                      
                 elif mode == 'FK_to_IK':        
-                    pbones[fk_b].matrix = pbones[ik_b].matrix
-                    scene.update ()
-                    key_bones ([fk_b])
+                    writer.set_matrix (record.fk, writer.matrix (record.ik))
+                    key_bones ([record.fk])
                     
-            elif prop.startswith ('snapinfo_simpletobase'):
-                
-                snap_info = prop_bone[prop]
+            elif isinstance (record, SimpleToBaseSnap):
                 
                 if mode == 'FK_to_IK':
-                    pbones = rig.pose.bones
-                    for name in snap_info:
-                        pbones['fk_'+name].matrix = pbones[name].matrix
-                        scene.update ()
-                    key_bones (['fk_'+name for name in snap_info])
+                    for base_name, fk_name in zip (record.base, record.fk):
+                        writer.set_matrix (fk_name, writer.matrix (base_name))
+                    key_bones (list (record.fk))
+        
+        writer.update ()
+        if key_buffer is None:
+            keys.write ()
         
         # SWITCH MODE      
         if switch == True:
-            if len (snap_infos) > 0:
+            if len (snaps) > 0:
                 if mode == 'FK_to_IK':
                     switch_controls (switch_mode='to_FK')
                 elif mode == 'IK_to_FK':
                     switch_controls (switch_mode='to_IK')
+        
+        resume_chain_muting (rig, suspended)
                 
     
     if module_detection == 'AUTO':
         # get module name of active bone
         active_bone = bpy.context.active_pose_bone
-        if 'module' not in active_bone:
+        module = bone_module (bpy.context.object, active_bone)
+        if module == None:
             popup (item="Bone is not part of any module.", icon='ERROR')
         else:
-            module = active_bone['module']
             main (module)
             
     elif module_detection == 'MANUAL':
@@ -277,45 +293,342 @@ class Op_GYAZGameRig_SnapAndKey (bpy.types.Operator):
     bl_label = "GYAZ Game Rigger: Snap and Key"
     bl_description = ""
     
+    sparse: BoolProperty (name='Only Keyed Frames', default=False, description='Only snap and key frames that carry keys on the bones the modules are snapped from or on the bones those follow')
+    subframes: BoolProperty (name='Subframes', default=False, description='Also snap halfway between keyed frames where a source curve changes sharply')
+    tolerance: FloatProperty (name='Tolerance', default=0.05, min=0.0, description='How far a source curve may leave the straight line between keyed frames before a sample is added')
+    chunk_size: IntProperty (name='Frames Per Step', default=10, min=1, description='Frames processed between two interface updates')
+    on_cancel: EnumProperty (name='On Cancel', items=(('KEEP', 'Keep Keys', 'Keep the keys of the frames snapped before cancelling'), ('ROLLBACK', 'Roll Back', 'Discard all keys and restore the pose')), default='KEEP')
+    reduce_keys: BoolProperty (name='Reduce Keys', default=False, description='Remove keys that can be rebuilt from their neighbours within the tolerances')
+    reduce_angle: FloatProperty (name='Angle Tolerance', default=0.00175, min=0.0, subtype='ANGLE', description='Largest rotation error a removed key may cause on the bone')
+    reduce_distance: FloatProperty (name='Distance Tolerance', default=0.0001, min=0.0, subtype='DISTANCE', description='Largest location error a removed key may cause on the bone')
+    
     def draw (self, context):
         lay = self.layout
         lay.label (text='Sure?')
+        lay.prop (self, 'sparse')
+        row = lay.row ()
+        row.enabled = self.sparse
+        row.prop (self, 'subframes')
+        row.prop (self, 'tolerance')
+        lay.prop (self, 'chunk_size')
+        lay.prop (self, 'on_cancel')
+        lay.prop (self, 'reduce_keys')
+        row = lay.row ()
+        row.enabled = self.reduce_keys
+        row.prop (self, 'reduce_angle')
+        row.prop (self, 'reduce_distance')
     
     def invoke (self, context, event):
         wm = context.window_manager
         return wm.invoke_props_dialog (self)
     
-    # operator function
-    def execute (self, context):
-        scene = bpy.context.scene
-        rig = bpy.context.active_object
+    # modules and frames to snap, returns False if there's nothing to snap
+    def setup (self, context):
+        rig = context.active_object
         
         start = rig["snap_start"]
         end = rig["snap_end"]
         
-        for module in rig.data["snappable_modules"]:
-            prop_bone = rig.pose.bones["module_props__"+module]
-            fk_ik = prop_bone["snap_n_key__fk_ik"] if "snap_n_key__fk_ik" in prop_bone else 0
-            should_snap = prop_bone["snap_n_key__should_snap"]
-            if should_snap:                
-                
-                switch_ = False
-                force_visibility_ = False                
-                
-                for n in range (start, end+1):
-                    
-                    if n == end:
-                        switch_ = True
-                        force_visibility_ = True                       
-                    
-                    scene.frame_set (n)                    
-                    if fk_ik == 1:
-                        snap (mode='IK_to_FK', key=True, switch=switch_, module_detection='MANUAL', module_name=module, force_visibility=force_visibility_)
-                    elif fk_ik == 0:
-                        snap (mode='FK_to_IK', key=True, switch=switch_, module_detection='MANUAL', module_name=module, force_visibility=force_visibility_)
-                                        
+        modules = snap_n_key_modules (rig)
+        if len (modules) == 0:
+            return False
+        
+        if self.sparse:
+            # union of the keyed frames of all modules, so modules that follow others see all their changes
+            source_bones = set ()
+            for module, mode in modules:
+                source_bones.update (snap_source_bones (rig, module, mode))
+            fcurves = bone_fcurves (get_active_action (rig), source_bones)
+            frames = keyed_frames (fcurves, start, end, tolerance=self.tolerance if self.subframes else None)
+        else:
+            frames = list (range (start, end+1))
+        
+        self.rig = rig
+        self.modules = modules
+        self.frames = frames
+        self.index = 0
+        # keys of the whole frame range are written into the f-curves at once
+        self.key_buffer = KeyBuffer (rig)
+        # for rolling back
+        self.frame_start = context.scene.frame_current
+        self.pose_basis = {pbone.name: pbone.matrix_basis.copy () for pbone in rig.pose.bones}
+        # chains are read on every frame, even if they're muted (not switched to)
+        self.suspended = suspend_chain_muting (rig, [module for module, mode in modules])
+        self.time_start = time.perf_counter ()
+        return True
+    
+    # frame-major: every frame is evaluated once and all modules are snapped and keyed on it,
+    # a module is snapped after the ones it depends on, so it sees their snapped pose
+    def snap_frame (self, context, n):
+        # switch and show controls on the last frame only
+        last = n == self.frames[-1]
+        
+        context.scene.frame_set (int (n), subframe=n - int (n))
+        for module, mode in self.modules:
+            snap (mode=mode, key=True, switch=last, module_detection='MANUAL', module_name=module, force_visibility=last, key_buffer=self.key_buffer)
+    
+    # operator function
+    def execute (self, context):
+        if not self.setup (context):
+            report (self, 'No modules to snap.', 'INFO')
+            return {'FINISHED'}
+        
+        wm = context.window_manager
+        self.timer = wm.event_timer_add (0.001, window=context.window)
+        wm.modal_handler_add (self)
+        wm.progress_begin (0, len (self.frames))
+        return {'RUNNING_MODAL'}
+    
+    def modal (self, context, event):
+        if event.type == 'ESC':
+            return self.finish (context, cancelled=True)
+        
+        if event.type == 'TIMER':
+            for n in self.frames[self.index:self.index+self.chunk_size]:
+                self.snap_frame (context, n)
+                self.index += 1
             
-        # end of operator
+            context.window_manager.progress_update (self.index)
+            context.workspace.status_text_set ('Snap and Key: ' + str (self.index) + '/' + str (len (self.frames)) + ' frames (Esc to cancel)')
+            
+            if self.index >= len (self.frames):
+                return self.finish (context, cancelled=False)
+        
+        return {'RUNNING_MODAL'}
+    
+    def finish (self, context, cancelled):
+        wm = context.window_manager
+        wm.event_timer_remove (self.timer)
+        wm.progress_end ()
+        context.workspace.status_text_set (None)
+        
+        seconds = time.perf_counter () - self.time_start
+        fps = self.index / seconds if seconds > 0 else 0
+        resume_chain_muting (self.rig, self.suspended)
+        
+        if cancelled and self.on_cancel == 'ROLLBACK':
+            for name, matrix in self.pose_basis.items ():
+                pbone = self.rig.pose.bones.get (name)
+                if pbone != None:
+                    pbone.matrix_basis = matrix
+            context.scene.frame_set (self.frame_start)
+            report (self, 'Snap and Key cancelled, nothing was keyed.', 'INFO')
+            return {'CANCELLED'}
+        
+        keyed_bones = self.key_buffer.write ()
+        reduced = ''
+        if self.reduce_keys and len (keyed_bones) > 0:
+            before, after = reduce_action_keys (self.rig, get_active_action (self.rig), self.reduce_angle, self.reduce_distance, bone_names=keyed_bones)
+            reduced = ' Keys reduced from ' + str (before) + ' to ' + str (after) + '.'
+        if cancelled:
+            report (self, 'Snap and Key cancelled, ' + str (self.index) + '/' + str (len (self.frames)) + ' frames keyed (' + str (round (fps, 1)) + ' frames/s).' + reduced, 'INFO')
+            return {'CANCELLED'}
+        
+        report (self, 'Snap and Key: ' + str (self.index) + ' frames in ' + str (round (seconds, 2)) + ' s (' + str (round (fps, 1)) + ' frames/s).' + reduced, 'INFO')
+        return {'FINISHED'}
+
+    # when the buttons should show up    
+    @classmethod
+    def poll(cls, context):     
+        return context.mode == 'POSE'    
+
+
+class Op_GYAZGameRig_ConvertAction (bpy.types.Operator):
+       
+    bl_idname = "anim.gyaz_game_rigger_convert_action"  
+    bl_label = "GYAZ Game Rigger: Convert Action"
+    bl_description = "Convert the snap range of the action between fk and ik at once, same result as Snap and Key on every frame"
+    
+    check: BoolProperty (name='Only Compare With Snapping', default=False, description='Convert and snap every frame without keying and report the largest difference between the two (see console)')
+    reduce_keys: BoolProperty (name='Reduce Keys', default=False, description='Remove keys that can be rebuilt from their neighbours within the tolerances')
+    reduce_angle: FloatProperty (name='Angle Tolerance', default=0.00175, min=0.0, subtype='ANGLE', description='Largest rotation error a removed key may cause on the bone')
+    reduce_distance: FloatProperty (name='Distance Tolerance', default=0.0001, min=0.0, subtype='DISTANCE', description='Largest location error a removed key may cause on the bone')
+    
+    def draw (self, context):
+        lay = self.layout
+        lay.label (text='Sure?')
+        lay.prop (self, 'check')
+        lay.prop (self, 'reduce_keys')
+        row = lay.row ()
+        row.enabled = self.reduce_keys
+        row.prop (self, 'reduce_angle')
+        row.prop (self, 'reduce_distance')
+    
+    def invoke (self, context, event):
+        wm = context.window_manager
+        return wm.invoke_props_dialog (self)
+    
+    # operator function
+    def execute (self, context):
+        rig = context.active_object
+        pbones = rig.pose.bones
+        
+        modules = snap_n_key_modules (rig)
+        if len (modules) == 0:
+            report (self, 'No modules to snap.', 'INFO')
+            return {'FINISHED'}
+        
+        start_time = time.perf_counter ()
+        frames = list (range (rig["snap_start"], rig["snap_end"]+1))
+        
+        if self.check:
+            result = check_convert_action (rig, modules, frames)
+            print ('GYAZ Game Rigger, Convert Action compared with snapping:')
+            print ('    rotation: ' + str (round (degrees (result['rotation_error']), 4)) + ' degrees (' + result['rotation_bone'] + ')')
+            print ('    location: ' + str (round (result['location_error'], 6)) + ' (' + result['location_bone'] + ')')
+            print ('    FK to IK sampling passes: ' + str (result['passes']))
+            for data_path in result['missing']:
+                print ('    not converted: ' + data_path)
+            report (self, 'Largest difference to snapping: ' + str (round (degrees (result['rotation_error']), 4)) + ' degrees, ' + str (round (result['location_error'], 6)) + ' location (see console).', 'INFO')
+            return {'FINISHED'}
+        
+        key_buffer = KeyBuffer (rig)
+        keyed = convert_action (rig, modules, frames, key_buffer)
+        keyed_bones = key_buffer.write ()
+        reduced = ''
+        if self.reduce_keys and len (keyed_bones) > 0:
+            before, after = reduce_action_keys (rig, get_active_action (rig), self.reduce_angle, self.reduce_distance, bone_names=keyed_bones)
+            reduced = ' Keys reduced from ' + str (before) + ' to ' + str (after) + '.'
+        
+        # switch to the converted side, like Snap and Key does on the last frame
+        for module, mode in modules:
+            prop_bone = pbones["module_props__"+module]
+            prop_name = 'switch_'+module
+            if prop_name in prop_bone:
+                prop_bone[prop_name] = 0 if mode == 'FK_to_IK' else 1
+        context.scene.frame_set (context.scene.frame_current)
+        
+        report (self, 'Converted ' + str (len (frames)) + ' frames, ' + str (keyed) + ' bones keyed in ' + str (round (time.perf_counter () - start_time, 2)) + ' s.' + reduced, 'INFO')
+        return {'FINISHED'}
+
+    # when the buttons should show up    
+    @classmethod
+    def poll(cls, context):     
+        return context.mode == 'POSE'    
+
+
+class Op_GYAZGameRig_BatchSnapAndKey (bpy.types.Operator):
+       
+    bl_idname = "anim.gyaz_game_rigger_batch_snap_and_key"  
+    bl_label = "GYAZ Game Rigger: Batch Snap and Key"
+    bl_description = "Convert several actions of one or more rigs between fk and ik, using each rig's Snap and Key settings"
+    
+    check: BoolProperty (name='Only Compare With Snapping', default=False, description='Convert and snap every frame of each action without keying and print the largest difference between the two')
+    rigs: EnumProperty (name='Rigs', items=(('ACTIVE', 'Active', ''), ('SELECTED', 'Selected', '')), default='SELECTED')
+    actions: EnumProperty (name='Actions', items=(('ACTIVE', 'Active', 'Active action of each rig'), ('PATTERN', 'Name Pattern', 'Actions matching the pattern that animate the rig'), ('NLA', 'NLA Strips', 'Actions of the NLA strips of each rig')), default='ACTIVE')
+    pattern: StringProperty (name='Pattern', default='*', description='Action name pattern, * and ? are wildcards')
+    reduce_keys: BoolProperty (name='Reduce Keys', default=False, description='Remove keys that can be rebuilt from their neighbours within the tolerances')
+    reduce_angle: FloatProperty (name='Angle Tolerance', default=0.00175, min=0.0, subtype='ANGLE', description='Largest rotation error a removed key may cause on the bone')
+    reduce_distance: FloatProperty (name='Distance Tolerance', default=0.0001, min=0.0, subtype='DISTANCE', description='Largest location error a removed key may cause on the bone')
+    
+    def draw (self, context):
+        lay = self.layout
+        lay.prop (self, 'rigs')
+        lay.prop (self, 'actions')
+        if self.actions == 'PATTERN':
+            lay.prop (self, 'pattern')
+        lay.prop (self, 'check')
+        lay.prop (self, 'reduce_keys')
+        row = lay.row ()
+        row.enabled = self.reduce_keys
+        row.prop (self, 'reduce_angle')
+        row.prop (self, 'reduce_distance')
+    
+    def invoke (self, context, event):
+        wm = context.window_manager
+        return wm.invoke_props_dialog (self)
+    
+    # operator function
+    def execute (self, context):
+        
+        if self.rigs == 'ACTIVE':
+            rigs = [context.active_object]
+        else:
+            rigs = [obj for obj in context.selected_objects if obj.type == 'ARMATURE' and 'GYAZ_rig_generated' in obj.data]
+        
+        jobs = []
+        for rig in rigs:
+            actions = []
+            if self.actions == 'ACTIVE':
+                action = get_active_action (rig)
+                if action != None:
+                    actions.append (action)
+            elif self.actions == 'PATTERN':
+                actions = [action for action in rig_actions (rig) if fnmatch.fnmatchcase (action.name, self.pattern)]
+            elif self.actions == 'NLA':
+                if rig.animation_data != None:
+                    for track in rig.animation_data.nla_tracks:
+                        for strip in track.strips:
+                            if strip.action != None and strip.action not in actions:
+                                actions.append (strip.action)
+            jobs += [(rig, action) for action in actions]
+        
+        if len (jobs) == 0:
+            report (self, 'No actions to convert.', 'INFO')
+            return {'FINISHED'}
+        
+        summary = batch_convert (jobs, tolerances=(self.reduce_angle, self.reduce_distance) if self.reduce_keys else None, check=self.check)
+        
+        print ('GYAZ Game Rigger, Batch Snap and Key:')
+        for row in summary:
+            if row['skipped'] != '':
+                print ('    ' + row['rig'] + ' / ' + row['action'] + ': skipped (' + row['skipped'] + ')')
+            elif row['error'] != '':
+                print ('    ' + row['rig'] + ' / ' + row['action'] + ': failed (' + row['error'] + ')')
+            elif row['check'] != None:
+                check = row['check']
+                print ('    ' + row['rig'] + ' / ' + row['action'] + ': difference to snapping ' + str (round (degrees (check['rotation_error']), 4)) + ' degrees (' + check['rotation_bone'] + '), ' + str (round (check['location_error'], 6)) + ' location (' + check['location_bone'] + ')')
+            else:
+                keys = ', keys: ' + str (row['keys'][0]) + ' -> ' + str (row['keys'][1]) if row['keys'] != None else ''
+                print ('    ' + row['rig'] + ' / ' + row['action'] + ': ' + str (row['frames']) + ' frames, ' + str (row['bones']) + ' bones, ' + str (round (row['seconds'], 2)) + ' s' + keys)
+        
+        done = [row for row in summary if row['skipped'] == '' and row['error'] == '']
+        failed = [row for row in summary if row['error'] != '']
+        report (self, 'Batch Snap and Key: ' + str (len (done)) + ' actions, ' + str (sum (row['frames'] for row in done)) + ' frames in ' + str (round (sum (row['seconds'] for row in done), 2)) + ' s (' + str (len (summary) - len (done) - len (failed)) + ' skipped, ' + str (len (failed)) + ' failed, see console).', 'WARNING' if len (failed) > 0 else 'INFO')
+        return {'FINISHED'}
+
+    # when the buttons should show up    
+    @classmethod
+    def poll(cls, context):     
+        return context.mode == 'POSE'    
+
+
+class Op_GYAZGameRig_ReduceKeys (bpy.types.Operator):
+       
+    bl_idname = "anim.gyaz_game_rigger_reduce_keys"  
+    bl_label = "GYAZ Game Rigger: Reduce Keys"
+    bl_description = "Remove location and rotation keys of the active action that can be rebuilt from their neighbours within the tolerances"
+    
+    bones: EnumProperty (name='Bones', items=(('ALL', 'All', ''), ('SELECTED', 'Selected', '')), default='ALL')
+    reduce_angle: FloatProperty (name='Angle Tolerance', default=0.00175, min=0.0, subtype='ANGLE', description='Largest rotation error a removed key may cause on the bone')
+    reduce_distance: FloatProperty (name='Distance Tolerance', default=0.0001, min=0.0, subtype='DISTANCE', description='Largest location error a removed key may cause on the bone')
+    
+    def draw (self, context):
+        lay = self.layout
+        lay.prop (self, 'bones')
+        lay.prop (self, 'reduce_angle')
+        lay.prop (self, 'reduce_distance')
+    
+    def invoke (self, context, event):
+        wm = context.window_manager
+        return wm.invoke_props_dialog (self)
+    
+    # operator function
+    def execute (self, context):
+        rig = context.active_object
+        action = get_active_action (rig)
+        if action == None:
+            report (self, 'No active action.', 'INFO')
+            return {'FINISHED'}
+        
+        bone_names = None
+        if self.bones == 'SELECTED':
+            bone_names = set (pbone.name for pbone in context.selected_pose_bones)
+        
+        before, after = reduce_action_keys (rig, action, self.reduce_angle, self.reduce_distance, bone_names=bone_names)
+        context.scene.frame_set (context.scene.frame_current)
+        
+        report (self, action.name + ': keys reduced from ' + str (before) + ' to ' + str (after) + '.', 'INFO')
         return {'FINISHED'}
 
     # when the buttons should show up    
@@ -350,42 +663,38 @@ class Op_GYAZGameRig_Switch (bpy.types.Operator):
         is_local = self.is_local
         
         rig = bpy.context.active_object
-        scene = bpy.context.scene
         pbones = rig.pose.bones
         
+        # props are collected first and written in one pass (write_pose_props)
+        writes = {}
+        
         def set_module_props (pbone, module_name):
             
             prop_name = 'switch_' + module_name
-            prop_list = pbone.keys()        
-            prop = pbone[prop_name] if prop_name in prop_list else None
-            if prop != None:
+            if prop_name in pbone:
+                key = (pbone.name, prop_name)
                 
                 def set_vis (name):
-                    vis_name = 'visible_' + name + '_' + module_name
-                    vis = pbone[vis_name] if vis_name in prop_list else None
-                    if vis != None:
-                        pbone[vis_name] = 1
+                    writes[(pbone.name, 'visible_' + name + '_' + module_name)] = 1
             
                 if mode == 'FK':
-                    pbone[prop_name] = 0
+                    writes[key] = 0
                     set_vis ('fk')
                     
                 elif mode == 'IK/CTRL':
-                    pbone[prop_name] = 1
+                    writes[key] = 1
                     set_vis ('ik')                  
                     set_vis ('ctrl')                  
                 
                 elif mode == 'BASE':
                     if not is_local:    
                     
-                        pbone[prop_name] = 2
+                        writes[key] = 2
                         
                         general_module_bone = pbones.get ('module_props__general')
                         if general_module_bone != None:
-                            vis_name = 'visible_base_bones'
-                            vis = general_module_bone[vis_name] if vis_name in general_module_bone.keys () else None
-                            if vis != None:
-                                 general_module_bone[vis_name] = 1
+                            if 'visible_base_bones' in general_module_bone:
+                                 writes[(general_module_bone.name, 'visible_base_bones')] = 1
                                  rig.show_in_front = True      
         
                             
@@ -397,25 +706,19 @@ class Op_GYAZGameRig_Switch (bpy.types.Operator):
             else:
                 
                 if pbone != None:
-                    if 'module' in pbone.keys ():
-                        module_name = pbone['module']
-                        module_pbone_name = 'module_props__' + module_name
-                        module_pbone = pbones.get (module_pbone_name)
-                        if module_pbone != None:
-                            pbone = module_pbone
-                            set_module_props (pbone, module_name)
+                    module_name = bone_module (rig, pbone)
+                    if module_name != None:
+                        module_pbone_name = module_index (rig).props_bone_of (module_name)
+                        if module_pbone_name != None:
+                            set_module_props (pbones[module_pbone_name], module_name)
                     else:
                         popup (item="Bone is not part of any module.", icon='ERROR')
                         
         else:
-            for pbone in pbones:
-                if pbone.name.startswith ('module_props__'):
-                    module_name = pbone.name[14:]
-                    set_module_props (pbone, module_name)                        
-        
-        # force scene update                    
-        bpy.ops.object.mode_set (mode='OBJECT')
-        bpy.ops.object.mode_set (mode='POSE')
+            for module_name, module_pbone_name in module_index (rig).props_bones.items ():
+                set_module_props (pbones[module_pbone_name], module_name)                        
+        
+        write_pose_props (rig, writes)
             
         # end of operator
         return {'FINISHED'}
@@ -448,31 +751,31 @@ class Op_GYAZGameRig_SetVisible (bpy.types.Operator):
         is_local = self.is_local
         
         rig = bpy.context.active_object
-        scene = bpy.context.scene
         
         pbones = rig.pose.bones
         
+        # props are collected first and written in one pass (write_pose_props)
+        writes = {}
+        
         def set_module_props (pbone, module_name):
             
-            prop_list = pbone.keys()
-            
             def set_vis (name):
                 
                 prop_name = 'visible_' + name + '_' + module_name
-                prop = pbone[prop_name] if prop_name in prop_list else None
-                if prop != None:
+                if prop_name in pbone:
+                    key = (pbone.name, prop_name)
                 
                     if is_local:
                         if pbone[prop_name] == 0:
-                            pbone[prop_name] = 1
+                            writes[key] = 1
                         else:
-                            pbone[prop_name] = 0
+                            writes[key] = 0
                         
                     else:    
                         if mode.startswith ('SHOW'):
-                            pbone[prop_name] = 1
+                            writes[key] = 1
                         elif mode.startswith ('HIDE'):
-                            pbone[prop_name] = 0
+                            writes[key] = 0
                         
                     
             if mode.endswith ('FK'):
@@ -495,26 +798,19 @@ class Op_GYAZGameRig_SetVisible (bpy.types.Operator):
                 report (self, 'No selected bones.', 'WARNING')
             else:
                 
-                if 'module' in pbone.keys ():
-                    module_name = pbone['module']
-                    module_pbone_name = 'module_props__' + module_name
-                    module_pbone = pbones.get (module_pbone_name)
-                    if module_pbone != None:
-                        pbone = module_pbone
-                        set_module_props (pbone, module_name)
+                module_name = bone_module (rig, pbone)
+                if module_name != None:
+                    module_pbone_name = module_index (rig).props_bone_of (module_name)
+                    if module_pbone_name != None:
+                        set_module_props (pbones[module_pbone_name], module_name)
                 else:
                     popup (item="Bone is not part of any module.", icon='ERROR')
                         
         else:
-            for pbone in pbones:
-                if pbone.name.startswith ('module_props__'):
-                    module_name = pbone.name[14:]
-                    set_module_props (pbone, module_name)
-                
+            for module_name, module_pbone_name in module_index (rig).props_bones.items ():
+                set_module_props (pbones[module_pbone_name], module_name)
         
-        # force scene update
-        bpy.ops.object.mode_set (mode='OBJECT')
-        bpy.ops.object.mode_set (mode='POSE')
+        write_pose_props (rig, writes)
             
         # end of operator
         return {'FINISHED'}
@@ -673,7 +969,6 @@ class Op_GYAZGameRig_SelectModuleBones (bpy.types.Operator):
         
         rig = bpy.context.active_object
         bones = rig.data.bones
-        pbones = rig.pose.bones
         
         # get selected bones
         selected_pbones = bpy.context.selected_pose_bones
@@ -681,27 +976,32 @@ class Op_GYAZGameRig_SelectModuleBones (bpy.types.Operator):
             report (self, 'No selected bones.', 'WARNING')
         else:
             
+            # (module, type) pairs, each selected only once
+            groups = set ()
             for pbone in selected_pbones:
-                if "module" in pbone:
-                    module = pbone["module"]
-                    
+                module = bone_module (rig, pbone)
+                if module != None:
                     # get type of pbone
-                    type = ""
-                    if "bone_type" in pbone:
-                        type = pbone['bone_type']
-                    
-                    # get bones from the same module
-                    for pbone in pbones:
-                        if "module" in pbone:
-                            if pbone["module"] == module:
-                                # filter it against type
-                                if type != "":
-                                    if 'bone_type' in pbone:
-                                        if pbone['bone_type'] == type:
-                                            if not pbone.name.startswith ('target_line'):
-                                                bones[pbone.name].select = True
-                                else:
-                                    bones[pbone.name].select = True
+                    groups.add ((module, pbone.get ('bone_type', '')))
+            
+            # returns True if a bone of the index is missing
+            def select (index):
+                missing = False
+                for module, type in groups:
+                    # get bones from the same module, filtered against type
+                    names = index.bones_of (module, type) if type != "" else index.bones_of (module)
+                    for name in names:
+                        if type == "" or not name.startswith ('target_line'):
+                            bone = bones.get (name)
+                            if bone != None:
+                                bone.select = True
+                            else:
+                                missing = True
+                return missing
+            
+            # bones renamed or removed since the index was built
+            if select (module_index (rig)):
+                select (module_index (rig, rebuild=True))
                           
         # end of operator
         return {'FINISHED'}
@@ -716,15 +1016,18 @@ class Op_GYAZGameRig_SavePropsToAction (bpy.types.Operator):
        
     bl_idname = "anim.gyaz_game_rigger_save_props_to_action"  
     bl_label = "GYAZ Game Rigger: Save Props To Action"
-    bl_description = "Save all props to active action / Load all props from active action"
+    bl_description = "Save all props to active action (or all actions of the rig) / Load all props from active action"
     
     mode: EnumProperty (items=(('SAVE', 'Save', ''), ('LOAD', 'Load', '')), default='SAVE', options={'SKIP_SAVE'})
+    actions: EnumProperty (name='Actions', items=(('ACTIVE', 'Active', 'Active action'), ('ALL', 'All', 'All actions animating the rig')), default='ACTIVE')
     
     def draw (self, context):
         lay = self.layout
         if self.mode == 'SAVE':
             lay.label (text='Save props to action?')
+            lay.prop (self, 'actions')
         else:
+            # props are saved per action, they're only loaded from the active one
             lay.label (text='Load props from action?')
     
     def invoke (self, context, event):
@@ -736,41 +1039,34 @@ class Op_GYAZGameRig_SavePropsToAction (bpy.types.Operator):
         
         mode = self.mode
         rig = bpy.context.active_object
-        pbones = rig.pose.bones
-        save_prop_name = 'gyaz_game_rig_save_props'
-        scene = bpy.context.scene
         
         action = get_active_action (rig)
         
-        if action is not None:
+        if mode == 'SAVE' and self.actions == 'ALL':
+            
+            # the props are read once and stored on every action
+            actions = rig_actions (rig)
+            if action != None and action not in actions:
+                actions.append (action)
+            if len (actions) > 0:
+                store = prop_store_from_rig (rig, exclude=('snap_n_key__should_snap',))
+                for item in actions:
+                    store.store (item, saved_prop_name)
+                report (self, 'Props saved to ' + str (len (actions)) + ' actions.', 'INFO')
+            else:
+                report (self, 'No action.', 'WARNING')
+        
+        elif action is not None:
             
             if mode == 'SAVE':
             
-                prop_info = []
-                
-                for pbone in pbones:
-                    for key in pbone.keys():
-                        if key != '_RNA_UI' and key != 'bone_type' and key != 'module' and key != 'snap_n_key__should_snap' and not key.startswith ('snapinfo'):
-                            info = {'bone': pbone.name, 'key': key, 'value': pbone[key]}
-                            prop_info.append (info)
-                        
-                action[save_prop_name] = prop_info
-               
+                prop_store_from_rig (rig, exclude=('snap_n_key__should_snap',)).store (action, saved_prop_name)
                
             elif mode == 'LOAD':
                 
-                if save_prop_name in action:
-                    prop_info = action[save_prop_name]
-                    
-                    for item in prop_info:
-                        pbone = pbones.get (item['bone'])
-                        if pbone != None:
-                            key = item['key']
-                            if key in pbone:
-                                pbone[key] = item['value']
-                                
-                    bpy.ops.object.mode_set (mode='OBJECT')
-                    bpy.ops.object.mode_set (mode='POSE')
+                store = load_prop_store (action, saved_prop_name)
+                if store != None:
+                    write_pose_props (rig, store.writes ())
                                 
                 else:
                     report (self, 'Props were not saved for this action.', 'WARNING')
@@ -806,28 +1102,18 @@ class Op_GYAZGameRig_ResetProps (bpy.types.Operator):
         all = self.all
         prop_name = self.name
         rig = bpy.context.active_object
-        pbones = rig.pose.bones
 
-        prop_info = rig.data['prop_defaults']
+        # indexed by prop name, read from the armature once per session
+        store = prop_defaults (rig)
+        if store == None:
+            report (self, 'No default props saved on the rig.', 'WARNING')
+            return {'FINISHED'}
         
         if all:
-            
-            for item in prop_info:
-                pbone = pbones.get (item['bone'])
-                if pbone != None:
-                    key = item['key']
-                    if key in pbone:
-                        pbone[key] = item['value']
+            write_pose_props (rig, store.writes ())
                         
         else:
-            
-            for item in prop_info:
-                if item['key'] == prop_name:
-                    pbone = pbones.get (item['bone'])
-                    if pbone != None:
-                        key = item['key']
-                        if key in pbone:
-                            pbone[key] = item['value']   
+            write_pose_props (rig, store.writes (prop_name))
                     
         # end of operator
         return {'FINISHED'}
@@ -876,15 +1162,15 @@ class BONE_PT_GYAZGameRig (Panel):
         row = lay.row (align=True)
         row.label (text="Low-level Rig:")
         row.prop (owner, 'show_low_level_props', text='', icon='TRIA_UP' if owner.show_low_level_props else 'TRIA_DOWN', emboss=False)
+        # rows are cached per rig until it's regenerated or props are written (module_index.py)
+        index = module_index (rig)
         if owner.show_low_level_props:
             col = lay.column (align=True)           
             bone_name = 'module_props__' + 'general'
             if pbones.get (bone_name) != None:
                 pbone = pbones[bone_name]
-                for prop in pbone.keys():
-                    if prop != '_RNA_UI':
-                        slider = False if prop.startswith ('switch') or prop.startswith ('visible') or prop.startswith ('limit') else True
-                        col.prop (pbone, '["'+prop+'"]', slider=slider)
+                for path, slider in index.prop_rows (pbones, bone_name, 'GENERAL'):
+                    col.prop (pbone, path, slider=slider)
                
         row = lay.row (align=True)     
         row.prop (rig, 'show_in_front')
@@ -953,24 +1239,21 @@ class BONE_PT_GYAZGameRig (Panel):
             col = lay.column (align=True)
             if bpy.context.active_pose_bone != None:
                 active_bone = bpy.context.active_pose_bone
-                if 'module' in active_bone:
-                    module = active_bone['module']
-                    bone_name = 'module_props__' + module
-                    if pbones.get (bone_name) != None:
-                        pbone = pbones[bone_name]            
-                        for prop in pbone.keys():
-                            if (prop.startswith('switch') or prop.startswith('visible')) and owner.show_switch_visible:
-                                col.prop (pbone, '["'+prop+'"]')
+                module = index.module_of (active_bone.name)
+                if module != None and owner.show_switch_visible:
+                    bone_name = index.props_bone_of (module)
+                    if bone_name != None:
+                        pbone = pbones.get (bone_name)
+                        for path, slider in index.prop_rows (pbones, bone_name, 'MODULE'):
+                            col.prop (pbone, path)
 
                 
             # bone properties
             col = lay.column (align=True)
             pbone = bpy.context.active_pose_bone
             if pbone != None:
-                for key in pbone.keys():
-                    if key != '_RNA_UI' and key != 'bone_type' and key != 'module' and key != 'source_bone':
-                        slider = False if key.startswith ('limit') or key.startswith ('active') else True
-                        col.prop (pbone, '["'+key+'"]', slider=slider)
+                for path, slider in index.prop_rows (pbones, pbone.name, 'BONE'):
+                    col.prop (pbone, path, slider=slider)
                         
         
         if addon_utils.check ('GYAZ_export_tools') == (True, True):
@@ -1001,7 +1284,6 @@ class BONE_PT_GYAZGameRigSnapAndKey (Panel):
         lay = self.layout        
         rig = bpy.context.active_object
         pbones = rig.pose.bones
-        rig_data = rig.data
         
         row = lay.row (align=True)
         row.prop (rig, '["snap_start"]', text='')
@@ -1011,22 +1293,26 @@ class BONE_PT_GYAZGameRigSnapAndKey (Panel):
         row.operator (Op_GYAZGameRig_SetSnapPropToCurrentFrame.bl_idname, text='', icon='EYEDROPPER').prop_name='snap_end'
         
         col = lay.column (align=True)
-        if 'snappable_modules' in rig_data:
-            for module in rig_data['snappable_modules']:           
-                if pbones.get ('module_props__'+module) != None:
-                    row = col.row ()
-                    icon = "CHECKBOX_DEHLT" if pbones['module_props__'+module]["snap_n_key__should_snap"] == 0 else "CHECKBOX_HLT"
-                    row.operator (Op_GYAZGameRig_SetSnapPropActive.bl_idname, text=module+':', icon=icon, emboss=False).module=module
-                    pbone = pbones['module_props__'+module]
-                    fk_ik = 'snap_n_key__fk_ik'
-                    if fk_ik in pbone:
-                        icon = 'snap_fk' if pbone[fk_ik] == 0 else 'snap_ik'
-                        text = 'FK to IK' if pbone[fk_ik] == 0 else 'IK to FK'
-                        row.operator (Op_GYAZGameRig_SetSnapPropFKIK.bl_idname, text=text, icon_value=custom_icons[icon].icon_id, emboss=False).module=module
-                    else:
-                        row.operator (Op_GYAZGameRig_Button.bl_idname, icon_value=custom_icons['snap_fk'].icon_id, text='FK to CTRL', emboss=False)
-                    
-        lay.operator (Op_GYAZGameRig_SnapAndKey.bl_idname, text='Snap and Key', icon_value=custom_icons["snow"].icon_id)            
+        for module, bone_name in module_index (rig).snap_panel_rows (rig):
+            # cached until the rig is regenerated, the bone or its props may be gone
+            pbone = pbones.get (bone_name)
+            if pbone == None:
+                continue
+            row = col.row ()
+            icon = "CHECKBOX_DEHLT" if pbone.get ("snap_n_key__should_snap", 0) == 0 else "CHECKBOX_HLT"
+            row.operator (Op_GYAZGameRig_SetSnapPropActive.bl_idname, text=module+':', icon=icon, emboss=False).module=module
+            fk_ik = 'snap_n_key__fk_ik'
+            if fk_ik in pbone:
+                icon = 'snap_fk' if pbone[fk_ik] == 0 else 'snap_ik'
+                text = 'FK to IK' if pbone[fk_ik] == 0 else 'IK to FK'
+                row.operator (Op_GYAZGameRig_SetSnapPropFKIK.bl_idname, text=text, icon_value=custom_icons[icon].icon_id, emboss=False).module=module
+            else:
+                row.operator (Op_GYAZGameRig_Button.bl_idname, icon_value=custom_icons['snap_fk'].icon_id, text='FK to CTRL', emboss=False)
+            
+        lay.operator (Op_GYAZGameRig_SnapAndKey.bl_idname, text='Snap and Key', icon_value=custom_icons["snow"].icon_id)
+        lay.operator (Op_GYAZGameRig_ConvertAction.bl_idname, text='Convert Action', icon='ACTION')
+        lay.operator (Op_GYAZGameRig_BatchSnapAndKey.bl_idname, text='Batch Snap and Key', icon='ACTION')
+        lay.operator (Op_GYAZGameRig_ReduceKeys.bl_idname, text='Reduce Keys', icon='IPO_BEZIER')            
 
    
     # when the buttons should show up    
@@ -1043,6 +1329,14 @@ class BONE_PT_GYAZGameRigSnapAndKey (Panel):
 #REGISTER
 #everything should be registeres here
 
+# per rig caches are keyed by armature data pointers, which the armatures of a loaded file may reuse
+@persistent
+def clear_rig_caches (dummy):
+    registries.clear ()
+    indices.clear ()
+    default_stores.clear ()
+
+
 def register():
     
     # custom icons
@@ -1063,6 +1357,9 @@ def register():
     bpy.utils.register_class (Op_GYAZGameRig_SnapFKtoIK)  
     bpy.utils.register_class (Op_GYAZGameRig_SnapIKtoFK) 
     bpy.utils.register_class (Op_GYAZGameRig_SnapAndKey) 
+    bpy.utils.register_class (Op_GYAZGameRig_ConvertAction) 
+    bpy.utils.register_class (Op_GYAZGameRig_BatchSnapAndKey) 
+    bpy.utils.register_class (Op_GYAZGameRig_ReduceKeys) 
     bpy.utils.register_class (Op_GYAZGameRig_Switch)  
     bpy.utils.register_class (Op_GYAZGameRig_SetVisible)  
     bpy.utils.register_class (Op_GYAZGameRig_SetSnapPropToCurrentFrame)  
@@ -1077,6 +1374,7 @@ def register():
     bpy.utils.register_class (BONE_PT_GYAZGameRig)      
     bpy.utils.register_class (BONE_PT_GYAZGameRigSnapAndKey)  
     bpy.types.VIEW3D_MT_armature_add.append(add_source_rig_button)      
+    bpy.app.handlers.load_post.append (clear_rig_caches)
 
 def unregister ():
     
@@ -1091,6 +1389,9 @@ def unregister ():
     bpy.utils.unregister_class (Op_GYAZGameRig_SnapFKtoIK)
     bpy.utils.unregister_class (Op_GYAZGameRig_SnapIKtoFK)
     bpy.utils.unregister_class (Op_GYAZGameRig_SnapAndKey)
+    bpy.utils.unregister_class (Op_GYAZGameRig_ConvertAction)
+    bpy.utils.unregister_class (Op_GYAZGameRig_BatchSnapAndKey)
+    bpy.utils.unregister_class (Op_GYAZGameRig_ReduceKeys)
     bpy.utils.unregister_class (Op_GYAZGameRig_Switch)
     bpy.utils.unregister_class (Op_GYAZGameRig_SetVisible)
     bpy.utils.unregister_class (Op_GYAZGameRig_SetSnapPropToCurrentFrame)
@@ -1105,6 +1406,7 @@ def unregister ():
     bpy.utils.unregister_class (BONE_PT_GYAZGameRig)
     bpy.utils.unregister_class (BONE_PT_GYAZGameRigSnapAndKey)
     bpy.types.VIEW3D_MT_armature_add.remove(add_source_rig_button)
+    bpy.app.handlers.load_post.remove (clear_rig_caches)
   
 if __name__ == "__main__":   
     register()
\ No newline at end of file
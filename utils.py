@@ -21,9 +21,318 @@
 ##########################################################################################################
 
 import bpy
-from mathutils import Vector, Matrix
+import json
+import time
+import hashlib
+from mathutils import Vector
 from math import radians, sqrt
 from .constants import Constants
+from .rig_spec import RigSpec
+from .rig_spec import DriverRecord
+from .materialize import materialize
+from .materialize import materialize_drivers
+from .shape_sizing import ShapeSizingStage
+from .driver_expressions import validate_drivers
+from .snap_registry import stamp_generation
+from .module_index import props_written
+from .profiler import profiled
+from .profiler import record_module
+
+
+# GENERATION SCHEDULER:
+# while a rig is being generated the armature stays in edit mode,
+# edit bone work (create, parent, head/tail/roll) is done right away,
+# pose bone work (locks, groups, constraints, drivers, custom shapes) is recorded
+# in a RigSpec and materialized in a single pose mode session once all modules have finished
+class GenerationScheduler():
+
+    def __init__(self):
+        self.spec = RigSpec()
+        self.shape_sizing = ShapeSizingStage()
+        self.mode_switches = 0
+        # MODULES: see run_module
+        self.incremental = False
+        self.stored_module_states = []
+        self.module_states = []
+        # index of module state: (constraint start, constraint end, driver start, driver end) in spec
+        self.module_ranges = {}
+        self.modules_dirty = True
+        self.modules_kept = 0
+        # bone name: rest data of the source bones as they were when the generation began
+        self.source_bones = {}
+        # counts returned by materialize
+        self.materialized = {'props': 0, 'ui_bones': 0, 'drivers': 0}
+        # returned by validate_drivers
+        self.driver_check = {'drivers': 0, 'rewritten': 0, 'python': 0, 'python_paths': []}
+
+
+scheduler = None
+
+# armature data prop the module states of the last generation are stored in (json)
+module_state_prop_name = 'GYAZ_module_states'
+# armature data prop the source bones are stored in as they were before and after the last generation (json)
+source_state_prop_name = 'GYAZ_source_bones'
+
+
+# changed_modules_only: only rebuild modules whose fingerprint changed since the last generation
+def begin_generation(changed_modules_only=False):
+    global scheduler
+    scheduler = GenerationScheduler()
+    
+    rig = bpy.context.object
+    if changed_modules_only and module_state_prop_name in rig.data:
+        scheduler.incremental = True
+        scheduler.stored_module_states = json.loads(rig.data[module_state_prop_name])
+        scheduler.modules_dirty = False
+        scheduler.spec.replace_drivers = True
+    
+    # bones of the last generation are output, not input
+    generated = set()
+    if module_state_prop_name in rig.data:
+        for state in json.loads(rig.data[module_state_prop_name]):
+            generated.update(state['bones'])
+    set_mode('OBJECT')
+    source_bones = {bone.name: source_bone_data(bone) for bone in rig.data.bones if bone.name not in generated}
+    # modules normalize some source bones (roll of face bones), a bone left as the last generation left it
+    # is fingerprinted as it was before that generation, one edited since then as it is now
+    if source_state_prop_name in rig.data:
+        stored = json.loads(rig.data[source_state_prop_name])
+        for name, data in source_bones.items():
+            if stored['after'].get(name) == data and name in stored['before']:
+                source_bones[name] = stored['before'][name]
+    scheduler.source_bones = source_bones
+
+
+# head, tail and roll (z axis), not the parent (modules reparent source bones)
+def source_bone_data(bone):
+    return '%.5f %.5f %.5f %.5f %.5f %.5f %.5f %.5f %.5f' % (tuple(bone.head_local) + tuple(bone.tail_local) + tuple(bone.z_axis))
+
+
+def is_incremental_generation():
+    return scheduler.incremental
+
+
+def get_spec():
+    return scheduler.spec
+
+
+def apply_rig_spec(bvh_tree, shape_collection):
+    # modules that are no longer generated
+    if not scheduler.modules_dirty:
+        tear_down_modules(scheduler.stored_module_states[len(scheduler.module_states):])
+    
+    # ray casts of all custom shapes
+    set_mode('EDIT')
+    bone_queries = list(scheduler.shape_sizing.bone_queries)
+    profiled('shape_sizing')(scheduler.shape_sizing.resolve)(bvh_tree=bvh_tree, 
+                                                             rig=bpy.context.object, 
+                                                             spec=scheduler.spec
+                                                             )
+    record_shape_bones(bone_queries)
+    set_mode('POSE')
+    scheduler.materialized = profiled('materialize')(materialize)(rig=bpy.context.object, 
+                                                                  spec=scheduler.spec, 
+                                                                  shape_collection=shape_collection
+                                                                  )
+    scheduler.materialized['drivers'] += add_chain_mute_drivers(bpy.context.object, scheduler.spec)
+    scheduler.driver_check = validate_drivers(bpy.context.object)
+    stamp_generation(bpy.context.object)
+    store_module_states()
+
+
+# returns stats of the generation
+def end_generation():
+    global scheduler
+    stats = {'mode_switches': scheduler.mode_switches,
+             'modules_built': len(scheduler.module_states) - scheduler.modules_kept,
+             'modules_kept': scheduler.modules_kept,
+             'constraints': len(scheduler.spec.constraints),
+             'drivers': scheduler.materialized['drivers'],
+             'props': scheduler.materialized['props'],
+             'driver_check': scheduler.driver_check
+             }
+    scheduler = None
+    return stats
+
+
+# INCREMENTAL GENERATION:
+# every module invocation is fingerprinted by its options, the rest transforms of the source bones it's given
+# and the character mesh, in incremental mode the first module whose fingerprint changed
+# and every module after it (they may build on its bones) are torn down and rebuilt,
+# modules before it are kept as they are,
+# generated bones it's given only count by name, they change only if an earlier module is rebuilt
+def module_fingerprint(key, args, kwargs):
+    
+    source_bones = scheduler.source_bones
+    parts = [key]
+    bone_names = set()
+    
+    def collect_names(value):
+        if isinstance(value, (list, tuple)):
+            for item in value:
+                collect_names(item)
+        elif isinstance(value, str):
+            bone_names.add(value)
+    
+    for value in list(args) + sorted(kwargs.items()):
+        if hasattr(value, 'mesh_fingerprint'):
+            parts.append(value.mesh_fingerprint)
+        elif isinstance(value, (str, int, float, bool, list, tuple, type(None))):
+            parts.append(repr(value))
+            collect_names(value)
+    
+    for name in sorted(bone_names):
+        if name in source_bones:
+            parts.append(name + ' ' + source_bones[name])
+    
+    return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+# key: unique name of the module invocation
+def run_module(key, function, *args, **kwargs):
+    
+    rig = bpy.context.object
+    start = time.perf_counter()
+    set_mode('EDIT')
+    
+    index = len(scheduler.module_states)
+    fingerprint = module_fingerprint(key, args, kwargs)
+    
+    if not scheduler.modules_dirty:
+        stored = scheduler.stored_module_states
+        if index < len(stored) and stored[index]['key'] == key and stored[index]['fingerprint'] == fingerprint:
+            scheduler.module_states.append(stored[index])
+            scheduler.modules_kept += 1
+            record_module(key, time.perf_counter() - start, True, 0, 0, 0)
+            return
+        # this and every later module is rebuilt
+        tear_down_modules(stored[index:])
+        scheduler.modules_dirty = True
+        set_mode('EDIT')
+    
+    spec = scheduler.spec
+    bones_before = set(ebone.name for ebone in rig.data.edit_bones)
+    constraint_start = len(spec.constraints)
+    driver_start = len(spec.drivers)
+    
+    function(*args, **kwargs)
+    
+    set_mode('EDIT')
+    created_bones = [ebone.name for ebone in rig.data.edit_bones if ebone.name not in bones_before]
+    scheduler.module_states.append({'key': key, 
+                                    'fingerprint': fingerprint,
+                                    'bones': created_bones
+                                    })
+    scheduler.module_ranges[index] = (constraint_start, len(spec.constraints), driver_start, len(spec.drivers))
+    
+    record_module(key, 
+                  time.perf_counter() - start, 
+                  False, 
+                  len(created_bones), 
+                  len(spec.constraints) - constraint_start, 
+                  len(spec.drivers) - driver_start
+                  )
+
+
+# removes the bones, constraints and drivers the modules created
+def tear_down_modules(states):
+    
+    if len(states) == 0:
+        return
+    
+    rig = bpy.context.object
+    
+    set_mode('OBJECT')
+    pbones = rig.pose.bones
+    for state in states:
+        for bone_name, constraint_name in state['constraints']:
+            pbone = pbones.get(bone_name)
+            if pbone is not None and constraint_name in pbone.constraints:
+                pbone.constraints.remove(pbone.constraints[constraint_name])
+        for owner, data_path, array_index in state['drivers']:
+            (rig if owner == 'OBJECT' else rig.data).driver_remove(data_path, array_index)
+    
+    set_mode('EDIT')
+    ebones = rig.data.edit_bones
+    for state in states:
+        for name in state['bones']:
+            ebone = ebones.get(name)
+            if ebone is not None:
+                ebones.remove(ebone)
+
+
+# shape bones are created after all modules have run,
+# they belong to the (rebuilt) module that created the bone they transform
+def record_shape_bones(bone_queries):
+    owners = {}
+    for index in scheduler.module_ranges:
+        for bone_name in scheduler.module_states[index]['bones']:
+            owners[bone_name] = index
+    for query in bone_queries:
+        index = owners.get(query.bone_name)
+        if query.result is not None and index is not None:
+            scheduler.module_states[index]['bones'].append(query.result)
+
+
+# constraint and driver names are only known once the spec is materialized
+def store_module_states():
+    spec = scheduler.spec
+    for index, (constraint_start, constraint_end, driver_start, driver_end) in scheduler.module_ranges.items():
+        state = scheduler.module_states[index]
+        state['constraints'] = [[record.bone_name, record.name] for record in spec.constraints[constraint_start:constraint_end]]
+        state['drivers'] = [[record.owner, record.data_path, record.array_index] for record in spec.drivers[driver_start:driver_end]]
+        state['drivers'] += [['OBJECT', record.mute_driver, -1] for record in spec.constraints[constraint_start:constraint_end] if record.mute_driver is not None]
+    
+    rig = bpy.context.object
+    rig.data[module_state_prop_name] = json.dumps(scheduler.module_states)
+    
+    bones = rig.data.bones
+    after = {name: source_bone_data(bones[name]) for name in scheduler.source_bones if name in bones}
+    rig.data[source_state_prop_name] = json.dumps({'before': scheduler.source_bones, 'after': after})
+
+
+@profiled('mode_set')
+def mode_set(mode):
+    bpy.ops.object.mode_set(mode=mode)
+
+
+# mode: 'OBJECT', 'EDIT', 'POSE'
+def set_mode(mode):
+    if bpy.context.object.mode != mode:
+        mode_set(mode)
+        if scheduler is not None:
+            scheduler.mode_switches += 1
+
+
+# settings: constraint attributes in the order they should be set,
+# target (pole_target) is set to the rig if subtarget (pole_subtarget) is given
+def add_constraint(bone_name, type, set_inverse=False, **settings):
+    get_spec().add_constraint(bone_name, type, settings, set_inverse)
+
+
+def set_pose_bone_prop(bone_name, prop_name, value):
+    get_spec().set_prop(bone_name, prop_name, value)
+
+
+# snap info: list of bone names (and settings) stored on a module's prop bone for the 'Snap&Key' operator
+def set_snap_info(bone_name, name, items):
+    get_spec().set_snap_info(bone_name, name, items)
+
+
+# bones of modules kept from the last generation only have their pose bone
+def get_bone_type(bone_name):
+    spec = get_spec()
+    if bone_name in spec.bones:
+        return spec.bones[bone_name].bone_type
+    pbone = bpy.context.object.pose.bones.get(bone_name)
+    return pbone['bone_type'] if pbone is not None and 'bone_type' in pbone else ''
+
+
+def get_shape_scale(bone_name):
+    spec = get_spec()
+    if bone_name in spec.bones and spec.bones[bone_name].custom_shape_scale is not None:
+        return spec.bones[bone_name].custom_shape_scale
+    return bpy.context.object.pose.bones[bone_name].custom_shape_scale
 
 
 def report (self, item, error_or_info):
@@ -31,12 +340,111 @@ def report (self, item, error_or_info):
 
 
 
+# writes: {(bone name, prop name): value}, only props that exist and change are written,
+# then the rig (object and armature drivers read the props) is tagged for one depsgraph update
+# instead of leaving and re-entering pose mode, returns the number of props changed
+def write_pose_props(rig, writes):
+    pbones = rig.pose.bones
+    changed = 0
+    for (bone_name, prop_name), value in writes.items():
+        pbone = pbones.get(bone_name)
+        if pbone is not None and prop_name in pbone and pbone[prop_name] != value:
+            pbone[prop_name] = value
+            changed += 1
+    if changed > 0:
+        rig.update_tag()
+        rig.data.update_tag()
+    # panel rows are rebuilt
+    props_written()
+    return changed
+
+
+# INACTIVE CHAINS:
+# constraints on a module's fk bones are muted by a driver while the module isn't switched to fk,
+# the ones on its ik, ctrl and touch bones (pole lines, helpers) while it isn't switched to ik/ctrl,
+# so playback only evaluates the controls in use. Constraints that already have a mute driver are left alone.
+# The driver paths are listed on the module's prop bone, for the snap operators to lift the muting while they read.
+
+chain_mute_prop_name = 'chain_mute_drivers'
+chain_mute_expressions = {Constants.fk_type: 'v1 != 0',
+                          Constants.ik_type: 'v1 != 1',
+                          Constants.ctrl_type: 'v1 != 1',
+                          Constants.touch_type: 'v1 != 1'
+                          }
+
+
+# called once the spec is materialized (constraint names are known), returns the number of drivers added
+def add_chain_mute_drivers(rig, spec):
+    records = []
+    paths = {}
+    for record in spec.constraints:
+        bone = spec.bones.get(record.bone_name)
+        module = spec.get_prop(record.bone_name, 'module')
+        if bone is None or module is None or bone.bone_type not in chain_mute_expressions:
+            continue
+        prop_bone_name = 'module_props__' + module
+        prop_name = 'switch_' + module
+        if spec.get_prop(prop_bone_name, prop_name) is None:
+            continue
+        data_path = 'pose.bones["' + record.bone_name + '"].constraints["' + record.name + '"].mute'
+        if ('OBJECT', data_path, -1) in spec.driver_index:
+            continue
+        
+        records.append(DriverRecord('OBJECT', data_path, -1, chain_mute_expressions[bone.bone_type], [('v1', prop_bone_name, prop_name)]))
+        record.mute_driver = data_path
+        paths.setdefault(prop_bone_name, []).append(data_path)
+    
+    materialize_drivers(rig, records, spec.replace_drivers)
+    for prop_bone_name, data_paths in paths.items():
+        rig.pose.bones[prop_bone_name][chain_mute_prop_name] = data_paths
+    return len(records)
+
+
+# unmutes the chains of the modules so their pose can be read, returns the driver paths to pass to resume_chain_muting
+def suspend_chain_muting(rig, modules):
+    suspended = []
+    if rig.animation_data is None:
+        return suspended
+    drivers = rig.animation_data.drivers
+    for module in modules:
+        prop_bone = rig.pose.bones.get('module_props__' + module)
+        if prop_bone is None or chain_mute_prop_name not in prop_bone:
+            continue
+        for data_path in prop_bone[chain_mute_prop_name]:
+            fcurve = drivers.find(data_path)
+            if fcurve is not None and not fcurve.mute:
+                fcurve.mute = True
+                rig.path_resolve(data_path[:-5]).mute = False
+                suspended.append(data_path)
+    if len(suspended) > 0:
+        bpy.context.view_layer.update()
+    return suspended
+
+
+# the drivers mute the chains again on the next depsgraph update
+def resume_chain_muting(rig, suspended):
+    if len(suspended) == 0 or rig.animation_data is None:
+        return
+    drivers = rig.animation_data.drivers
+    for data_path in suspended:
+        fcurve = drivers.find(data_path)
+        if fcurve is not None:
+            fcurve.mute = False
+    rig.update_tag()
+
+
 def popup (item, icon):
     def draw(self, context):
         self.layout.label(text=item)
     bpy.context.window_manager.popup_menu(draw, title="GYAZ Game Rigger", icon=icon)
    
     
+# actions with f-curves on the rig's pose bones
+def rig_actions (rig):
+    bone_paths = tuple ('pose.bones["' + pbone.name + '"]' for pbone in rig.pose.bones)
+    return [action for action in bpy.data.actions if any (fcurve.data_path.startswith (bone_paths) for fcurve in action.fcurves)]
+
+
 def get_active_action (obj):
     if obj.animation_data != None:
         action = obj.animation_data.action
@@ -141,8 +549,7 @@ def subdivide_bone(name, number, number_to_keep, reverse_naming, prefix, parent_
 
 # parent_name: 'SOURCE_BONE', any bone name, ''
 def create_leaf_bone(bone_name, source_bone_name, start_middle=False, parent_name='SOURCE_BONE'):
-    if bpy.context.mode != 'ARMATURE_EDIT':
-        bpy.ops.object.mode_set(mode='EDIT')
+    set_mode('EDIT')
     rig = bpy.context.object
     leaf_ebone = rig.data.edit_bones.new(name=bone_name)
     source_ebone = rig.data.edit_bones[source_bone_name]
@@ -162,76 +569,21 @@ def create_leaf_bone(bone_name, source_bone_name, start_middle=False, parent_nam
 
 # bone_shape_pos: 'HEAD', 'MIDDLE', 'TAIL'
 # lock_loc... expects bool or container of 3 bools
-# bvh_tree is needed if a bone_shape_name != '' and bone_shape_manual_scale is not None
+# shapes without bone_shape_manual_scale are sized by ray casts against the character mesh (see shape_sizing.py),
+# the scale is a pending query until apply_rig_spec resolves it
+@profiled('bone_settings')
 def bone_settings(bvh_tree=None, shape_collection=None, bone_name='', layer_index=0, group_name='', use_deform=False, lock_loc=False, lock_rot=False, lock_scale=False, hide_select=False, bone_shape_name='', bone_shape_pos='MIDDLE', bone_shape_manual_scale=None, bone_shape_up=False, bone_shape_up_only_for_ray_casting=False, bone_shape_up_only_for_transform=False, bone_shape_dynamic_size=False, bone_shape_bone='', bone_type=''):
     
     rig = bpy.context.object
     
-    if bpy.context.mode != 'POSE':
-        bpy.ops.object.mode_set(mode='POSE')
-    pbones = rig.pose.bones
-    bones = rig.data.bones
-    pbone = pbones[bone_name]
-    bone = bones[bone_name]
+    # BONE SHAPE (edit bone part):
+    final_shape_scale = None
+    use_shape_bone = False
+    shape_bone_name = 'shape_' + bone_name
     
-    # LAYER:
-    bools = [False] * 32
-    bools[layer_index] = True
-    bone.layers = bools
-    
-    # GROUP:
-    if group_name != '':
-        pbone.bone_group = rig.pose.bone_groups[group_name]
-    else:
-        pbone.bone_group = None
-        
-    # USE_DEFORM:
-    bone.use_deform = use_deform
-    
-    # TRANSFORM LOCKS:
-    if type(lock_loc) == bool:
-        pbone.lock_location[0] = lock_loc
-        pbone.lock_location[1] = lock_loc
-        pbone.lock_location[2] = lock_loc  
-    else:
-        pbone.lock_location[0] = lock_loc[0]
-        pbone.lock_location[1] = lock_loc[1]
-        pbone.lock_location[2] = lock_loc[2]
-    if type(lock_rot) == bool:
-        pbone.lock_rotation[0] = lock_rot
-        pbone.lock_rotation[1] = lock_rot
-        pbone.lock_rotation[2] = lock_rot  
-    else:
-        pbone.lock_rotation[0] = lock_rot[0]
-        pbone.lock_rotation[1] = lock_rot[1]
-        pbone.lock_rotation[2] = lock_rot[2]
-    if type(lock_scale) == bool:
-        pbone.lock_scale[0] = lock_scale
-        pbone.lock_scale[1] = lock_scale
-        pbone.lock_scale[2] = lock_scale  
-    else:
-        pbone.lock_scale[0] = lock_scale[0]
-        pbone.lock_scale[1] = lock_scale[1]
-        pbone.lock_scale[2] = lock_scale[2]
-        
-    # HIDE SELECT
-    bone.hide_select = hide_select        
-    
-    # BONE TYPE:
-    if bone_type != '':
-        pbone['bone_type'] = bone_type
-    
-    # ELSE:
-    bone = bones[bone_name]
-    bone.hide = False
-    bone.use_inherit_rotation = True
-    bone.use_local_location = True
-    bone.use_inherit_scale = True
-    
-    # BONE SHAPE:
     if bone_shape_name != '':
         
-        bpy.ops.object.mode_set(mode='EDIT')
+        set_mode('EDIT')
         
         if bone_shape_manual_scale is None:
             
@@ -250,56 +602,22 @@ def bone_settings(bvh_tree=None, shape_collection=None, bone_name='', layer_inde
                 """MIDDLE"""
                 ray_start = (source_ebone.head + source_ebone.tail) * .5
                     
-            # get check points around bone
-            number_of_checks = 4
-            
+            # rays are cast around the bone, resolved with every other shape in one pass
             if bone_shape_up and not bone_shape_up_only_for_transform:
-                mat = Matrix(((1.0, 0.0, 0.0, 0.3396),
-                             (0.0, 0.0, -1.0, 0.4289),
-                             (0.0, 1.0, 0.0, 0.1819),
-                             (0.0, 0.0, 0.0, 1.0)))
-                mat.invert()
+                mat = ((1.0, 0.0, 0.0),
+                       (0.0, 0.0, -1.0),
+                       (0.0, 1.0, 0.0))
             else:
-                mat = source_ebone.matrix
-                mat.invert()
-
-            check_points = []
-
-            for n in range(number_of_checks):
-                v = Vector((0, 0, 1))
-                rot_mat = Matrix.Rotation(radians((360 / number_of_checks) * n), 4, 'Y') @ mat
-                v = v @ rot_mat
-                v += ray_start
-                
-                check_points.append(v)
-        
-            # cast rays -> look for geo
-            hit_distances = []
-            for p in check_points:
-                dir = p - ray_start
-                dir.normalize()
-                hit_loc, hit_nor, hit_index, hit_dist = bvh_tree.ray_cast(ray_start, 
-                                                                          dir,
-                                                                          10
-                                                                          )
-                if hit_dist is not None:
-                    hit_distances.append(hit_dist)
-        
-            final_shape_scale = max(hit_distances) * Constants.bone_shape_scale_multiplier if len(hit_distances) > 0 else fallback_shape_size
+                mat = source_ebone.matrix.to_3x3()
+            
+            final_shape_scale = scheduler.shape_sizing.add_size_query(bone_name=bone_name, 
+                                                                      origin=ray_start, 
+                                                                      matrix=mat
+                                                                      )
             
         else:
             final_shape_scale = bone_shape_manual_scale
         
-        bpy.ops.object.mode_set(mode='POSE')
-    
-        pbone.custom_shape_scale = final_shape_scale
-        
-        wgt = shape_collection.objects['GYAZ_game_rigger_WIDGET__' + bone_shape_name]
-        pbone.custom_shape = wgt
-        pbone.use_custom_shape_bone_size = bone_shape_dynamic_size
-        
-        shape_bone_name = 'shape_' + bone_name
-        
         if not bone_shape_up:
             if bone_shape_pos != 'HEAD':
                 # create shape bone
@@ -310,98 +628,92 @@ def bone_settings(bvh_tree=None, shape_collection=None, bone_name='', layer_inde
         else:
             if not bone_shape_up_only_for_ray_casting:
                 # create shape bone pointing straight up
-                bpy.ops.object.mode_set(mode='EDIT')
-                ebone = rig.data.edit_bones.new(shape_bone_name)
                 ebones = rig.data.edit_bones
+                ebone = ebones.new(shape_bone_name)
                 ebone.head = ebones[bone_name].head
                 ebone.tail = ebones[bone_name].head + Vector((0, 0, Constants.general_bone_size))
                 ebone.roll = 0
                 ebone.parent = ebones[bone_name]
         
         if not bone_shape_up_only_for_ray_casting:
-            if 'shape_' + bone_name in rig.data.edit_bones:
-                # use shape bone as transform of shape
-                bpy.ops.object.mode_set(mode='POSE')
-                pbones = rig.pose.bones
-                shape_pbone = pbones[shape_bone_name]
-                pbone.custom_shape_transform = shape_pbone
-                # shape bone settings:
-                bone = rig.data.bones['shape_' + bone_name]
-                pbone = pbones['shape_' + bone_name]
-                # layer
-                bools = [False] * 32
-                bools[Constants.shape_layer] = True
-                bones['shape_' + bone_name].layers = bools
-                # use deform
-                bone.use_deform = False
-                # lock transforms
-                pbone.lock_location[0] = True
-                pbone.lock_location[1] = True
-                pbone.lock_location[2] = True
-                pbone.lock_rotation[0] = True
-                pbone.lock_rotation[1] = True
-                pbone.lock_rotation[2] = True
-                pbone.lock_scale[0] = True
-                pbone.lock_scale[1] = True
-                pbone.lock_scale[2] = True
-            
+            use_shape_bone = shape_bone_name in rig.data.edit_bones
+    
+    # POSE BONE PART:
+    record = get_spec().bone(bone_name)
+    
+    record.layer = layer_index
+    record.group = group_name
+    record.use_deform = use_deform
+    
+    # TRANSFORM LOCKS:
+    record.lock_location = (lock_loc,) * 3 if type(lock_loc) == bool else tuple(lock_loc)
+    record.lock_rotation = (lock_rot,) * 3 if type(lock_rot) == bool else tuple(lock_rot)
+    record.lock_scale = (lock_scale,) * 3 if type(lock_scale) == bool else tuple(lock_scale)
+    
+    record.hide_select = hide_select
+    if bone_type != '':
+        record.bone_type = bone_type
+    record.reset_flags = True
+    
+    # BONE SHAPE:
+    if bone_shape_name != '':
+        record.custom_shape = bone_shape_name
+        record.custom_shape_scale = final_shape_scale
+        record.use_custom_shape_bone_size = bone_shape_dynamic_size
+        
+        if use_shape_bone:
+            # use shape bone as transform of shape
+            record.custom_shape_transform = shape_bone_name
+            # shape bone settings
+            shape_record = get_spec().bone(shape_bone_name)
+            shape_record.layer = Constants.shape_layer
+            shape_record.use_deform = False
+            shape_record.lock_location = (True, True, True)
+            shape_record.lock_rotation = (True, True, True)
+            shape_record.lock_scale = (True, True, True)
     else:
-        pbone.custom_shape = None
+        record.custom_shape = ''
         
 
 # transform_bone_parent_override is only used if transform_bone_name == REVERSE_RAYCAST
+@profiled('set_bone_shape')
 def set_bone_shape(shape_collection, bone_name, bone_shape_name, bone_shape_scale, transform_bone_name='', transform_bone_parent_override='', bvh_tree=None):
     rig = bpy.context.object
     
+    shape_transform_name = transform_bone_name
+    
     if transform_bone_name == 'REVERSE_RAYCAST' or transform_bone_name == 'UP_RAYCAST':
-        if bpy.context.mode != 'ARMATURE_EDIT':
-            bpy.ops.object.mode_set(mode='EDIT')
+        # shape transform bone is created at the hit location when the shapes are resolved
+        shape_transform_name = ''
+        set_mode('EDIT')
         bone_pos = rig.data.edit_bones[bone_name].head
         
         if transform_bone_name == 'REVERSE_RAYCAST':
-            hit_loc, hit_nor, hit_index, hit_dist = bvh_tree.ray_cast(bone_pos + Vector((0, -5, 0)), 
-                                                                      Vector((0, 1, 0)), 
-                                                                      10
-                                                                      )
+            ray_start = bone_pos + Vector((0, -5, 0))
+            ray_direction = Vector((0, 1, 0))
         elif transform_bone_name == 'UP_RAYCAST':
-            hit_loc, hit_nor, hit_index, hit_dist = bvh_tree.ray_cast(bone_pos, 
-                                                                      Vector((0, 0, 1)), 
-                                                                      10
-                                                                      )            
-            
-        if hit_loc is not None:
-            ebone = rig.data.edit_bones.new('shape_' + bone_name)
-            new_shape_bone_name = ebone.name
-            ebones = rig.data.edit_bones
-            ebone.head = hit_loc
-            ebone.tail = hit_loc + Vector((0, 0, Constants.face_shape_size))
-            ebone.roll = 0
-            ebone.parent = ebones[bone_name] if transform_bone_parent_override == '' else ebones[transform_bone_parent_override]
-            
-            bpy.ops.object.mode_set(mode='POSE')
-            bools = [False] * 32
-            bools[Constants.shape_layer] = True
-            rig.data.bones[new_shape_bone_name].layers = bools
+            ray_start = bone_pos
+            ray_direction = Vector((0, 0, 1))
+        
+        scheduler.shape_sizing.add_bone_query(bone_name=bone_name, 
+                                              origin=ray_start, 
+                                              direction=ray_direction, 
+                                              parent_name=bone_name if transform_bone_parent_override == '' else transform_bone_parent_override
+                                              )
     
-    if bpy.context.mode != 'POSE':
-        bpy.ops.object.mode_set(mode='POSE')
-    pbones = bpy.context.object.pose.bones
-    wgt = shape_collection.objects['GYAZ_game_rigger_WIDGET__' + bone_shape_name]
-    pbones[bone_name].custom_shape = wgt
-    if transform_bone_name != '':
-        if transform_bone_name == 'REVERSE_RAYCAST' or transform_bone_name == 'UP_RAYCAST':
-            pbones[bone_name].custom_shape_transform = pbones[new_shape_bone_name] 
-        else:
-            pbones[bone_name].custom_shape_transform = pbones[transform_bone_name]              
-    pbones[bone_name].use_custom_shape_bone_size = False
-    pbones[bone_name].custom_shape_scale = bone_shape_scale
+    record = get_spec().bone(bone_name)
+    record.custom_shape = bone_shape_name
+    if shape_transform_name != '':
+        record.custom_shape_transform = shape_transform_name
+    record.use_custom_shape_bone_size = False
+    record.custom_shape_scale = bone_shape_scale
 
 
 # parent_name: bone name, 'SOURCE_PARENT', ''
 # roll: 'SOURCE_ROLL', float
+@profiled('duplicate_bone')
 def duplicate_bone(source_name, new_name, parent_name='', half_long=False, roll='SOURCE_ROLL'):
-    if bpy.context.mode != 'ARMATURE_EDIT':
-        bpy.ops.object.mode_set(mode='EDIT')
+    set_mode('EDIT')
     rig = bpy.context.object
     ebones = rig.data.edit_bones
     # transform
@@ -422,8 +734,7 @@ def duplicate_bone(source_name, new_name, parent_name='', half_long=False, roll=
 
 # point: Vector
 def mirror_bone_to_point(bone_name, point):
-    if bpy.context.mode != 'ARMATURE_EDIT':
-        bpy.ops.object.mode_set(mode='EDIT')
+    set_mode('EDIT')
     ebones = bpy.context.object.data.edit_bones
     ebone = ebones[bone_name]
 
@@ -442,19 +753,19 @@ def create_no_twist_bone(source_bone_name):
     # used with twist_targets
     rig = bpy.context.object
     no_twist_name = 'no_twist_' + source_bone_name
-    if no_twist_name not in rig.data.bones:
+    set_mode('EDIT')
+    if no_twist_name not in rig.data.edit_bones:
     
         duplicate_bone(source_name=source_bone_name, 
                        new_name=no_twist_name, 
                        parent_name='SOURCE_PARENT', 
                        half_long=True
                        )
-        bpy.ops.object.mode_set(mode='POSE')
-        pbone = rig.pose.bones[no_twist_name]
-        c = pbone.constraints.new('DAMPED_TRACK')
-        c.target = rig
-        c.subtarget = source_bone_name
-        c.head_tail = 1
+        add_constraint(bone_name=no_twist_name,
+                       type='DAMPED_TRACK',
+                       subtarget=source_bone_name,
+                       head_tail=1
+                       )
         bone_settings(bone_name=no_twist_name, 
                       layer_index=Constants.misc_layer, 
                       lock_loc=True, 
@@ -466,8 +777,7 @@ def create_no_twist_bone(source_bone_name):
 
 def set_parent_chain(bone_names, first_parent_name):
     rig = bpy.context.object
-    if bpy.context.mode != 'ARMATURE_EDIT':    
-        bpy.ops.object.mode_set(mode='EDIT')
+    set_mode('EDIT')
     for index, name in enumerate(bone_names):
         ebones = rig.data.edit_bones
         if index == 0:
@@ -478,149 +788,117 @@ def set_parent_chain(bone_names, first_parent_name):
         ebones[name].parent = parent
 
 
-def prop_to_drive_constraint(prop_bone_name, bone_name, constraint_name, prop_name, attribute, prop_min, prop_max, prop_default, description, expression):
+# custom prop (with min, max, description) on prop bone that drives data_path through variable 'v1'
+# owner: 'OBJECT', 'DATA'
+def prop_driver(prop_bone_name, prop_name, prop_min, prop_max, prop_default, description, owner, data_path, expression, array_index=-1):
     
-    if bpy.context.mode != 'POSE':
-        bpy.ops.object.mode_set(mode='POSE')
-        
-    rig = bpy.context.object
+    spec = get_spec()
     
     # prop
-    rig.pose.bones[prop_bone_name][prop_name] = prop_default
-
-    # min, max soft_min, soft_max, description on properties
-    if "_RNA_UI" not in rig.pose.bones[prop_bone_name]:
-        rig.pose.bones[prop_bone_name]["_RNA_UI"] = {}
-
-    rig.pose.bones[prop_bone_name]["_RNA_UI"][prop_name] = {"min": prop_min,
-                                                       "max": prop_max,
-                                                       "soft_min": prop_min, 
-                                                       "soft_max": prop_max,
-                                                       "description": description
-                                                       }
+    spec.set_prop(bone_name=prop_bone_name, 
+                  prop_name=prop_name, 
+                  value=prop_default,
+                  ui={"min": prop_min,
+                      "max": prop_max,
+                      "soft_min": prop_min, 
+                      "soft_max": prop_max,
+                      "description": description
+                      }
+                  )
     # driver
-    d = rig.driver_add('pose.bones["' + bone_name + '"].constraints["' + constraint_name + '"].' + attribute).driver
-    v1 = d.variables.new()
-    v1.name = 'v1'
-    v1.type = 'SINGLE_PROP'
-    t = v1.targets[0]
-    t.id = rig
-    t.data_path = 'pose.bones["' + prop_bone_name + '"]["' + prop_name + '"]'
-    d.expression = expression
+    if expression is None:
+        return
+    spec.add_driver(owner=owner, 
+                    data_path=data_path, 
+                    expression=expression, 
+                    variables=[('v1', prop_bone_name, prop_name)], 
+                    array_index=array_index
+                    )
 
 
+@profiled('prop_to_drive_constraint')
+def prop_to_drive_constraint(prop_bone_name, bone_name, constraint_name, prop_name, attribute, prop_min, prop_max, prop_default, description, expression):
+    
+    prop_driver(prop_bone_name=prop_bone_name, 
+                prop_name=prop_name, 
+                prop_min=prop_min, 
+                prop_max=prop_max, 
+                prop_default=prop_default, 
+                description=description, 
+                owner='OBJECT',
+                data_path='pose.bones["' + bone_name + '"].constraints["' + constraint_name + '"].' + attribute, 
+                expression=expression
+                )
+
+
+@profiled('prop_to_drive_layer')
 def prop_to_drive_layer(prop_bone_name, layer_index, prop_name, prop_min, prop_max, prop_default, description, expression):
     
-    if bpy.context.mode != 'POSE':
-        bpy.ops.object.mode_set(mode='POSE')
-        
-    rig = bpy.context.object
-        
-    # prop
-    rig.pose.bones[prop_bone_name][prop_name] = prop_default
-
-    # min, max soft_min, soft_max, description on properties
-    if "_RNA_UI" not in rig.pose.bones[prop_bone_name]:
-        rig.pose.bones[prop_bone_name]["_RNA_UI"] = {}
-
-    rig.pose.bones[prop_bone_name]["_RNA_UI"][prop_name] = {"min": prop_min, 
-                                                       "max": prop_max,
-                                                       "soft_min": prop_min, 
-                                                       "soft_max": prop_max,
-                                                       "description": description
-                                                       }
-    # driver
-    d = rig.data.driver_add('layers', layer_index).driver
-    v1 = d.variables.new()
-    v1.name = 'v1'
-    v1.type = 'SINGLE_PROP'
-    t = v1.targets[0]
-    t.id = rig
-    t.data_path = 'pose.bones["' + prop_bone_name + '"]["' + prop_name + '"]'
-    d.expression = expression
-
-
+    prop_driver(prop_bone_name=prop_bone_name, 
+                prop_name=prop_name, 
+                prop_min=prop_min, 
+                prop_max=prop_max, 
+                prop_default=prop_default, 
+                description=description, 
+                owner='DATA',
+                data_path='layers', 
+                expression=expression, 
+                array_index=layer_index
+                )
+
+
+# bone_type: 'PBONE', 'BONE'
+@profiled('prop_to_drive_bone_attribute')
 def prop_to_drive_bone_attribute(prop_bone_name, bone_name, bone_type, prop_name, attribute, prop_min, prop_max, prop_default, description, expression):
-
-    if bpy.context.mode != 'POSE':
-        bpy.ops.object.mode_set(mode='POSE')
-        
-    rig = bpy.context.object
-
-    # prop
-    rig.pose.bones[prop_bone_name][prop_name] = prop_default
-
-    # min, max soft_min, soft_max, description on properties
-    if "_RNA_UI" not in rig.pose.bones[prop_bone_name]:
-        rig.pose.bones[prop_bone_name]["_RNA_UI"] = {}
-
-    rig.pose.bones[prop_bone_name]["_RNA_UI"][prop_name] = {"min": prop_min, 
-                                                       "max": prop_max,
-                                                       "soft_min": prop_min, 
-                                                       "soft_max": prop_max,
-                                                       "description": description
-                                                       }
-    # driver
+    
     if bone_type == 'PBONE':
-        d = rig.driver_add('pose.bones["' + bone_name + '"].' + attribute).driver
+        owner = 'OBJECT'
+        data_path = 'pose.bones["' + bone_name + '"].' + attribute
     elif bone_type == 'BONE':
-        d = rig.data.driver_add('bones["' + bone_name + '"].' + attribute).driver
-    v1 = d.variables.new()
-    v1.name = 'v1'
-    v1.type = 'SINGLE_PROP'
-    t = v1.targets[0]
-    t.id = rig
-    t.data_path = 'pose.bones["' + prop_bone_name + '"]["' + prop_name + '"]'
-    d.expression = expression
-
-
+        owner = 'DATA'
+        data_path = 'bones["' + bone_name + '"].' + attribute
+    
+    prop_driver(prop_bone_name=prop_bone_name, 
+                prop_name=prop_name, 
+                prop_min=prop_min, 
+                prop_max=prop_max, 
+                prop_default=prop_default, 
+                description=description, 
+                owner=owner,
+                data_path=data_path, 
+                expression=expression
+                )
+
+
+@profiled('prop_to_drive_pbone_attribute_with_array_index')
 def prop_to_drive_pbone_attribute_with_array_index(prop_bone_name, bone_name, prop_name, attribute, array_index, prop_min, prop_max, prop_default, description, expression):
-
-    if bpy.context.mode != 'POSE':
-        bpy.ops.object.mode_set(mode='POSE')
-        
-    rig = bpy.context.object
-
-    # prop
-    rig.pose.bones[prop_bone_name][prop_name] = prop_default
-
-    # min, max soft_min, soft_max, description on properties
-    if "_RNA_UI" not in rig.pose.bones[prop_bone_name]:
-        rig.pose.bones[prop_bone_name]["_RNA_UI"] = {}
-
-    rig.pose.bones[prop_bone_name]["_RNA_UI"][prop_name] = {"min": prop_min, 
-                                                       "max": prop_max,
-                                                       "soft_min": prop_min, 
-                                                       "soft_max": prop_max,
-                                                       "description": description
-                                                       }
-    # driver
-    d = rig.driver_add('pose.bones["' + bone_name + '"].' + attribute, array_index).driver
-    v1 = d.variables.new()
-    v1.name = 'v1'
-    v1.type = 'SINGLE_PROP'
-    t = v1.targets[0]
-    t.id = rig
-    t.data_path = 'pose.bones["' + prop_bone_name + '"]["' + prop_name + '"]'
-    d.expression = expression
+    
+    prop_driver(prop_bone_name=prop_bone_name, 
+                prop_name=prop_name, 
+                prop_min=prop_min, 
+                prop_max=prop_max, 
+                prop_default=prop_default, 
+                description=description, 
+                owner='OBJECT',
+                data_path='pose.bones["' + bone_name + '"].' + attribute, 
+                expression=expression, 
+                array_index=array_index
+                )
 
 
 def separate_relevant_bones(relevant_bone_names):
     # separate relevant bones into fk and no-fk groups
-    bpy.ops.object.mode_set(mode='POSE')
-    pbones = bpy.context.object.pose.bones
     fk_bones = []
     non_fk_bones = []
     touch_bones = []
     for name in relevant_bone_names:
-        pbone = pbones[name]
-        if 'bone_type' in pbone:
-            if pbone['bone_type'] == 'fk':
-                fk_bones.append(name)
-            elif pbone['bone_type'] == 'ik' or pbone['bone_type'] == 'ctrl':
-                non_fk_bones.append(name)
-            elif pbone['bone_type'] == 'touch':
-                touch_bones.append(name)
+        bone_type = get_bone_type(name)
+        if bone_type == 'fk':
+            fk_bones.append(name)
+        elif bone_type == 'ik' or bone_type == 'ctrl':
+            non_fk_bones.append(name)
+        elif bone_type == 'touch':
+            touch_bones.append(name)
     return fk_bones, non_fk_bones, touch_bones
 
 
@@ -668,8 +946,7 @@ def bone_visibility(prop_bone_name, module, relevant_bone_names, ik_ctrl):
 
 def create_module_prop_bone(module):
     
-    if bpy.context.mode != 'ARMATURE_EDIT':
-        bpy.ops.object.mode_set(mode='EDIT')
+    set_mode('EDIT')
     
     rig = bpy.context.object
     
@@ -689,13 +966,8 @@ def create_module_prop_bone(module):
 
 def set_module_on_relevant_bones(relevant_bone_names, module):
     # set module name on relevant bones (used by the 'N-panel' interface)
-    if bpy.context.mode != 'POSE':
-        bpy.ops.object.mode_set(mode='POSE')
-    
-    rig = bpy.context.object
-    
     for name in relevant_bone_names:
-        rig.pose.bones[name]['module'] = module
+        set_pose_bone_prop(name, 'module', module)
         
 
 # for registering modules for the 'Snap&Key' operator
@@ -704,11 +976,12 @@ def snappable_module(module):
     if 'snappable_modules' not in rig.data:
         rig.data['snappable_modules'] = []
     list = [item for item in rig.data['snappable_modules']]
-    list.append(module)
+    if module not in list:
+        list.append(module)
     rig.data['snappable_modules'] = list
 
-    rig.pose.bones['module_props__' + module]["snap_n_key__fk_ik"] = 1
-    rig.pose.bones['module_props__' + module]["snap_n_key__should_snap"] = 1
+    set_pose_bone_prop('module_props__' + module, "snap_n_key__fk_ik", 1)
+    set_pose_bone_prop('module_props__' + module, "snap_n_key__should_snap", 1)
 
 
 def signed_angle(vector_u, vector_v, normal):
@@ -721,8 +994,7 @@ def signed_angle(vector_u, vector_v, normal):
 
 def get_pole_angle(base_bone_name, ik_bone_name, pole_bone_name):
     
-    if bpy.context.mode != 'ARMATURE_EDIT':
-        bpy.ops.object.mode_set(mode='EDIT')
+    set_mode('EDIT')
         
     ebones = bpy.context.object.data.edit_bones
     
@@ -738,8 +1010,7 @@ def get_pole_angle(base_bone_name, ik_bone_name, pole_bone_name):
 
 def calculate_pole_target_location(b1, b2, b3, pole_target_distance):
     
-    if bpy.context.mode != 'ARMATURE_EDIT':
-        bpy.ops.object.mode_set(mode='EDIT')
+    set_mode('EDIT')
     
     rig = bpy.context.object
     ebones = rig.data.edit_bones
@@ -769,8 +1040,7 @@ def lerp (A, B, alpha):
 
 def calculate_pole_target_location_2(b1, b2, b3, pole_target_distance, b2_bend_axis):
     
-    if bpy.context.mode != 'ARMATURE_EDIT':
-        bpy.ops.object.mode_set(mode='EDIT')
+    set_mode('EDIT')
     
     rig = bpy.context.object
     ebones = rig.data.edit_bones
@@ -811,8 +1081,7 @@ def create_twist_bones(bvh_tree, shape_collection, source_bone_name, count, uppe
     
     source_bone_bend_axis = '-X'
     
-    if bpy.context.mode != 'ARMATURE_EDIT':
-        bpy.ops.object.mode_set(mode='EDIT')
+    set_mode('EDIT')
     
     rig = bpy.context.object
 
@@ -860,7 +1129,6 @@ def create_twist_bones(bvh_tree, shape_collection, source_bone_name, count, uppe
                       )
 
         # twist target line
-        bpy.ops.object.mode_set(mode='EDIT')
         ebones = rig.data.edit_bones
         tt_ebone = ebones[twist_target_name]
         twist_target_line_name = 'twist_target_line_' + source_bone_name
@@ -895,20 +1163,12 @@ def create_twist_bones(bvh_tree, shape_collection, source_bone_name, count, uppe
                              )
             
             # 'Child Of' parent it to end affector (hand or foot) - the use of constraint is needed for the twist constraints to work
-            bpy.ops.object.mode_set(mode='POSE')
-            pbone = rig.pose.bones[twist_target_name]
-            c = pbone.constraints.new('CHILD_OF')
-            c.name = 'Copy End Affector'
-            c.target = rig
-            c.subtarget = end_affector_name
-            # set inverse matrix
-            rig.data.bones.active = rig.data.bones[twist_target_name]
-            context_copy = bpy.context.copy()
-            context_copy["constraint"] = pbone.constraints['Copy End Affector']
-            bpy.ops.constraint.childof_set_inverse(context_copy, 
-                                                   constraint='Copy End Affector',
-                                                   owner='BONE'
-                                                   )
+            add_constraint(bone_name=twist_target_name,
+                           type='CHILD_OF',
+                           set_inverse=True,
+                           name='Copy End Affector',
+                           subtarget=end_affector_name
+                           )
             bone_settings(bvh_tree=bvh_tree, 
                           shape_collection=shape_collection, 
                           bone_name=twist_target_name, 
@@ -936,92 +1196,85 @@ def create_twist_bones(bvh_tree, shape_collection, source_bone_name, count, uppe
                       )
     
     # CONSTRAINTS
-    if bpy.context.mode != 'POSE':
-        bpy.ops.object.mode_set(mode='POSE')
-    
-    pbones = rig.pose.bones
     influences = influences[count - 1]
     
     for n in range(1, count + 1):
-        pbone = pbones['twist_' + str(n) + '_' + source_bone_name]
+        twist_bone_name = 'twist_' + str(n) + '_' + source_bone_name
 
         if upper_or_lower_limb == 'UPPER':
-            c = pbone.constraints.new('LOCKED_TRACK')
-            c.name = 'twist'
-            c.target = rig
-            c.subtarget = twist_target_name
-            c.head_tail = 0
-
-            if source_bone_bend_axis == '-X':
-                c.track_axis = 'TRACK_NEGATIVE_Z'
-
-            c.lock_axis = 'LOCK_Y'
-            c.influence = influences[n - 1]
+            add_constraint(bone_name=twist_bone_name,
+                           type='LOCKED_TRACK',
+                           name='twist',
+                           subtarget=twist_target_name,
+                           head_tail=0,
+                           track_axis='TRACK_NEGATIVE_Z',
+                           lock_axis='LOCK_Y',
+                           influence=influences[n - 1]
+                           )
 
         elif upper_or_lower_limb == 'LOWER':
-            c = pbone.constraints.new('TRACK_TO')
-            c.name = 'twist'
-            c.target = rig
-            c.subtarget = twist_target_name
-            c.head_tail = 0
-            c.track_axis = 'TRACK_Y'
-            c.up_axis = 'UP_Z'
-            c.use_target_z = True
-            c.target_space = 'WORLD'
-            c.owner_space = 'WORLD'
-            c.influence = influences[n - 1]
-
-            c = pbone.constraints.new('LIMIT_ROTATION')
-            c.name = 'limit rotation'
-            c.owner_space = 'LOCAL'
-            c.influence = 1
-            c.use_limit_x = True
-            c.use_limit_y = False
-            c.use_limit_z = True
-            c.use_transform_limit = True
-            c.min_x = 0
-            c.max_x = 0
-            c.min_z = 0
-            c.max_z = 0
+            add_constraint(bone_name=twist_bone_name,
+                           type='TRACK_TO',
+                           name='twist',
+                           subtarget=twist_target_name,
+                           head_tail=0,
+                           track_axis='TRACK_Y',
+                           up_axis='UP_Z',
+                           use_target_z=True,
+                           target_space='WORLD',
+                           owner_space='WORLD',
+                           influence=influences[n - 1]
+                           )
+            add_constraint(bone_name=twist_bone_name,
+                           type='LIMIT_ROTATION',
+                           name='limit rotation',
+                           owner_space='LOCAL',
+                           influence=1,
+                           use_limit_x=True,
+                           use_limit_y=False,
+                           use_limit_z=True,
+                           use_transform_limit=True,
+                           min_x=0,
+                           max_x=0,
+                           min_z=0,
+                           max_z=0
+                           )
 
     # twist target line
     if upper_or_lower_limb == 'UPPER':
-        pbone = pbones['twist_target_line_' + source_bone_name]
-        c = pbone.constraints.new('STRETCH_TO')
-        c.name = 'twist target line'
-        c.target = rig
-        c.subtarget = 'twist_target_' + source_bone_name
-        c.head_tail = 0
-        c.bulge = 1
-        c.use_bulge_min = False
-        c.use_bulge_max = False
-        c.volume = 'VOLUME_XZX'
-        c.keep_axis = 'PLANE_X'
-        c.influence = 1
+        add_constraint(bone_name='twist_target_line_' + source_bone_name,
+                       type='STRETCH_TO',
+                       name='twist target line',
+                       subtarget='twist_target_' + source_bone_name,
+                       head_tail=0,
+                       bulge=1,
+                       use_bulge_min=False,
+                       use_bulge_max=False,
+                       volume='VOLUME_XZX',
+                       keep_axis='PLANE_X',
+                       influence=1
+                       )
 
     # twist target thigh
     if is_thigh == True:
-        pbone = pbones['twist_target_' + source_bone_name]
-        c = pbone.constraints.new('TRANSFORM')
-        c.name = 'thigh rotation to location'
-        c.use_motion_extrapolate = True
-        c.target = rig
-        c.subtarget = source_bone_name
-        c.map_from = 'ROTATION'
-        c.map_to = 'LOCATION'
-
-        if source_bone_bend_axis == '-X':
-            c.map_to_x_from = 'X'
-            c.map_to_y_from = 'X'
-            c.map_to_z_from = 'X'
-            c.from_min_x_rot = radians(-180)
-            c.from_max_x_rot = radians(180)
-
-        c.to_min_y = 1
-        c.to_max_y = -1
-        c.target_space = 'LOCAL'
-        c.owner_space = 'LOCAL'
-        c.influence = 1
+        add_constraint(bone_name='twist_target_' + source_bone_name,
+                       type='TRANSFORM',
+                       name='thigh rotation to location',
+                       use_motion_extrapolate=True,
+                       subtarget=source_bone_name,
+                       map_from='ROTATION',
+                       map_to='LOCATION',
+                       map_to_x_from='X',
+                       map_to_y_from='X',
+                       map_to_z_from='X',
+                       from_min_x_rot=radians(-180),
+                       from_max_x_rot=radians(180),
+                       to_min_y=1,
+                       to_max_y=-1,
+                       target_space='LOCAL',
+                       owner_space='LOCAL',
+                       influence=1
+                       )
         
         
 def three_bone_limb(bvh_tree, shape_collection, module, b1, b2, b3, pole_target_name, parent_pole_target_to_ik_target, b2_bend_axis, b2_bend_back_limit, first_parent_name, ik_b3_parent_name, pole_target_parent_name, b3_shape_up, side):
@@ -1111,25 +1364,6 @@ def three_bone_limb(bvh_tree, shape_collection, module, b1, b2, b3, pole_target_
                                                        expression='v1'
                                                        )
 
-    bpy.ops.object.mode_set(mode='POSE')
-    pbone = rig.pose.bones[fk_prefix + b2]
-    c = pbone.constraints.new('LIMIT_ROTATION')
-    c.name = 'Limit rotation'
-    c.owner_space = 'LOCAL'
-    c.use_limit_x = True
-    c.use_limit_y = True
-    c.use_limit_z = True
-    c.use_transform_limit = True
-    if 0 in axis_locks_int:
-        c.min_x = 0
-        c.max_x = 0
-    if 1 in axis_locks_int:
-        c.min_y = 0
-        c.max_y = 0
-    if 2 in axis_locks_int:
-        c.min_z = 0
-        c.max_z = 0
-
     # limits
     if b2_bend_axis == 'X':
         bend_axis = 'x'
@@ -1140,10 +1374,24 @@ def three_bone_limb(bvh_tree, shape_collection, module, b1, b2, b3, pole_target_
         b2_max = 0 + radians(b2_max_bend_bwrd)
         b2_min = abs(b2_max) - radians(180)
 
+    limits = {}
+    for axis in axis_locks_string:
+        limits['min_' + axis] = 0
+        limits['max_' + axis] = 0
     if bend_axis == 'x':
-        axis = 0
-        c.min_x = b2_min
-        c.max_x = b2_max
+        limits['min_x'] = b2_min
+        limits['max_x'] = b2_max
+
+    add_constraint(bone_name=fk_prefix + b2,
+                   type='LIMIT_ROTATION',
+                   name='Limit rotation',
+                   owner_space='LOCAL',
+                   use_limit_x=True,
+                   use_limit_y=True,
+                   use_limit_z=True,
+                   use_transform_limit=True,
+                   **limits
+                   )
 
     prop_to_drive_constraint(prop_bone_name=fk_prefix + b2, 
                              bone_name=fk_prefix + b2, 
@@ -1158,15 +1406,13 @@ def three_bone_limb(bvh_tree, shape_collection, module, b1, b2, b3, pole_target_
                              )
 
     # BIND RIG TO FK RIG constraints
-    bpy.ops.object.mode_set(mode='POSE')
-    pbones = rig.pose.bones
-
-    for index, name in enumerate(bone_names):
-        c = pbones[name].constraints.new('COPY_ROTATION')
-        c.name = 'bind_to_fk_1'
-        c.target = rig
-        c.subtarget = fk_prefix + name
-        c.mute = True
+    for name in bone_names:
+        add_constraint(bone_name=name,
+                       type='COPY_ROTATION',
+                       name='bind_to_fk_1',
+                       subtarget=fk_prefix + name,
+                       mute=True
+                       )
 
     # _____________________________________________________________________________________________________
 
@@ -1211,7 +1457,7 @@ def three_bone_limb(bvh_tree, shape_collection, module, b1, b2, b3, pole_target_
 
     # pole target:
     
-    bpy.ops.object.mode_set(mode='EDIT')
+    set_mode('EDIT')
     ebones = rig.data.edit_bones
     
     pole_pos = calculate_pole_target_location_2(b1=b1, 
@@ -1255,21 +1501,16 @@ def three_bone_limb(bvh_tree, shape_collection, module, b1, b2, b3, pole_target_
                                 pole_bone_name=pole_target_name
                                 )
 
-    bpy.ops.object.mode_set(mode='POSE')
-    pbones = rig.pose.bones
-    pbone = pbones[ik_prefix + b2]
-
-    c = pbone.constraints.new('IK')
-    c.target = rig
-    c.subtarget = ik_prefix + b3
-    c.pole_target = rig
-    c.pole_subtarget = pole_target_name
-    c.pole_angle = pole_angle
-    c.chain_count = 2
-    c.use_stretch = inable_stretch
+    add_constraint(bone_name=ik_prefix + b2,
+                   type='IK',
+                   subtarget=ik_prefix + b3,
+                   pole_subtarget=pole_target_name,
+                   pole_angle=pole_angle,
+                   chain_count=2,
+                   use_stretch=inable_stretch
+                   )
 
     # pole target line
-    bpy.ops.object.mode_set(mode='EDIT')
     ebones = rig.data.edit_bones
     pole_target_line_name = 'target' + '_line_' + pole_target_name
 
@@ -1294,10 +1535,10 @@ def three_bone_limb(bvh_tree, shape_collection, module, b1, b2, b3, pole_target_
                   bone_type=Constants.ik_type
                   )
     # contraint              
-    pbone = rig.pose.bones[pole_target_line_name]
-    c = pbone.constraints.new('STRETCH_TO')
-    c.target = rig
-    c.subtarget = pole_target_name
+    add_constraint(bone_name=pole_target_line_name,
+                   type='STRETCH_TO',
+                   subtarget=pole_target_name
+                   )
 
     relevant_bone_names.append(pole_target_line_name)
 
@@ -1323,9 +1564,16 @@ def three_bone_limb(bvh_tree, shape_collection, module, b1, b2, b3, pole_target_
     default = 1 if limit_ik_b2 else 0
     
     # lock ik axes
-    pbone = pbones[ik_prefix + b2]
+    pose_attributes = get_spec().bone(ik_prefix + b2).pose_attributes
+    for axis in axis_locks_string:
+        pose_attributes['lock_ik_' + axis] = limit_ik_b2
+    if b2_bend_axis == 'X':
+        pose_attributes['ik_min_x'] = b2_min
+    elif b2_bend_axis == '-X':
+        pose_attributes['ik_max_x'] = b2_max
+    pose_attributes['use_ik_limit_' + bend_axis] = limit_ik_b2
+    
     for axis in axis_locks_string:
-        setattr(pbone, 'lock_ik_' + axis, limit_ik_b2)
         prop_to_drive_bone_attribute (prop_bone_name=prop_bone_name, 
                                       bone_name=ik_prefix+b2, 
                                       bone_type='PBONE', 
@@ -1339,14 +1587,6 @@ def three_bone_limb(bvh_tree, shape_collection, module, b1, b2, b3, pole_target_
                                       )
 
     # limit rot
-    bpy.ops.object.mode_set(mode='POSE')
-    pbone = rig.pose.bones[ik_prefix + b2]
-    if b2_bend_axis == 'X':
-        pbone.ik_min_x = b2_min
-    elif b2_bend_axis == '-X':
-        pbone.ik_max_x = b2_max
-
-    setattr(pbone, 'use_ik_limit_' + bend_axis, limit_ik_b2)
     prop_to_drive_bone_attribute (prop_bone_name=prop_bone_name, 
                                   bone_name=ik_prefix+b2, 
                                   bone_type='PBONE', 
@@ -1360,15 +1600,13 @@ def three_bone_limb(bvh_tree, shape_collection, module, b1, b2, b3, pole_target_
                                   )
 
     # BIND RIG TO IK RIG constraints
-    bpy.ops.object.mode_set(mode='POSE')
-    pbones = rig.pose.bones
-
-    for index, name in enumerate(bone_names):
-        c = pbones[name].constraints.new('COPY_ROTATION')
-        c.name = 'bind_to_ik_1'
-        c.target = rig
-        c.subtarget = ik_prefix + name
-        c.mute = True
+    for name in bone_names:
+        add_constraint(bone_name=name,
+                       type='COPY_ROTATION',
+                       name='bind_to_ik_1',
+                       subtarget=ik_prefix + name,
+                       mute=True
+                       )
 
     # BIND RIG TO (0:fk, 1:ik, 2:bind)
     for name in bone_names:
@@ -1408,33 +1646,23 @@ def three_bone_limb(bvh_tree, shape_collection, module, b1, b2, b3, pole_target_
                                  )
 
     # prop that stores bone names for fk/ik snapping
-    bpy.ops.object.mode_set(mode='POSE')
-    pbone = rig.pose.bones[prop_bone_name]
-
-    stem = 'snapinfo_3bonelimb_'
-    index_is_free = False
-    index = 0
-    while not index_is_free:
-        for n in range(0, 1000):
-            prop_name_candidate = stem + str(index + n)
-            if prop_name_candidate not in pbone:
-                pbone[prop_name_candidate] = [fk_prefix + b1, 
-                                              fk_prefix + b2, 
-                                              fk_prefix + b3,
-                                              ik_prefix + b1, 
-                                              ik_prefix + b2, 
-                                              ik_prefix + b3, 
-                                              pole_target_name,
-                                              str(Constants.pole_target_distance), 
-                                              snap_target_pole_name, 
-                                              fk_prefix + b3,
-                                              ik_prefix + b3, 
-                                              'None'
-                                              ]
-            # stop for loop
-            break
-        # stop while_loop
-        index_is_free = True
+    spec = get_spec()
+    spec.set_snap_info(prop_bone_name, 
+                       spec.free_snap_info_name(prop_bone_name, 'snapinfo_3bonelimb_'), 
+                       [fk_prefix + b1, 
+                        fk_prefix + b2, 
+                        fk_prefix + b3,
+                        ik_prefix + b1, 
+                        ik_prefix + b2, 
+                        ik_prefix + b3, 
+                        pole_target_name,
+                        str(Constants.pole_target_distance), 
+                        snap_target_pole_name, 
+                        fk_prefix + b3,
+                        ik_prefix + b3, 
+                        'None'
+                        ]
+                       )
 
 
 #bvh_tree = BVHTree.FromObject(bpy.context.object.children[0], bpy.context.depsgraph)
@@ -1447,8 +1675,7 @@ def isolate_rotation(module, parent_bone_name, first_bone_name):
     
     prop_bone_name = create_module_prop_bone(module)
 
-    if bpy.context.mode != 'EDIT':
-        bpy.ops.object.mode_set(mode='EDIT')
+    set_mode('EDIT')
 
     # delete parent relationship tween parent_bone and first bone
     # create intermediate bones
@@ -1468,7 +1695,6 @@ def isolate_rotation(module, parent_bone_name, first_bone_name):
                   )
 
     # bone that becomes the parent of 'first_bone_name'
-    bpy.ops.object.mode_set(mode='EDIT')
     ebones = rig.data.edit_bones
     second_intermediate_bone_name = 'isolate_rot_' + first_bone_name + '_child'
     ebone = ebones.new(name=second_intermediate_bone_name)
@@ -1484,27 +1710,23 @@ def isolate_rotation(module, parent_bone_name, first_bone_name):
                   )
 
     # parent first bone to this bone
-    bpy.ops.object.mode_set(mode='EDIT')
     ebones = rig.data.edit_bones
     ebones[first_bone_name].parent = ebones[second_intermediate_bone_name]
 
     # constraint second itermediate bone to the first one
-    bpy.ops.object.mode_set(mode='POSE')
-    pbones = rig.pose.bones
-    cs = pbones[second_intermediate_bone_name].constraints
-
-    c = cs.new('COPY_LOCATION')
-    c.target = rig
-    c.subtarget = first_intermeidate_bone_name
-
-    c = cs.new('COPY_SCALE')
-    c.target = rig
-    c.subtarget = first_intermeidate_bone_name
-
-    c = cs.new('COPY_ROTATION')
-    c.name = 'isolate_rot_1'
-    c.target = rig
-    c.subtarget = first_intermeidate_bone_name
+    add_constraint(bone_name=second_intermediate_bone_name,
+                   type='COPY_LOCATION',
+                   subtarget=first_intermeidate_bone_name
+                   )
+    add_constraint(bone_name=second_intermediate_bone_name,
+                   type='COPY_SCALE',
+                   subtarget=first_intermeidate_bone_name
+                   )
+    add_constraint(bone_name=second_intermediate_bone_name,
+                   type='COPY_ROTATION',
+                   name='isolate_rot_1',
+                   subtarget=first_intermeidate_bone_name
+                   )
 
     prop_to_drive_constraint(prop_bone_name=first_bone_name, 
                              bone_name=second_intermediate_bone_name,
@@ -1519,13 +1741,8 @@ def isolate_rotation(module, parent_bone_name, first_bone_name):
                              )
                         
 def get_parent_name(name):
-    if bpy.context.mode != 'ARMATURE_EDIT':
-        bpy.ops.object.mode_set(mode='EDIT')
+    set_mode('EDIT')
     return bpy.context.object.data.edit_bones[name].parent.name
 
 def set_bone_only_layer(bone_name, layer_index):
-    if bpy.context.mode != 'OBJECT':
-        bpy.ops.object.mode_set(mode='OBJECT')
-    bools = [False] * 32
-    bools[layer_index] = True
-    bpy.context.object.data.bones[bone_name].layers = bools
+    get_spec().bone(bone_name).layer = layer_index